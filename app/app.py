@@ -5,7 +5,9 @@
 # -------------------------------------------------------------
 
 # --- must come first: add project root to sys.path BEFORE importing utils ---
+import hashlib
 import sys
+from functools import partial
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent  # .../seoul_dashboard_3
@@ -15,14 +17,12 @@ if str(BASE_DIR) not in sys.path:
 
 import streamlit as st
 import numpy_financial as npf
-import json
 import pandas as pd
 import numpy as np
 import pydeck as pdk
 import altair as alt
-import geopandas as gpd
 
-from components.sidebar_presets import render_sidebar_presets
+from components.sidebar_presets import render_sidebar_presets, SCENARIO_TABLE_KEY, SCENARIO_EDITOR_KEY
 from components.sidebar_4quadrant_guide import render_sidebar_4quadrant_guide
 
 
@@ -30,20 +30,54 @@ from components.sidebar_4quadrant_guide import render_sidebar_4quadrant_guide
 from datetime import datetime
 
 # === [SESSION KEYS INIT] ===
-if "matched_links_geojson" not in st.session_state:
-    st.session_state["matched_links_geojson"] = None
-if "matched_links_geojson_daily" not in st.session_state:
-    st.session_state["matched_links_geojson_daily"] = None
+if "matched_links_paths_hourly" not in st.session_state:
+    st.session_state["matched_links_paths_hourly"] = None
+if "matched_links_paths_daily" not in st.session_state:
+    st.session_state["matched_links_paths_daily"] = None
 # [넣을 위치 A] color_mode 기본값
 if "color_mode_daily_val" not in st.session_state:
     st.session_state["color_mode_daily_val"] = "절대(30/70)"
 
 # === 외부 모듈 (utils) 임포트 ===
 from utils.traffic_preproc import ensure_speed_csv
+from utils.scenario_kpi import (
+    SCENARIO_COLUMNS, calc_kpis, calc_kpis_batch, car_demand_factor, clean_scenario_table, default_scenario_table,
+)
+from utils.memo import BoundedCache, normalize_key
+from utils.pipeline import ComputeGraph
+from utils.map_payload import path_frame
+from utils.link_geometry import (load_link_arrays, load_link_window, load_link_window_points, lonlat_to_mercator,
+                                 mercator_scale, tolerance_for_zoom)
+from utils.link_keys import with_link_key
+from utils.site_atlas import SiteAtlas, link_daily_congestion
+from utils.site_weights import SiteLinkWeights, build_site_link_weights
+from utils.site_catchment import SiteCatchment
+from utils.traffic_plot import speed_rows_for_keys
+from utils.hour_cube import HOUR_WINDOWS, HourCube
+from utils.link_congestion import LinkCongestion, load_link_congestion
+from utils.link_quantiles import CITY_SCOPE, LinkQuantiles, load_link_quantiles
+from utils.map_style import CONGESTION_BREAKS, CONGESTION_LUT, congestion_rgba, fmt_num, rgba_column, tooltip_html
+from utils.link_tiles import load_tile_meta
+from utils.link_grid import LinkGrid, build_link_grid
+from utils.point_clusters import PointClusters
+from utils.road_graph import load_road_graph
+from utils.isochrones import Isochrones, compute_isochrones, link_travel_time
+from utils.traffic_assignment import AssignmentModel, build_assignment_model, load_link_capacity
+from utils.trip_impact import IMPACT_HOUR, TripImpact, peak_trips
+
+
+# 3사분면 KPI 캐시: 탭별로 자기 입력 튜플이 바뀔 때만 재계산 (프로세스 공유, 크기 제한)
+@st.cache_resource(show_spinner=False)
+def kpi_caches() -> dict:
+    return {
+        "scenario": BoundedCache(maxsize=64),
+        "tornado": BoundedCache(maxsize=64),
+        "montecarlo": BoundedCache(maxsize=16),
+    }
 
 # Altair/MPL/Plotly 스위치형: plot_speed가 없거나 로딩 실패하면 기존 함수로 폴백
 try:
-    from utils.traffic_plot import plot_speed
+    from utils.traffic_plot import plot_speed, altair_nearby_speed
     _HAS_PLOT_SPEED = True
 except Exception as e:
     print("utils.traffic_plot import fallback:", e)
@@ -62,17 +96,30 @@ PROJECTS_CSV_PATH = DATA_DIR / "seoul_redev_projects.csv"
 # 교통 기준년도 데이터 (엑셀 → CSV 자동 변환 대상)
 TRAFFIC_XLSX_PATH = DATA_DIR / "AverageSpeed(LINK).xlsx"
 TRAFFIC_CSV_PATH  = DATA_DIR / f"AverageSpeed_Seoul_{BASE_YEAR}.csv"
+# (선택) 교통량 CSV: link_id, hour, 차량대수 — 있으면 시간대 구간 교통량도 표시
+TRAFFIC_VOLUME_CSV_PATH = DATA_DIR / f"TrafficVolume_Seoul_{BASE_YEAR}.csv"
 
 # 도로망 레벨55 쉐이프
 SHP_PATH = DATA_DIR / "seoul_link_lev5.5_2023.shp"
-LINK_ID_COL = "k_link_id"  # ✅ SHP의 링크 컬럼명
+# 첨두시 OD (선택: o_lon, o_lat, d_lon, d_lat, trips — 없으면 격자 존 합성 OD로 배정)
+OD_CSV_PATH = DATA_DIR / "od_peak_trips.csv"
+
+# 사업지×반경 혼잡도 아틀라스 (python -m utils.site_atlas 로 사전 생성)
+SITE_ATLAS_PATH = DATA_DIR / "site_atlas.npz"
+# 전체 링크망 벡터 타일 (python -m utils.link_tiles → Streamlit 정적 서빙 app/static/)
+LINK_TILES_DIR = Path(__file__).resolve().parent / "static" / "link_tiles"
+LINK_TILE_URL = "app/static/link_tiles/{z}/{x}/{y}.pbf"
 
 #===========================캐시 비우기=================
 with st.sidebar:
     if st.button("캐시 비우기"):
         st.cache_data.clear()
-        st.session_state["matched_links_geojson"] = None
-        st.session_state["matched_links_geojson_daily"] = None
+        for _c in kpi_caches().values():
+            _c.clear()
+        if "traffic_graph_store" in st.session_state:
+            st.session_state["traffic_graph_store"].clear()
+        st.session_state["matched_links_paths_hourly"] = None
+        st.session_state["matched_links_paths_daily"] = None
         st.rerun()
 #======================================================
 
@@ -111,6 +158,7 @@ COORD_ENCODING = "utf-8-sig"  # (스마트 로더가 자동판별하므로 없
 @st.cache_data(show_spinner=False)
 def load_volume_csv(path: Path) -> pd.DataFrame:
     df = pd.read_csv(path)
+    df = with_link_key(df)  # 정수 조인 키 (적재 시 1회)
     df["link_id"] = df["link_id"].astype(str)
 
     # 시간 안전 정규화: "0시", " 08 ", "8.0" 등도 0~23으로 변환
@@ -125,17 +173,17 @@ def load_volume_csv(path: Path) -> pd.DataFrame:
 
 # 2) 교통량 가중 혼잡빈도강도(CFI) 계산
 def compute_cfi_weighted(speed_df: pd.DataFrame, vol_df: pd.DataFrame, boundary_speed: float = 30.0):
-    d = speed_df.copy()
-    d["link_id"] = d["link_id"].astype(str)
+    d = with_link_key(speed_df).copy()
     d["hour"] = d["hour"].astype(int)
     d["평균속도(km/h)"] = pd.to_numeric(d["평균속도(km/h)"], errors="coerce")
+    v = with_link_key(vol_df)
 
-    # merge
-    m = d.merge(vol_df, on=["link_id", "hour"], how="inner")
+    # merge (정수 키)
+    m = d.merge(v[["link_key", "hour", "차량대수"]], on=["link_key", "hour"], how="inner")
 
     # 혼잡 차량수(속도<=경계값) vs 전체 차량수
     m["혼잡차량수"] = (m["평균속도(km/h)"] <= boundary_speed).astype(int) * m["차량대수"]
-    g = m.groupby(["link_id", "hour"], as_index=False).agg(
+    g = m.groupby(["link_key", "link_id", "hour"], as_index=False).agg(
         전체차량수=("차량대수", "sum"),
         혼잡차량수=("혼잡차량수", "sum"),
     )
@@ -154,21 +202,19 @@ def compute_cfi_soft(
     시그모이드 기반의 '부드러운' 혼잡 확률을 만들어 교통량 가중 CFI 근사.
     """
     # --- 속도 데이터 정리 ---
-    d = speed_df.copy()
-    d["link_id"] = d["link_id"].astype(str)
+    d = with_link_key(speed_df).copy()
     d["hour"] = pd.to_numeric(d["hour"], errors="coerce").astype("Int64")  # allow NA
     d["평균속도(km/h)"] = pd.to_numeric(d["평균속도(km/h)"], errors="coerce")
 
     # --- 교통량 데이터 정리 ---
-    v = vol_df.copy()
-    v["link_id"] = v["link_id"].astype(str)
+    v = with_link_key(vol_df)[["link_key", "hour", "차량대수"]].copy()
     v["hour"] = pd.to_numeric(v["hour"], errors="coerce").astype("Int64") % 24
     v["차량대수"] = pd.to_numeric(v["차량대수"], errors="coerce").fillna(0)
 
-    # --- 병합 ---
-    m = d.merge(v, on=["link_id", "hour"], how="inner").dropna(subset=["평균속도(km/h)"])
+    # --- 병합 (정수 키) ---
+    m = d.merge(v, on=["link_key", "hour"], how="inner").dropna(subset=["평균속도(km/h)"])
     if m.empty:
-        out = m[["link_id","hour"]].copy()
+        out = m[["link_key", "link_id", "hour"]].copy()
         out["혼잡빈도강도(%)"] = 0.0
         out.attrs = {"boundary": np.nan, "mode": boundary_mode}
         return out
@@ -195,7 +241,7 @@ def compute_cfi_soft(
         return float((x[mask] * w[mask]).sum() / max(1e-9, w[mask].sum()))
 
     g = (
-        m.groupby(["link_id","hour"], as_index=False)
+        m.groupby(["link_key", "link_id", "hour"], as_index=False)
          .apply(lambda df: pd.Series({
              "혼잡빈도강도(%)": _wavg(df["p_cong"], df["차량대수"]) * 100.0
          }))
@@ -207,19 +253,6 @@ def compute_cfi_soft(
     g.attrs = {"boundary": vb, "mode": boundary_mode, "tau": tau}
     return g
 # === 색상 스케일: 절대/상대 선택 ===
-def color_by_value(v: float):
-    if pd.isna(v): return (200,200,200)
-    v = float(v)
-    if v < 30:   return (0, 200, 0)       # 초록
-    if v < 70:   return (255, 200, 0)     # 노랑
-    return (255, 0, 0)                    # 빨강
-
-def color_by_quantile(v: float, q30: float, q70: float):
-    if pd.isna(v): return (200,200,200)
-    if v < q30:   return (0, 200, 0)
-    if v < q70:   return (255, 200, 0)
-    return (255, 0, 0)
-
 
 
 @st.cache_data(show_spinner=False)
@@ -503,8 +536,7 @@ with col12_left:
     base_df = get_projects_by_gu(selected_gu)
     df_map = merge_projects_with_coords(selected_gu)
 
-    # 지도 자리만 먼저 확보 (필터/선택 적용 후 아래에서 실제 차트 렌더)
-    map_slot = st.empty()
+    # 지도는 필터/선택 적용 후 아래에서 render_map(fragment)으로 이 컬럼에 렌더
 
     if df_map.empty:
         st.warning("⚠️ 해당 구에 데이터가 없습니다.")
@@ -754,65 +786,353 @@ selected_site_name = df_map.loc[selected_row, "name"]
 st.session_state["selected_site"] = selected_site_name
 
 
+@st.cache_data(show_spinner=False)
+def site_metrics_by_gu(gu: str, radius_m: int) -> pd.DataFrame:
+    """
+    구 내 모든 사업지 지표 (사업지×링크 거리감쇠 희소행렬 W 1회 구축 → mat-vec)
+    - nearby_congestion  : 주변 링크 일평균 혼잡도의 거리감쇠(선형) 가중평균
+    - neighbor_households: 영향권이 겹치는 인접 사업지 세대수 누적 (겹침 비율 가중)
+    """
+    df = merge_projects_with_coords(gu)
+    if df.empty or not (TRAFFIC_CSV_PATH.exists() and SHP_PATH.exists()):
+        return pd.DataFrame(index=df.index, columns=["nearby_congestion", "neighbor_households"], dtype=float)
+    # 구 사업지 반경을 모두 덮는 창만 (아티팩트 없는 콜드 스타트에도 전체 SHP를 읽지 않음)
+    links = load_link_window_points(SHP_PATH, df["lon"], df["lat"], radius_m)
+    W = build_site_link_weights(SHP_PATH, df["lon"], df["lat"], radius_m=radius_m, kind="linear", links=links)
+    keys, daily = link_daily_congestion(TRAFFIC_CSV_PATH)
+    return pd.DataFrame({
+        "nearby_congestion": W.aggregate(daily, keys),
+        "neighbor_households": W.cumulative_exposure(df["households"].to_numpy(dtype=float)),
+    }, index=df.index)
+
+
 # ✅ 지도 데이터/레이어 만들기 (selected_row 확정 이후)
 filtered_indices = edited["orig_index"].tolist()
-map_data = df_map.loc[filtered_indices].reset_index(drop=True)
-
-# ⬇︎ 추가
-def _point_tooltip(row):
-    addr = row.get("address_display", "")
-    gu = row.get("gu", "")
-    hh = row.get("households", "")
-    la = row.get("land_area_m2", "")
-    return (f"<b>{addr}</b><br/>"
-            f"자치구: {gu}<br/>"
-            f"세대수: {hh}<br/>"
-            f"구역면적(m²): {la}")
-
-map_data = map_data.copy()
-map_data["tooltip_html"] = map_data.apply(_point_tooltip, axis=1)
-
-highlight_row = df_map.loc[[selected_row]].assign(_selected=True)
-highlight_row = highlight_row.copy()
-highlight_row["tooltip_html"] = highlight_row.apply(_point_tooltip, axis=1)
-
-
-sel_lat = float(df_map.loc[selected_row, "lat"])
-sel_lon = float(df_map.loc[selected_row, "lon"])
-view_state = pdk.ViewState(latitude=sel_lat, longitude=sel_lon, zoom=12.5)
-
-layer_points = pdk.Layer(
-    "ScatterplotLayer",
-    data=map_data,
-    get_position='[lon, lat]',
-    get_radius=60,
-    pickable=True,
-    get_fill_color=[255, 140, 0, 160],
-    get_line_color=[255, 255, 255],
-    line_width_min_pixels=0.5,
-)
+site_metrics = site_metrics_by_gu(selected_gu, int(st.session_state.get("radius_m", 1000)))
+df_map = df_map.join(site_metrics)
+
+def point_tooltips(df: pd.DataFrame) -> pd.Series:
+    """사업지 점 툴팁 (컬럼 단위 문자열 연산, 행 apply 없음)"""
+    cong = df["nearby_congestion"].to_numpy(dtype=float)
+    neigh = df["neighbor_households"].to_numpy(dtype=float)
+    return tooltip_html(
+        [
+            ("자치구: ", df["gu"]),
+            ("세대수: ", df["households"]),
+            ("구역면적(m²): ", df["land_area_m2"]),
+            ("주변 혼잡도(거리가중): ", fmt_num(cong, 1) + "%", np.isfinite(cong)),
+            ("인접 사업지 누적 세대(겹침가중): ", fmt_num(neigh, 0, thousands=True),
+             np.isfinite(neigh) & (np.nan_to_num(neigh) > 0)),
+        ],
+        title=df["address_display"],
+        index=df.index,
+    )
 
-highlight_row = df_map.loc[[selected_row]].assign(_selected=True)
-layer_highlight = pdk.Layer(
-    "ScatterplotLayer",
-    data=highlight_row,
-    get_position='[lon, lat]',
-    get_radius=150,
-    pickable=False,
-    get_fill_color=[0, 200, 255, 220],
-    get_line_color=[0, 0, 0],
-    line_width_min_pixels=1.2,
-)
 
-tooltip = {
-    "html": "{tooltip_html}",
-    "style": {"backgroundColor": "#0f172a", "color": "white"},
+def city_point_tooltips(df: pd.DataFrame) -> pd.Series:
+    """서울 전체 사업지 점 툴팁 (좌표 파일 컬럼만)"""
+    name = df["name"].fillna("").astype(str).str.strip()
+    return tooltip_html([("자치구: ", df["gu"]), ("사업명: ", name, ~name.isin(["", "nan"]))],
+                        title=df["address_display"], index=df.index)
+
+
+@st.cache_data(show_spinner=False)
+def load_city_sites() -> pd.DataFrame:
+    """좌표가 있는 서울 전체 사업지 (격자 개요용, 같은 좌표는 1개)"""
+    df = load_coords().dropna(subset=["lon", "lat"]).drop_duplicates(subset=["lon", "lat"])
+    addr = df["full_address"].replace("", pd.NA).fillna(df["address"]).fillna("")
+    return df.assign(address_display=addr)[["name", "gu", "address_display", "lon", "lat"]].reset_index(drop=True)
+
+
+def points_key(lon, lat) -> str:
+    """점 좌표 배열 내용 해시 — 사업지 목록(사업 CSV · 좌표 CSV · 구)이 바뀌면 달라짐"""
+    xy = np.column_stack([np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)])
+    return hashlib.sha1(np.ascontiguousarray(xy).tobytes()).hexdigest()
+
+
+@st.cache_resource(show_spinner=False)
+def load_site_clusters(scope: str, coords_key: str, _lon, _lat) -> PointClusters:
+    """사업지 좌표 → 줌별 격자 클러스터 (scope = 구 이름 / "서울 전체", 점 집합(coords_key)마다 1회)"""
+    return PointClusters(_lon, _lat)
+
+
+# 지도 점: 구 전체(df_map) 클러스터는 한 번만, 목록 필터는 mask로 (툴팁은 보이는 점만 지도에서 생성)
+site_mask = df_map.index.isin(filtered_indices)
+site_clusters = load_site_clusters(selected_gu, points_key(df_map["lon"], df_map["lat"]), df_map["lon"], df_map["lat"])
+highlight_row = df_map.loc[[selected_row], ["lon", "lat"]]
+
+current = df_map.loc[selected_row]
+sel_lat = float(current.get("lat", 37.5667))
+sel_lon = float(current.get("lon", 126.9784))
+
+
+# =============================================================
+# 🧩 사분면별 렌더 함수 (st.fragment)
+# - 각 사분면은 명시적 입력만 받아 렌더하며, 사분면 안의 위젯 조작은
+#   해당 fragment만 다시 실행한다 (다른 사분면/지도/SHP 질의는 재실행 X).
+# - 여러 사분면이 공유하는 입력(구/단지 선택, 반경, 지도 색 기준)은
+#   fragment 밖(본문)에 두어 변경 시 전체가 갱신되도록 한다.
+# =============================================================
+
+DISTANCE_MODES = ("직선", "도로망")   # 반경 거리 기준: 직선 거리 / 도로망 최단거리 (둘 다 지상 m)
+
+
+def traffic_data_version() -> tuple:
+    """교통 DAG 원천 파일 (SHP, 속도 CSV, 교통량 CSV) 수정시각 — 없는 파일은 0"""
+    return tuple(p.stat().st_mtime if p.exists() else 0.0
+                 for p in (SHP_PATH, TRAFFIC_CSV_PATH, TRAFFIC_VOLUME_CSV_PATH))
+
+
+def build_site_catchment(center_lon: float, center_lat: float, distance_mode: str = "직선",
+                         data_version: tuple = ()) -> SiteCatchment:
+    """
+    사업지 중심 → 최대 반경(3,000m) 링크 거리순 목록 + 누적 집계 (사업지·거리 기준당 1회 질의)
+    data_version: 원천 파일 버전 — 값은 쓰지 않고 DAG 키에만 (파일이 다시 만들어지면 하위 노드 전부 재계산)
+    """
+    if distance_mode == "도로망":
+        return SiteCatchment.build_network(SHP_PATH, TRAFFIC_CSV_PATH, center_lon, center_lat)
+    return SiteCatchment.build(SHP_PATH, TRAFFIC_CSV_PATH, center_lon, center_lat)
+
+
+def build_site_trip_impact(catchment: SiteCatchment, radius_m: int) -> TripImpact:
+    """반경 링크 거리감쇠(선형) 가중치 + 첨두시 관측 속도·자유류·차로 용량 → 사업지 1곳 TripImpact (3사분면)"""
+    k = catchment.cut(radius_m)
+    pairs = pd.DataFrame({"project_id": 0, "link_key": catchment.keys[:k], "distance_m": catchment.dist[:k]})
+    W = SiteLinkWeights.from_pairs(pairs, 1, radius_m, kind="linear")
+    return TripImpact.from_link_data(W, link_congestion(), load_link_capacity(SHP_PATH, W.link_keys))
+
+
+def load_nearby_speed(catchment: SiteCatchment, radius_m: int) -> pd.DataFrame:
+    """반경 내 모든 링크의 시간대별 평균속도 (반경 = 거리순 목록의 앞부분, SHP 재질의 X)"""
+    return speed_rows_for_keys(TRAFFIC_CSV_PATH, catchment.keys_within(radius_m), max_links=10000)
+
+
+# 혼잡도 계산 (링크 전체 사전계산 배열 인덱싱 — 반경 부분집합에서 자유류를 다시 구하지 않음)
+def link_congestion() -> LinkCongestion:
+    return load_link_congestion(TRAFFIC_CSV_PATH)
+
+
+def compute_congestion_from_speed(df_plot):
+    if df_plot is None or df_plot.empty:
+        return None
+    d = df_plot[["link_key", "link_id", "hour"]].copy()
+    d["value"] = link_congestion().lookup("congestion", d["link_key"].to_numpy(), hours=d["hour"].to_numpy())
+    return d
+
+
+def daily_mean_congestion(df_metric_all):
+    """링크별 일평균 혼잡도 (link_key 기준, 사전계산 daily 조회)"""
+    links = (df_metric_all.drop_duplicates("link_key").sort_values("link_key")
+             [["link_key", "link_id"]].reset_index(drop=True))
+    links["daily_value"] = link_congestion().lookup("daily", links["link_key"].to_numpy())
+    return links
+
+
+MAP_BASE_ZOOM = 12.5            # 반경 1,000m일 때 지도 줌 (반경 2배마다 -1)
+
+
+def map_zoom_for_radius(radius_m: float) -> float:
+    return float(np.clip(MAP_BASE_ZOOM - np.log2(max(radius_m, 1) / 1000), 11, 15))
+
+
+def attach_link_geometry(df_daily, center_lon: float, center_lat: float, radius_m: int):
+    """
+    일평균 혼잡도 + 링크 지오메트리(ragged 배열) 병합 → PathLayer 경량 프레임(path, link, daily_value)
+    지도 줌(반경 기준)에서 0.5px 이하 오차인 단순화 단계를 골라 꼭짓점 수를 줄인다.
+    """
+    keys = df_daily["link_key"].to_numpy()
+    links = load_link_window(SHP_PATH, center_lon, center_lat, radius_m / mercator_scale(center_lat))
+    if not links.index.contains(keys).all():  # 반경 밖 최근접 링크 fallback 등
+        links = load_link_arrays(SHP_PATH)
+    rows, src = links.index.rows(keys)
+    sub = links.take(rows).simplified(tolerance_for_zoom(map_zoom_for_radius(radius_m)))
+    return path_frame(
+        sub.to_lonlat(), sub.offsets,
+        link=sub.keys,
+        daily_value=df_daily["daily_value"].to_numpy(dtype=float)[src],
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_traffic_cube(speed_mtime: float, volume_mtime: float) -> HourCube:
+    """링크×시간대 누적합 큐브 (speed / congestion [+ volume]) — 원천 파일이 바뀔 때만 재구축"""
+    cube = HourCube.from_speed_csv(TRAFFIC_CSV_PATH)
+    if volume_mtime:
+        cube.add_long("volume", load_volume_csv(TRAFFIC_VOLUME_CSV_PATH), "차량대수")
+    return cube
+
+
+def traffic_cube() -> HourCube:
+    vol = TRAFFIC_VOLUME_CSV_PATH.stat().st_mtime if TRAFFIC_VOLUME_CSV_PATH.exists() else 0.0
+    return load_traffic_cube(TRAFFIC_CSV_PATH.stat().st_mtime, vol)
+
+
+def apply_hour_window(df_paths, hour_start: int, hour_end: int):
+    """시간대 구간 [start, end) 평균 혼잡도/속도(/교통량)를 링크별로 — 누적합 차분, groupby 없음"""
+    df_win = df_paths.copy()
+    if df_win.empty:
+        return df_win
+    cube = traffic_cube()
+    keys = df_win["link"].to_numpy()
+    df_win["value"] = cube.window_mean("congestion", hour_start, hour_end, keys=keys)
+    df_win["speed"] = cube.window_mean("speed", hour_start, hour_end, keys=keys)
+    if "volume" in cube.metrics:
+        df_win["volume"] = cube.window_mean("volume", hour_start, hour_end, keys=keys)
+    return df_win
+
+
+def hour_window_label(hour_start: int, hour_end: int) -> str:
+    return "일평균" if (hour_start, hour_end) == (0, 24) else f"{hour_start}–{hour_end}시 평균"
+
+
+# 지도 색 기준 → 상대 분위수 범위 (None = 절대 30/70)
+COLOR_MODES = {
+    "절대(30/70)": None,
+    "상대·반경(30%/70%)": "radius",
+    "상대·구(30%/70%)": "gu",
+    "상대·서울(30%/70%)": "city",
 }
 
 
-with col12_right:
-    st.markdown("### 🧾 [1사분면] · 기존 단지 정보")
-    current = df_map.loc[selected_row]
+@st.cache_resource(show_spinner=False)
+def load_quantile_tables(shp_mtime: float, csv_mtime: float) -> LinkQuantiles:
+    """서울/구별 혼잡도 분위수 표 (원천 파일 버전별 1회, 구간별 표는 첫 요청 때 스케치 1회)"""
+    return load_link_quantiles(SHP_PATH, TRAFFIC_CSV_PATH)
+
+
+def quantile_tables() -> LinkQuantiles:
+    return load_quantile_tables(SHP_PATH.stat().st_mtime, TRAFFIC_CSV_PATH.stat().st_mtime)
+
+
+def color_breaks(catchment: SiteCatchment, color_mode: str, radius_m: int, gu: str, window=None):
+    """
+    색 경계 (lo, hi) — 절대 기준 또는 사전계산 분위수 표 조회 (상호작용마다 percentile 계산 X)
+    window=(start, end): 구간 평균 분포 / None: 24개 시간대 값 전체(시간별 보기)
+    """
+    scope = COLOR_MODES.get(color_mode)
+    if scope is None:
+        return CONGESTION_BREAKS
+    if scope == "radius":
+        return catchment.breaks(radius_m, window)
+    return quantile_tables().breaks(gu if scope == "gu" else CITY_SCOPE, window)
+
+
+def window_color_breaks(catchment, color_mode: str, radius_m: int, gu: str, hour_start: int, hour_end: int):
+    return color_breaks(catchment, color_mode, radius_m, gu, (hour_start, hour_end))
+
+
+def hourly_color_breaks(catchment, color_mode: str, radius_m: int, gu: str):
+    return color_breaks(catchment, color_mode, radius_m, gu, None)
+
+
+def assign_link_colors(df_paths, breaks, hour_start: int = 0, hour_end: int = 24):
+    """색 경계(breaks 노드)에 따른 색상 + 툴팁 (캐시된 상위 출력은 복사 후 수정)"""
+    df_vis = df_paths.copy()
+    if df_vis.empty:
+        return None
+
+    # 색상: 시간대 구간 평균 혼잡도 기준 (경계 = 절대 30/70 또는 반경/구/서울 분위수 표)
+    df_vis["color"] = rgba_column(congestion_rgba(df_vis["value"], breaks=breaks))
+    label = hour_window_label(hour_start, hour_end)
+    lines = [
+        ("<b>링크:</b> ", df_vis["link"]),
+        (f"<b>{label} 혼잡도:</b> ", fmt_num(df_vis["value"], 1) + "%"),
+        (f"<b>{label} 속도:</b> ", fmt_num(df_vis["speed"], 1) + " km/h"),
+    ]
+    if "volume" in df_vis.columns:
+        lines.append((f"<b>{label} 교통량:</b> ", fmt_num(df_vis["volume"], 0, thousands=True) + "대"))
+    df_vis["tooltip_html"] = tooltip_html(lines, index=df_vis.index)
+    return df_vis
+
+
+HOUR_COLOR_COLS = [f"c{h:02d}" for h in range(24)]   # 시간별 PathLayer 색 컬럼 (get_color 접근자 이름)
+
+
+def hourly_link_colors(df_paths, breaks):
+    """
+    24개 시간대 색을 한 번에 계산한 PathLayer 프레임 (path, link, c00..c23, tooltip_html)
+    시간 슬라이더/재생은 get_color 접근자(c{h})만 바꾸므로 지오메트리·색 재계산이 없다.
+    상대 기준 경계는 24시간 전체 값의 분위수 표에서 조회(시간대 간 색 비교 가능).
+    """
+    if df_paths is None or df_paths.empty:
+        return None
+    hourly = traffic_cube().matrix("congestion")
+    rows, src = traffic_cube().index.rows(df_paths["link"].to_numpy())
+    values = np.full((len(df_paths), 24), np.nan)
+    values[src] = hourly[rows]
+
+    rgba = congestion_rgba(values, breaks=breaks)   # (n, 24, 4)
+
+    df_vis = df_paths[["path", "link"]].copy()
+    for h, col in enumerate(HOUR_COLOR_COLS):
+        df_vis[col] = rgba_column(rgba[:, h])
+    ok = np.isfinite(values)
+    has = ok.any(axis=1)
+    peak = np.argmax(np.where(ok, values, -np.inf), axis=1)
+    peak_val = values[np.arange(len(values)), peak]
+    peak_txt = pd.Series(peak).astype(str).to_numpy() + "시 (" + fmt_num(peak_val, 1).to_numpy() + "%)"
+    df_vis["tooltip_html"] = tooltip_html([
+        ("<b>링크:</b> ", df_vis["link"]),
+        ("<b>일평균 혼잡도:</b> ", fmt_num(df_paths["daily_value"], 1) + "%"),
+        ("<b>최대 혼잡 시간대:</b> ", np.where(has, peak_txt, "-")),
+    ], index=df_vis.index)
+    return df_vis
+
+
+def top_n_speed(df_plot_all, topn: int):
+    """평균속도 그래프용 Top-N (반경 내 전체에서 잘라냄, SHP 재질의 X)"""
+    keep = df_plot_all["link_key"].value_counts().head(topn).index
+    return df_plot_all[df_plot_all["link_key"].isin(keep)].sort_values(["link_key", "hour"])
+
+
+def top_n_congestion(df_metric_all, topn: int):
+    """혼잡도 그래프용 Top-N (일평균 혼잡도 상위)"""
+    rank = (
+        df_metric_all.groupby("link_key", as_index=False)["value"].mean()
+        .sort_values("value", ascending=False)
+        .head(topn)
+    )
+    return df_metric_all[df_metric_all["link_key"].isin(rank["link_key"])].copy()
+
+
+def build_traffic_graph(store: dict) -> ComputeGraph:
+    """
+    4-1/4-2사분면 교통 파이프라인 DAG
+      catchment(center_lon, center_lat, distance_mode, data_version) → nearby(radius_m) → congestion → daily
+        → geometry(path 프레임, 같은 bbox 창) → window(hour_start, hour_end) → colors
+        geometry → hourly(24개 시간대 색 한 번에)
+      catchment → breaks / hour_breaks(color_mode, radius_m, gu: 분위수 표 조회) → colors / hourly
+      nearby → speed_topn(topn) / congestion → congestion_topn(topn)
+      catchment → impact(radius_m: 세대 발생 통행 → 반경 링크 부하, 3사분면 혼잡도 입력)
+    반경만 바뀌면 catchment는 재사용 (이분 탐색으로 앞부분만 잘라 씀)
+    """
+    g = ComputeGraph(cache_size=8, store=store)
+    g.add("catchment", build_site_catchment, params=("center_lon", "center_lat", "distance_mode", "data_version"))
+    g.add("nearby", load_nearby_speed, deps=("catchment",), params=("radius_m",))
+    g.add("congestion", compute_congestion_from_speed, deps=("nearby",))
+    g.add("daily", daily_mean_congestion, deps=("congestion",))
+    g.add("geometry", attach_link_geometry, deps=("daily",), params=("center_lon", "center_lat", "radius_m"))
+    g.add("window", apply_hour_window, deps=("geometry",), params=("hour_start", "hour_end"))
+    g.add("breaks", window_color_breaks, deps=("catchment",),
+          params=("color_mode", "radius_m", "gu", "hour_start", "hour_end"))
+    g.add("hour_breaks", hourly_color_breaks, deps=("catchment",), params=("color_mode", "radius_m", "gu"))
+    g.add("colors", assign_link_colors, deps=("window", "breaks"), params=("hour_start", "hour_end"))
+    g.add("hourly", hourly_link_colors, deps=("geometry", "hour_breaks"))
+    g.add("speed_topn", top_n_speed, deps=("nearby",), params=("topn",))
+    g.add("congestion_topn", top_n_congestion, deps=("congestion",), params=("topn",))
+    g.add("impact", build_site_trip_impact, deps=("catchment",), params=("radius_m",))
+    return g
+
+
+# 그래프(노드 함수)는 매 실행 새로 만들고, 노드 메모만 세션에 유지 → 코드 재적재 후 옛 클로저를 쓰지 않음
+if "traffic_graph_store" not in st.session_state:
+    st.session_state["traffic_graph_store"] = {}
+traffic_graph = build_traffic_graph(st.session_state["traffic_graph_store"])
+
+
+@st.fragment
+def render_site_info(current: pd.Series):
+    """[1사분면] 기존 단지 정보"""
     with st.container(border=True):
         st.markdown("**기존 단지 정보**")
         st.markdown(
@@ -823,10 +1143,357 @@ with col12_right:
             f"- 정비구역면적: **{int(current['land_area_m2']):,} m²**"
         )
 
-    # ✅ 여기 두 줄 추가: (1) 라디오 놓을 자리 (2) 범례 자리
-    color_controls_slot = st.container()
-    legend_slot = st.empty()
 
+MAP_PLAY_INTERVAL_S = 0.8   # 시간별 재생 간격(초)
+CLUSTER_POINT_ZOOM = 12     # 이 줌 이상은 사업지를 개별 점으로 (미만은 격자 클러스터)
+
+
+def site_point_layers(points: pd.DataFrame, clusters: PointClusters, zoom: float, mask=None,
+                      tooltip_fn=point_tooltips) -> list:
+    """
+    사업지 점 레이어 — 저줌은 클러스터 버블(개수) + 단독 점, 고줌은 개별 점
+    툴팁 문자열은 실제로 그려지는 단독 점에 대해서만 만들고, 전송 컬럼은 lon/lat/툴팁만.
+    """
+    if zoom >= CLUSTER_POINT_ZOOM:
+        single = points if mask is None else points[np.asarray(mask, dtype=bool)]
+        bubbles = None
+    else:
+        c = clusters.clusters(zoom, mask)
+        single = points.iloc[c.loc[c["count"] == 1, "member"].to_numpy()]
+        bubbles = c[c["count"] > 1].reset_index(drop=True)
+    single = pd.DataFrame({"lon": single["lon"], "lat": single["lat"], "tooltip_html": tooltip_fn(single)})
+    layers = [pdk.Layer(
+        "ScatterplotLayer",
+        data=single,
+        get_position='[lon, lat]',
+        get_radius=60,
+        pickable=True,
+        get_fill_color=[255, 140, 0, 160],
+        get_line_color=[255, 255, 255],
+        line_width_min_pixels=0.5,
+    )]
+    if bubbles is not None and len(bubbles):
+        bubbles = pd.DataFrame({
+            "lon": bubbles["lon"], "lat": bubbles["lat"],
+            "r": 8 + 3 * np.sqrt(bubbles["count"].to_numpy()),
+            "label": bubbles["count"].astype(str),
+            "tooltip_html": tooltip_html([("<b>사업지</b> ", bubbles["count"].astype(str) + "곳"),
+                                          ("", np.full(len(bubbles), "확대(반경 축소)하면 개별 표시"))]),
+        })
+        layers += [
+            pdk.Layer(
+                "ScatterplotLayer",
+                data=bubbles,
+                get_position='[lon, lat]',
+                get_radius="r",
+                radius_units="pixels",
+                pickable=True,
+                get_fill_color=[255, 140, 0, 200],
+                get_line_color=[255, 255, 255],
+                stroked=True,
+                line_width_min_pixels=1,
+            ),
+            pdk.Layer(
+                "TextLayer",
+                data=bubbles,
+                get_position='[lon, lat]',
+                get_text="label",
+                get_size=12,
+                get_color=[255, 255, 255],
+                get_alignment_baseline="'center'",
+            ),
+        ]
+    return layers
+
+
+def _tile_color_expr() -> str:
+    """MVT 피처 색 (클라이언트 JS 식, 절대 기준) — 속성 daily가 없으면 회색"""
+    green, yellow, red, gray = (str(c[:3].tolist() + [140]) for c in CONGESTION_LUT)
+    lo, hi = CONGESTION_BREAKS
+    return (f"properties.daily == null ? {gray} : properties.daily < {lo:g} ? {green} : "
+            f"properties.daily < {hi:g} ? {yellow} : {red}")
+
+
+GRID_SIZES_M = (250, 500, 1000)   # 격자 개요 셀 크기(육각 외접원 반지름, EPSG:3857 m)
+GRID_VIEW_ZOOM = 10.5
+
+
+@st.cache_resource(show_spinner=False)
+def load_link_grid(size_m: int, shp_mtime: float, csv_mtime: float) -> LinkGrid:
+    """서울 전역 링크 혼잡도 육각 격자 (셀 크기·원천 파일별 1회)"""
+    return build_link_grid(SHP_PATH, TRAFFIC_CSV_PATH, size=size_m, kind="hex")
+
+
+def link_grid_layer(grid: LinkGrid, center_lat: float, hour=None) -> pdk.Layer:
+    """격자 셀 기둥 (높이·색 = 길이가중 평균 혼잡도, hour 지정 시 그 시간대)"""
+    df = grid.frame(hour)
+    df["color"] = rgba_column(congestion_rgba(df["value"]))
+    label = "일평균" if hour is None else f"{hour}시"
+    df["tooltip_html"] = tooltip_html([
+        ("<b>격자 링크 수:</b> ", df["n_links"]),
+        (f"<b>{label} 혼잡도(길이가중):</b> ", fmt_num(df["value"], 1) + "%"),
+    ])
+    return pdk.Layer(
+        "ColumnLayer",
+        data=df,
+        get_position="[lon, lat]",
+        get_elevation="value",
+        elevation_scale=20,
+        radius=grid.ground_radius_m(center_lat),
+        disk_resolution=6,
+        coverage=0.92,
+        extruded=True,
+        get_fill_color="color",
+        pickable=True,
+        auto_highlight=True,
+    )
+
+
+def link_tile_layer(meta: dict) -> pdk.Layer:
+    """서울 전체 링크망 MVTLayer — 화면에 보이는 타일만 브라우저가 요청"""
+    return pdk.Layer(
+        "MVTLayer",
+        data=LINK_TILE_URL,
+        min_zoom=meta["min_zoom"],
+        max_zoom=meta["max_zoom"],
+        pickable=True,
+        auto_highlight=True,
+        get_line_color=_tile_color_expr(),
+        get_line_width=1,
+        line_width_units="pixels",
+        line_width_min_pixels=1,
+    )
+
+
+ISOCHRONE_BASE_HOUR = 8         # 시간별 보기를 끄면 등시선·접근성 KPI 기준 시각 (오전 첨두)
+ISOCHRONE_FILL = {5: [29, 78, 216, 90], 10: [59, 130, 246, 60], 15: [147, 197, 253, 45]}
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_gu_isochrones(gu: str, coord_mtime: float, shp_mtime: float, csv_mtime: float, _lon, _lat):
+    """
+    구 사업지 전체 × 24시간 등시선 (도로 그래프 · 시간대 속도, 구·원천 파일 버전별 1회)
+    반환: (Isochrones | None, 사업지 행 → 출발 번호 (-1 = 좌표 없음))
+    """
+    lon, lat = np.asarray(_lon, dtype=float), np.asarray(_lat, dtype=float)
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    src_of = np.full(len(lon), -1, dtype=np.int64)
+    if not valid.any():
+        return None, src_of
+    graph = load_road_graph(SHP_PATH)
+    x, y = lonlat_to_mercator(lon[valid], lat[valid])
+    travel_time = link_travel_time(graph, link_congestion().lookup("speed", graph.link_keys))
+    src_of[valid] = np.arange(int(valid.sum()))
+    return compute_isochrones(graph, travel_time, graph.nearest_node(x, y)), src_of
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_site_isochrone_polygons(gu: str, source: int, coord_mtime: float, shp_mtime: float, csv_mtime: float,
+                                 _iso: Isochrones) -> pd.DataFrame:
+    """사업지 1곳 × 24시간 × 5/10/15분 등시선 폴리곤 (PolygonLayer 프레임, 큰 분부터 그림)"""
+    df = _iso.polygons_frame(source).sort_values(["hour", "minutes"], ascending=[True, False])
+    df["color"] = df["minutes"].map(ISOCHRONE_FILL)
+    df["tooltip_html"] = tooltip_html([
+        ("<b>등시선:</b> ", df["minutes"].astype(str) + "분 · " + df["hour"].astype(str) + "시"),
+        ("<b>도달 도로:</b> ", fmt_num(df["reach_km"], 0, thousands=True) + " km"),
+    ], index=df.index)
+    return df.reset_index(drop=True)
+
+
+def site_isochrones(gu: str, row: int, lon, lat):
+    """
+    선택 사업지 등시선 — 등시선 토글·접근성 KPI를 켤 때만 호출 (구 전체 계산은 구별 1회 캐시)
+    반환: (Isochrones, 출발 번호, 폴리곤 프레임) / 좌표 없으면 None
+    """
+    mtimes = (COORD_CSV_PATH.stat().st_mtime, SHP_PATH.stat().st_mtime, TRAFFIC_CSV_PATH.stat().st_mtime)
+    with st.spinner("구 사업지 등시선 계산 중..."):
+        iso, source_of = load_gu_isochrones(gu, *mtimes, lon, lat)
+    source = int(source_of[row])
+    if iso is None or source < 0:
+        return None
+    return iso, source, load_site_isochrone_polygons(gu, source, *mtimes, iso)
+
+
+def isochrone_layer(polygons: pd.DataFrame, hour: int) -> pdk.Layer:
+    return pdk.Layer(
+        "PolygonLayer",
+        data=polygons[polygons["hour"] == hour][["polygon", "color", "tooltip_html"]],
+        get_polygon="polygon",
+        get_fill_color="color",
+        get_line_color=[29, 78, 216, 160],
+        line_width_min_pixels=1,
+        stroked=True,
+        pickable=True,
+    )
+
+
+def render_map(site_points: pd.DataFrame, site_mask, site_clusters: PointClusters, highlight_row: pd.DataFrame,
+               center_lat: float, center_lon: float, paths_daily, paths_hourly, zoom: float = MAP_BASE_ZOOM,
+               isochrones=None):
+    """[1-2사분면] 지도 — 재생 중이면 지도 fragment만 run_every로 갱신 (앱 전체 재실행 X)"""
+    playing = (paths_hourly is not None and st.session_state.get("map_by_hour", False)
+               and st.session_state.get("map_hour_play", False))
+    st.fragment(_render_map_fragment, run_every=MAP_PLAY_INTERVAL_S if playing else None)(
+        site_points, site_mask, site_clusters, highlight_row, center_lat, center_lon,
+        paths_daily, paths_hourly, playing, zoom, isochrones
+    )
+
+
+def _render_map_fragment(site_points, site_mask, site_clusters, highlight_row, center_lat, center_lon,
+                         paths_daily, paths_hourly, playing, zoom, isochrones=None):
+    """[1-2사분면] 지도 (전체 링크 타일 → 격자 개요 | hourly(시간 슬라이더) | daily → points/highlight)"""
+    view_state = pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=zoom)
+
+    hour = None
+    if paths_hourly is not None and not paths_hourly.empty:
+        c_mode, c_hour, c_play = st.columns([1.2, 3, 1])
+        with c_mode:
+            by_hour = st.toggle("시간별 보기", key="map_by_hour")
+        if by_hour:
+            if "map_hour" not in st.session_state:
+                st.session_state["map_hour"] = 8
+            elif playing:
+                # 재생: fragment 주기 실행마다 한 시간씩 (위젯 생성 전에 상태 갱신)
+                st.session_state["map_hour"] = (st.session_state["map_hour"] + 1) % 24
+            with c_hour:
+                hour = st.slider("시간대(시)", 0, 23, key="map_hour")
+            with c_play:
+                st.toggle("▶ 재생", key="map_hour_play")
+        if (by_hour and st.session_state.get("map_hour_play", False)) != playing:
+            st.rerun()   # 재생 시작/정지 → 지도 fragment의 run_every 재설정
+
+    layers = []
+    c_grid, c_size, c_tiles, c_iso = st.columns([1.2, 2, 2, 1.6])
+    with c_grid:
+        overview = st.toggle("격자 개요", key="map_grid_overview",
+                             help="서울 전역 링크 혼잡도를 육각 격자로 집계해 먼저 훑어보기")
+    # 0) 서울 전체 링크망 (벡터 타일, 맨 아래)
+    tile_meta = load_tile_meta(LINK_TILES_DIR, SHP_PATH, TRAFFIC_CSV_PATH)
+    if not overview and tile_meta is not None:
+        with c_tiles:
+            if st.toggle("서울 전체 링크망", key="map_all_links", help="벡터 타일, 일평균 혼잡도"):
+                layers.append(link_tile_layer(tile_meta))
+    # 0-1) 등시선 (시간별 보기면 그 시각, 아니면 오전 첨두 기준) — isochrones: 켤 때만 부르는 로더
+    if not overview and isochrones is not None:
+        with c_iso:
+            iso_on = st.toggle("등시선", key="map_isochrones", help="도로망 통행시간 5/10/15분 도달권 (시간대 속도 기준)")
+        iso_hit = isochrones() if iso_on else None
+        if iso_hit is not None and not iso_hit[2].empty:
+            layers.append(isochrone_layer(iso_hit[2], ISOCHRONE_BASE_HOUR if hour is None else hour))
+    # 1) 격자 개요: 반경 링크 대신 셀 기둥만 (기울여 넓게 보기)
+    if overview:
+        with c_size:
+            size_m = st.select_slider("셀 크기(m)", GRID_SIZES_M, value=500, key="map_grid_size")
+        grid = load_link_grid(size_m, SHP_PATH.stat().st_mtime, TRAFFIC_CSV_PATH.stat().st_mtime)
+        layers.append(link_grid_layer(grid, center_lat, hour))
+        view_state = pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=GRID_VIEW_ZOOM, pitch=40)
+        # 개요에서는 서울 전체 사업지를 클러스터로
+        city = load_city_sites()
+        site_points, site_mask, zoom = city, None, GRID_VIEW_ZOOM
+        site_clusters = load_site_clusters("서울 전체", points_key(city["lon"], city["lat"]), city["lon"], city["lat"])
+    # 2) 시간별 보기: 24시간 색을 미리 담은 프레임에서 접근자(c{h})만 교체
+    elif hour is not None:
+        layers.append(pdk.Layer(
+            "PathLayer",
+            data=paths_hourly,
+            pickable=True,
+            auto_highlight=True,
+            get_path="path",
+            get_color=HOUR_COLOR_COLS[hour],
+            width_units="pixels",
+            width_min_pixels=3,
+            get_width=3,
+        ))
+    # 3) 기본: 시간대 구간 평균 혼잡도 PathLayer (path/color/툴팁 컬럼만 전송)
+    elif paths_daily is not None and not paths_daily.empty:
+        layer_links = pdk.Layer(
+            "PathLayer",
+            data=paths_daily,
+            pickable=True,
+            auto_highlight=True,
+            get_path="path",
+            get_color="color",
+            width_units="pixels",
+            width_min_pixels=3,
+            get_width=3,
+        )
+        layers.append(layer_links)
+
+    # 4) 사업지 점(저줌은 클러스터)/하이라이트는 항상 추가
+    layers += site_point_layers(site_points, site_clusters, zoom, site_mask,
+                                city_point_tooltips if overview else point_tooltips)
+    layer_highlight = pdk.Layer(
+        "ScatterplotLayer",
+        data=highlight_row,
+        get_position='[lon, lat]',
+        get_radius=150,
+        pickable=False,
+        get_fill_color=[0, 200, 255, 220],
+        get_line_color=[0, 0, 0],
+        line_width_min_pixels=1.2,
+    )
+    layers.append(layer_highlight)
+
+    tooltip = {
+        "html": "{tooltip_html}",
+        "style": {"backgroundColor": "#0f172a", "color": "white"},
+    }
+    st.pydeck_chart(
+        pdk.Deck(
+            layers=layers,
+            initial_view_state=view_state,
+            tooltip=tooltip,
+        )
+    )
+    if hour is not None:
+        st.caption(f"🕒 {hour}시 혼잡도 (구간 {hour}–{hour + 1}시) · 색 기준은 지도 색 기준과 동일")
+
+
+@st.fragment
+def render_congestion_charts(graph: ComputeGraph, traffic_params: dict):
+    """[4-1/4-2사분면] 평균속도·혼잡도 그래프 (Top-N 슬라이더는 이 fragment만 재실행)"""
+    graph_topn = st.slider("그래프에 표시할 링크 수 (Top-N)", 5, 50, 10, 1, key="graph_topn")
+
+    # ✅ A) 그래프용 — 평균속도 Top-N만 표시 (Top-N 노드만 재계산)
+    if _HAS_PLOT_SPEED:
+        df_speed = graph.evaluate("speed_topn", **traffic_params, topn=graph_topn)
+        st.altair_chart(altair_nearby_speed(df_speed, height=280), use_container_width=True, theme=None)
+
+    st.markdown("### 📈 [4-2사분면] 혼잡지표 (혼잡도)")
+    y_title = "혼잡도 (0=자유주행, 100=매우혼잡)"
+
+    # === 그래프: Top-N 링크만 ===
+    df_metric_chart = graph.evaluate("congestion_topn", **traffic_params, topn=graph_topn)
+
+    chart = (
+        alt.Chart(df_metric_chart)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("hour:Q", title="시간대 (시)"),
+            y=alt.Y("value:Q", title=y_title, scale=alt.Scale(domain=[0, 100])),
+            color=alt.Color("link_id:N", title="링크 ID",
+                            legend=alt.Legend(orient="bottom", direction="horizontal", columns=4)),
+            tooltip=[
+                alt.Tooltip("link_id:N", title="링크"),
+                alt.Tooltip("hour:Q", title="시"),
+                alt.Tooltip("value:Q", title=y_title, format=".1f"),
+            ],
+        )
+        .properties(title=f"혼잡도 변화 추이 — Top {graph_topn}", width=1000, height=400)
+        .configure_view(strokeWidth=0)
+    )
+    st.altair_chart(chart, use_container_width=False, theme=None)
+
+    # === 정의 설명 ===
+    st.markdown("### 🧮 혼잡도(%) 정의")
+    st.markdown("- 링크 $(l)$, 시간대 $(h)$에서의 평균속도를 $v_{l,h}$ 라 할 때,")
+    st.latex(r"v_{\mathrm{ff},l}=\max v_{l,h}")
+    st.latex(r"\mathrm{혼잡도}_{l,h}(\%)=\Big(1-\min\big(1,\frac{v_{l,h}}{v_{\mathrm{ff},l}}\big)\Big)\times 100")
+    st.markdown("- 값의 의미: **0% = 자유주행**, **100% = 매우 혼잡**")
+
+    with st.expander("⚙️ 교통 파이프라인 노드 현황", expanded=False):
+        st.dataframe(pd.DataFrame.from_dict(graph.stats(), orient="index"), use_container_width=True)
+        st.caption("노드 입력(파라미터 + 상위 노드 키)이 같으면 재계산하지 않습니다 (runs = 실제 계산 횟수).")
 
 
 # 3–4사분면 레이아웃 컬럼
@@ -841,284 +1508,218 @@ with st.spinner("교통 기준년도 데이터 준비 중..."):
         st.warning(f"기준 CSV가 없습니다: {TRAFFIC_CSV_PATH.name}\n"
                    f"→ data 폴더에 {TRAFFIC_XLSX_PATH.name} 를 넣으면 자동 변환됩니다.")
 
-sel_lat = float(current.get("lat", 37.5667))
-sel_lon = float(current.get("lon", 126.9784))
-
-def _to_norm_str_id(s):
-    return (
-        pd.Series(s, dtype="object")
-          .astype(str)
-          .str.replace(r"\.0$", "", regex=True)
-          .str.strip()
-    )
-
 with col3:
     st.markdown("### 🚦 [4-1사분면] · 주변 도로 혼잡도 (기준년도)")
-
+    # 반경은 지도·그래프가 공유하는 입력 → fragment 밖(전체 갱신)
     radius = st.slider("반경(m)", 500, 3000, 1000, step=250, key="radius_m")
-    graph_topn = st.slider("그래프에 표시할 링크 수 (Top-N)", 5, 50, 10, 1, key="graph_topn")
-
-    df_plot_all = None
-
-    # ✅ A) 그래프용 — 평균속도 Top-N만 표시
-    if TRAFFIC_CSV_PATH.exists() and SHP_PATH.exists():
-        if _HAS_PLOT_SPEED:
-            chart_speed, df_speed = plot_speed(
-                csv_path=TRAFFIC_CSV_PATH,
-                shp_path=SHP_PATH,
-                center_lon=sel_lon,
-                center_lat=sel_lat,
-                radius_m=radius,
-                max_links=graph_topn,  # 그래프: Top-N만
-                renderer="altair",
-                chart_height=280,
-            )
-            st.altair_chart(chart_speed, use_container_width=True, theme=None)
-
-            # ✅ B) 지도용 — 반경 내 모든 링크 (혼잡도 계산용)
-            _, df_plot_all = plot_speed(
-                csv_path=TRAFFIC_CSV_PATH,
-                shp_path=SHP_PATH,
-                center_lon=sel_lon,
-                center_lat=sel_lat,
-                radius_m=radius,
-                max_links=10000,  # 지도: 반경 내 전부
-                renderer="altair",
-                chart_height=1,  # 더미 (표시 안 함)
-            )
-        else:
-            # fallback (plot_speed 불가 시)
-            _fig_ignored, df_plot_all = plot_nearby_speed_from_csv(
-                csv_path=TRAFFIC_CSV_PATH,
-                shp_path=SHP_PATH,
-                center_lon=sel_lon,
-                center_lat=sel_lat,
-                radius_m=radius,
-                max_links=10000,
-            )
-    else:
-        st.info("교통 CSV 또는 SHP가 없어 그래프/지도 데이터를 만들 수 없습니다.")
+    distance_mode = st.radio("거리 기준", DISTANCE_MODES, index=0, horizontal=True, key="distance_mode",
+                             help="도로망: 사업지 최근접 교차로에서 도로를 따라 잰 거리 (강·고속도로 건너편 제외)")
+
+traffic_params = dict(center_lon=sel_lon, center_lat=sel_lat, radius_m=radius, distance_mode=distance_mode,
+                      data_version=traffic_data_version())
+df_plot_all = None
+df_metric_all = None
+scenario_impact = None          # 3사분면 혼잡도 입력: 사업지 반경 링크 모형
+if TRAFFIC_CSV_PATH.exists() and SHP_PATH.exists():
+    df_plot_all = traffic_graph.evaluate("nearby", **traffic_params)
+    scenario_impact = traffic_graph.evaluate("impact", **traffic_params)
+    df_metric_all = traffic_graph.evaluate("congestion", **traffic_params)
 
-    # === 혼잡도 계산 ===
-    if (df_plot_all is not None) and (not df_plot_all.empty):
-        st.markdown("### 📈 [4-2사분면] 혼잡지표 (혼잡도)")
-
-        # 혼잡도 계산
-        def compute_congestion_from_speed(df_plot):
-            d = df_plot.copy()
-            d["평균속도(km/h)"] = pd.to_numeric(d["평균속도(km/h)"], errors="coerce")
-            d["free_flow"] = d.groupby("link_id")["평균속도(km/h)"].transform("max").clip(lower=1)
-            d["혼잡도(%)"] = ((1 - (d["평균속도(km/h)"] / d["free_flow"]).clip(0, 1)) * 100).clip(0, 100)
-            return d.rename(columns={"혼잡도(%)": "value"})[["link_id", "hour", "value"]]
-
-        df_metric_all = compute_congestion_from_speed(df_plot_all)
-        y_title = "혼잡도 (0=자유주행, 100=매우혼잡)"
-
-        # 일평균 계산
-        df_daily = (
-            df_metric_all.groupby("link_id", as_index=False)["value"].mean()
-            .rename(columns={"value": "daily_value"})
-        )
-        df_daily["link_id_norm"] = (
-            pd.Series(df_daily["link_id"], dtype="object")
-            .astype(str)
-            .str.replace(r"\.0$", "", regex=True)
-            .str.strip()
-        )
-
-        gdf_link = gpd.read_file(SHP_PATH)[[LINK_ID_COL, "geometry"]]
-        if gdf_link.crs and gdf_link.crs.to_epsg() != 4326:
-            gdf_link = gdf_link.to_crs(epsg=4326)
-        gdf_link["link_id_norm"] = (
-            gdf_link[LINK_ID_COL].astype(str)
-            .str.replace(r"\.0$", "", regex=True)
-            .str.strip()
+with col12_right:
+    st.markdown("### 🧾 [1사분면] · 기존 단지 정보")
+    render_site_info(current)
+
+    # === 지도 색 기준 (단 1개만 사용, 키 고유화) — 지도와 범례가 공유하는 입력 ===
+    if df_metric_all is not None:
+        color_mode_key = f"color_mode_daily__{selected_gu}"
+        st.radio(
+            "지도 색 기준",
+            list(COLOR_MODES),
+            index=0,
+            horizontal=True,
+            key=color_mode_key,
         )
-
-        gdf_vis = gdf_link.merge(df_daily, on="link_id_norm", how="inner")
-
-        # === 지도 색 기준 (단 1개만 사용, 키 고유화) ===
-        # ✅ (교체) — 라디오를 1사분면 아래의 slot에 렌더
-        with color_controls_slot:
-            color_mode_key = f"color_mode_daily__{selected_gu}"
-            st.radio(
-                "지도 색 기준",
-                ["절대(30/70)", "상대(30%/70%)"],
-                index=0,
-                horizontal=True,
-                key=color_mode_key,
-            )
-            st.caption("절대: 30/70 고정 · 상대: 반경 내 분포의 30/70 분위수")
+        st.caption("절대: 30/70 고정 · 상대: 반경/구/서울 전체 링크 분포의 30/70 분위수 (데이터셋별 사전계산 표)")
+
+        # 시간대 구간 (누적합 큐브 차분 → 재질의 없이 즉시 재색칠)
+        window_options = list(HOUR_WINDOWS) + ["사용자 지정"]
+        window_name = st.radio("시간대 구간", window_options, index=0, horizontal=True,
+                               key=f"hour_window__{selected_gu}")
+        if window_name == "사용자 지정":
+            hour_start, hour_end = st.slider("구간 [시작, 끝) 시", 0, 24, (7, 10),
+                                             key=f"hour_window_custom__{selected_gu}")
+            if hour_start == hour_end:
+                # 빈 구간이면 지도 전체가 결측 → 해당 한 시간으로 보정
+                hour_start, hour_end = (23, 24) if hour_end == 24 else (hour_start, hour_start + 1)
+                st.caption(f"시작 = 끝이라 {hour_start:02d}시 한 시간만 표시합니다.")
+        else:
+            hour_start, hour_end = HOUR_WINDOWS[window_name]
 
         # 선택값 세션에서 꺼내 쓰기
         color_mode = st.session_state.get(color_mode_key, "절대(30/70)")
         st.session_state["color_mode_daily_val"] = color_mode
-
-        # 색상 계산 분기 (그대로 사용)
-        if not gdf_vis.empty:
-            if color_mode.startswith("상대"):
-                q30 = float(np.nanpercentile(gdf_vis["daily_value"], 30))
-                q70 = float(np.nanpercentile(gdf_vis["daily_value"], 70))
-                cols = list(zip(*gdf_vis["daily_value"].apply(lambda x: color_by_quantile(x, q30, q70))))
-            else:
-                cols = list(zip(*gdf_vis["daily_value"].apply(color_by_value)))
-            gdf_vis["color_r"], gdf_vis["color_g"], gdf_vis["color_b"] = cols[0], cols[1], cols[2]
-            gdf_vis["tooltip_html"] = (
-                    "<b>링크:</b> " + gdf_vis["link_id_norm"].astype(str)
-                    + "<br/><b>일평균 혼잡도:</b> " + gdf_vis["daily_value"].round(1).astype(str) + "%"
+        color_params = dict(**traffic_params, color_mode=color_mode, gu=selected_gu)
+        st.session_state["matched_links_paths_daily"] = traffic_graph.evaluate(
+            "colors", **color_params, hour_start=hour_start, hour_end=hour_end
+        )
+        st.session_state["matched_links_paths_hourly"] = traffic_graph.evaluate("hourly", **color_params)
+
+        # ✅ 범례도 1사분면 아래에 출력
+        if st.session_state.get("matched_links_paths_daily") is not None:
+            lo, hi = traffic_graph.evaluate("breaks", **color_params, hour_start=hour_start, hour_end=hour_end)
+            legend_text = f"🟩 <{lo:.1f} · 🟨 {lo:.1f}~{hi:.1f} · 🟥 ≥{hi:.1f} (단위: %)"
+            st.caption(f"{legend_text} · 기준: {hour_window_label(hour_start, hour_end)} 혼잡도")
+
+            with st.expander("혼잡도 분위수 표 (반경 · 구 · 서울)"):
+                window = (hour_start, hour_end)
+                radius_q = traffic_graph.evaluate("catchment", **traffic_params).quantiles(window)
+                city_q = quantile_tables().table(window)
+                q_rows = radius_q.loc[[radius]].rename(index={radius: f"반경 {radius:,}m"})
+                q_rows = pd.concat([q_rows, city_q.loc[[g for g in (selected_gu, CITY_SCOPE) if g in city_q.index]]])
+                st.dataframe(q_rows.round(1), use_container_width=True)
+
+@st.cache_resource(show_spinner=False)
+def load_site_atlas(mtime: float):
+    """사전계산 아틀라스 (파일 수정시각이 바뀌면 다시 로드)"""
+    try:
+        atlas = SiteAtlas.load(SITE_ATLAS_PATH)
+    except Exception as e:
+        print("site atlas load skipped:", e)
+        return None
+    return atlas if atlas.is_fresh(SHP_PATH, TRAFFIC_CSV_PATH) else None
+
+
+def render_site_atlas_summary(entry: dict, radius_m: int):
+    """[4-1사분면] 반경 요약 (아틀라스 조회 또는 거리순 목록 prefix — 지오메트리 계산 없이 즉시 표시)"""
+    prof = entry["hourly"].dropna()
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"반경 {radius_m:,}m 링크 수", f"{entry['n_links']:,}")
+    c2.metric("일평균 혼잡도", f"{entry['daily']:.1f}%" if np.isfinite(entry["daily"]) else "-")
+    if not prof.empty:
+        peak = prof.loc[prof["value"].idxmax()]
+        c3.metric("최대 혼잡 시간대", f"{int(peak['hour'])}시", f"{peak['value']:.1f}%", delta_color="off")
+        st.altair_chart(
+            alt.Chart(prof).mark_area(opacity=0.35, line=True)
+            .encode(
+                x=alt.X("hour:Q", title="시간대 (시)"),
+                y=alt.Y("value:Q", title="반경 내 평균 혼잡도(%)", scale=alt.Scale(domain=[0, 100])),
+                tooltip=[alt.Tooltip("hour:Q", title="시"), alt.Tooltip("value:Q", title="혼잡도(%)", format=".1f")],
+            )
+            .properties(height=160),
+            use_container_width=True,
+        )
+    if "buckets" in entry:
+        b = entry["buckets"]
+        st.caption(f"🟩 <30: {b['green']:,} · 🟨 30~70: {b['yellow']:,} · 🟥 ≥70: {b['red']:,} (링크 수)")
+    if not entry["top"].empty:
+        with st.expander("혼잡 상위 링크", expanded=False):
+            st.dataframe(
+                entry["top"].rename(columns={"link_key": "링크", "daily_value": "일평균 혼잡도(%)"}).round(1),
+                use_container_width=True, hide_index=True,
             )
-            st.session_state["matched_links_geojson_daily"] = json.loads(gdf_vis.to_json())
-        else:
-            st.session_state["matched_links_geojson_daily"] = None
 
-        # ✅ 범례도 1사분면 아래의 legend_slot에 출력
-        if st.session_state.get("matched_links_geojson_daily"):
-            cmode = st.session_state.get("color_mode_daily_val", "절대(30/70)")
-            legend_text = "🟩 <30% 분위 · 🟨 30~70% · 🟥 ≥70%" if cmode.startswith("상대") \
-                else "🟩 <30 · 🟨 30~70 · 🟥 ≥70 (단위: %)"
-            legend_slot.caption(legend_text)
 
+def render_accessibility_kpi(iso: Isochrones, source: int, hour: int = ISOCHRONE_BASE_HOUR):
+    """[4-1사분면] 접근성 KPI — 도로망 통행시간 m분 안에 닿는 도로 연장(km), 구 사업지 중앙값 대비"""
+    h = iso.hour_index(hour)
+    for col, m_i, minutes in zip(st.columns(len(iso.minutes)), range(len(iso.minutes)), iso.minutes):
+        mine = float(iso.reach_km[h, source, m_i])
+        median = float(np.median(iso.reach_km[h, :, m_i]))
+        col.metric(f"{minutes}분 도달 도로 ({hour}시)", f"{mine:,.0f} km", f"구 중앙값 대비 {mine - median:+,.0f} km")
+    prof = pd.DataFrame({
+        "hour": np.repeat(iso.hours, len(iso.minutes)),
+        "minutes": np.tile([f"{m}분" for m in iso.minutes], len(iso.hours)),
+        "km": iso.reach_km[:, source, :].ravel(),
+    })
+    st.altair_chart(
+        alt.Chart(prof).mark_line(point=True)
+        .encode(
+            x=alt.X("hour:Q", title="출발 시각 (시)"),
+            y=alt.Y("km:Q", title="도달 도로 연장(km)"),
+            color=alt.Color("minutes:N", title="등시선", sort=[f"{m}분" for m in iso.minutes]),
+            tooltip=[alt.Tooltip("hour:Q", title="시"), alt.Tooltip("minutes:N", title="등시선"),
+                     alt.Tooltip("km:Q", title="km", format=",.0f")],
+        )
+        .properties(height=180),
+        use_container_width=True,
+    )
+    total_km = iso.graph.link_len.sum() / 1000
+    cover = float(iso.coverage_km[h, -1])
+    st.caption(f"구 사업지 {len(iso.sources)}곳 중 어디서든 {iso.minutes[-1]}분 도달: {cover:,.0f} km "
+               f"(서울 링크망 {total_km:,.0f} km의 {cover / total_km:.0%}) · 출발점 = 사업지 최근접 교차로")
 
 
-        # === 그래프: Top-N 링크만 ===
-        rank = (
-            df_metric_all.groupby("link_id", as_index=False)["value"].mean()
-            .sort_values("value", ascending=False)
-            .head(graph_topn)
-        )
-        keep = set(rank["link_id"].astype(str))
-        df_metric_chart = df_metric_all[df_metric_all["link_id"].astype(str).isin(keep)].copy()
+# 등시선은 지도 토글·접근성 KPI를 켤 때만 계산 (구 전체 그래프 탐색이 첫 방문 경로에 오지 않도록)
+iso_loader = (partial(site_isochrones, selected_gu, df_map.index.get_loc(selected_row), df_map["lon"], df_map["lat"])
+              if TRAFFIC_CSV_PATH.exists() and SHP_PATH.exists() else None)
 
-        chart = (
-            alt.Chart(df_metric_chart)
-            .mark_line(point=True)
-            .encode(
-                x=alt.X("hour:Q", title="시간대 (시)"),
-                y=alt.Y("value:Q", title=y_title, scale=alt.Scale(domain=[0, 100])),
-                color=alt.Color("link_id:N", title="링크 ID",
-                                legend=alt.Legend(orient="bottom", direction="horizontal", columns=4)),
-                tooltip=[
-                    alt.Tooltip("link_id:N", title="링크"),
-                    alt.Tooltip("hour:Q", title="시"),
-                    alt.Tooltip("value:Q", title=y_title, format=".1f"),
-                ],
-            )
-            .properties(title=f"혼잡도 변화 추이 — Top {graph_topn}", width=1000, height=400)
-            .configure_view(strokeWidth=0)
-        )
-        st.altair_chart(chart, use_container_width=False, theme=None)
-
-        # === 정의 설명 ===
-        st.markdown("### 🧮 혼잡도(%) 정의")
-        st.markdown("- 링크 $(l)$, 시간대 $(h)$에서의 평균속도를 $v_{l,h}$ 라 할 때,")
-        st.latex(r"v_{\mathrm{ff},l}=\max v_{l,h}")
-        st.latex(r"\mathrm{혼잡도}_{l,h}(\%)=\Big(1-\min\big(1,\frac{v_{l,h}}{v_{\mathrm{ff},l}}\big)\Big)\times 100")
-        st.markdown("- 값의 의미: **0% = 자유주행**, **100% = 매우 혼잡**")
-    else:
+with col3:
+    if iso_loader is not None:
+        with st.expander("🕒 접근성 · 도로망 통행시간 등시선 (5/10/15분)", expanded=False):
+            if st.toggle("접근성 계산", key="accessibility_kpi", help="구 사업지 전체 등시선을 처음 한 번 계산합니다"):
+                iso_hit = iso_loader()
+                if iso_hit is None:
+                    st.info("사업지 좌표가 없어 등시선을 계산할 수 없습니다.")
+                else:
+                    render_accessibility_kpi(iso_hit[0], iso_hit[1])
+
+    site_atlas = load_site_atlas(SITE_ATLAS_PATH.stat().st_mtime) if SITE_ATLAS_PATH.exists() else None
+    atlas_entry = (site_atlas.lookup(sel_lon, sel_lat, radius)
+                   if site_atlas is not None and distance_mode == "직선" else None)   # 아틀라스는 직선 반경 기준
+    if atlas_entry is None and df_plot_all is not None:
+        atlas_entry = traffic_graph.evaluate("catchment", **traffic_params).summary(radius)
+    if atlas_entry is not None and atlas_entry["n_links"] > 0:
+        render_site_atlas_summary(atlas_entry, radius)
+
+    if df_plot_all is None:
+        st.info("교통 CSV 또는 SHP가 없어 그래프/지도 데이터를 만들 수 없습니다.")
+    elif df_metric_all is None:
         st.info("혼잡도 데이터를 계산할 수 없습니다.")
+    else:
+        render_congestion_charts(traffic_graph, traffic_params)
 
 
 # ================================================================
-# 🗺️ 1–2사분면 단일 렌더 블록 (daily → hourly → points/highlight)
+# 🗺️ 1–2사분면 단일 렌더 블록 (hourly → daily → points/highlight)
 # ================================================================
 with col12_left:
-    layers = []
-    # 1) 일평균 혼잡도 GeoJSON 우선
-    gj_daily = st.session_state.get("matched_links_geojson_daily")
-    if gj_daily:
-        layer_links = pdk.Layer(
-            "GeoJsonLayer",
-            data=gj_daily,
-            pickable=True,
-            auto_highlight=True,
-            get_line_color='[properties.color_r, properties.color_g, properties.color_b, 220]',
-            lineWidthMinPixels=3,
-        )
-        layers.append(layer_links)
-    else:
-        # 2) 없으면 시간대 기준 GeoJSON
-        gj_hourly = st.session_state.get("matched_links_geojson")
-        if gj_hourly:
-            layer_links = pdk.Layer(
-                "GeoJsonLayer",
-                data=gj_hourly,
-                pickable=True,
-                auto_highlight=True,
-                get_line_color=[255, 80, 80, 220],
-                lineWidthMinPixels=3,
-            )
-            layers.append(layer_links)
+    render_map(
+        df_map, site_mask, site_clusters, highlight_row, sel_lat, sel_lon,
+        paths_daily=st.session_state.get("matched_links_paths_daily"),
+        paths_hourly=st.session_state.get("matched_links_paths_hourly"),
+        zoom=map_zoom_for_radius(radius),
+        isochrones=iso_loader,
+    )
 
-    # 3) 기본 점/하이라이트는 항상 추가
-    layers += [layer_points, layer_highlight]
 
-    map_slot.pydeck_chart(
-        pdk.Deck(
-            layers=layers,
-            initial_view_state=view_state,
-            tooltip=tooltip,
-        )
-    )
+# -------------------------------------------------------------
+# 💡 3사분면 · 시나리오/재무/민감도/리포트 (업그레이드 버전)
+# -------------------------------------------------------------
+@st.cache_resource(show_spinner="교통 배정 모형 준비 중…")
+def load_assignment_model(shp_mtime: float, csv_mtime: float, od_mtime: float) -> AssignmentModel:
+    """도로 그래프 + 자유류 통행시간 + 차로 용량 + OD (원천 파일 버전별 1회, 수요 배율별 균형 결과는 모형이 메모)"""
+    graph = load_road_graph(SHP_PATH)
+    return build_assignment_model(graph, link_congestion().lookup("free_flow", graph.link_keys),
+                                  load_link_capacity(SHP_PATH, graph.link_keys),
+                                  od_csv=OD_CSV_PATH if od_mtime else None)
 
 
+def assignment_data_version() -> tuple:
+    """배정 모형 원천 파일 (SHP, 속도 CSV, OD CSV) 수정시각 — OD CSV가 없으면 0"""
+    od_mtime = OD_CSV_PATH.stat().st_mtime if OD_CSV_PATH.exists() else 0.0
+    return SHP_PATH.stat().st_mtime, TRAFFIC_CSV_PATH.stat().st_mtime, od_mtime
 
 
+def assignment_model() -> AssignmentModel:
+    return load_assignment_model(*assignment_data_version())
 
-# -------------------------------------------------------------
-# 💡 3사분면 · 시나리오/재무/민감도/리포트 (업그레이드 버전)
-# -------------------------------------------------------------
-with col4:
-    st.markdown("### 🧾 [3사분면] · 시나리오 & 재무/민감도 & 리포트")
 
-    # ---------------------------
-    # 0) 공통 유틸
-    # ---------------------------
-    def calc_kpis(
-        households:int,
-        avg_py:float,                 # 전용평형(평)
-        sale_price_per_m2:float,      # 분양가 (만원/㎡)
-        build_cost_per_m2:float,      # 공사비 (만원/㎡)
-        infra_invest_billion:float,   # 교통 등 인프라 투자(억원)
-        congestion_base:float,        # 기준 혼잡도(%)
-        bus_inc_pct:int,              # 버스 증편(%)
-        non_sale_ratio:float=0.15,    # 비분양 비율(공공/커뮤니티 등)
-        sale_rate:float=0.98,         # 분양률
-        disc_rate:float=0.07,         # 할인율
-        years:int=4                   # 회수기간(년)
-    ):
-        # 면적 환산
-        m2_per_py = 3.3058
-        avg_m2 = avg_py * m2_per_py
-        sellable_m2 = households * avg_m2 * (1 - non_sale_ratio)  # 분양면적
-        # 혼잡도 개선 (간이 모델)
-        predicted_cong = max(0.0, congestion_base * (1 - bus_inc_pct / 150))
-        cong_improve = max(0.0, congestion_base - predicted_cong)
-
-        # 매출/비용 (만원 단위 -> 억원 환산)
-        revenue_won = sellable_m2 * sale_price_per_m2 * sale_rate  # (만원)
-        cost_won = sellable_m2 * build_cost_per_m2                 # (만원)
-        total_cost_bil = cost_won/1e4/100 + infra_invest_billion   # (억원)
-        total_rev_bil  = revenue_won/1e4/100                       # (억원)
-
-        profit_bil = total_rev_bil - total_cost_bil
-        margin_pct = (profit_bil / total_cost_bil * 100) if total_cost_bil>0 else 0
-
-        # 간이 NPV (균등현금흐름 가정)
-        cf_annual = profit_bil / years
-        npv = sum([cf_annual / ((1+disc_rate)**t) for t in range(1, years+1)])
-        payback = min(years, max(1, int(np.ceil(total_cost_bil / max(1e-6, cf_annual)))))
-
-        return {
-            "분양면적(㎡)": sellable_m2,
-            "예상혼잡도(%)": round(predicted_cong,1),
-            "혼잡도개선(Δ%)": round(cong_improve,1),
-            "총매출(억원)": round(total_rev_bil,1),
-            "총사업비(억원)": round(total_cost_bil,1),
-            "이익(억원)": round(profit_bil,1),
-            "마진율(%)": round(margin_pct,1),
-            "NPV(억원)": round(npv,1),
-            "회수기간(년)": payback,
-        }
+@st.fragment
+def render_scenario_quadrant(current: pd.Series, impact=None):
+    """
+    [3사분면] 탭 위젯 조작은 이 fragment만 재실행 (지도/혼잡도 재계산 X)
+    impact: 사업지 반경 링크 모형(TripImpact) — 있으면 기준/예상 혼잡도를 링크 데이터에서 (없으면 입력값 + 간이식)
+    """
 
     # ---------------------------
     # 1) 입력/시나리오 탭
@@ -1131,52 +1732,106 @@ with col4:
         with c1:
             households = int(st.number_input("계획 세대수", 100, 10000, int(current.get("households") or 1000), step=50))
             avg_py = st.number_input("평균 전용면적(평)", 10.0, 60.0, float(st.session_state.get("desired_py", 25.0)), 0.5)
-            congestion_base = st.number_input("기준 혼잡도(%)", 0.0, 100.0, 50.0, 1.0)
+            # 기준 혼잡도: 반경 링크 첨두시 관측 혼잡도의 거리감쇠 가중평균 (링크 데이터 없으면 입력)
+            site_base = float(impact.site_congestion(impact.base_congestion())[0, 0]) if impact is not None else np.nan
+            if np.isfinite(site_base):
+                congestion_base = round(site_base, 1)
+                st.metric(f"기준 혼잡도(%) · 반경 링크 {IMPACT_HOUR:02d}시", f"{congestion_base:.1f}%",
+                          help="반경 내 링크 관측 혼잡도의 거리감쇠(선형) 가중평균 — 속도 데이터에서 계산")
+            else:
+                congestion_base = st.number_input("기준 혼잡도(%)", 0.0, 100.0, 50.0, 1.0)
             non_sale_ratio = st.slider("비분양 비율", 0.0, 0.4, 0.15, 0.01, help="공공/커뮤니티 등")
         with c2:
             sale_rate = st.slider("분양률", 0.80, 1.00, 0.98, 0.01)
             disc_rate = st.slider("할인율(재무)", 0.03, 0.15, 0.07, 0.005)
             years = st.slider("회수기간(년)", 2, 10, 4, 1)
             base_bus_inc = st.slider("베이스라인 버스 증편(%)", 0, 100, 10, 5)
+            use_assignment = st.checkbox(
+                "🚗 교통 배정으로 배경 교통량 (BPR · Frank–Wolfe)", value=False, key="scenario_assignment",
+                disabled=not np.isfinite(site_base),
+                help="버스 증편만큼 승용차 OD를 줄여 도로망에 균형 배정 → 반경 링크별 교통량 변화율을 씁니다. "
+                     "끄면 승용차 수요 배율을 모든 링크에 같게 적용합니다.",
+            )
 
         st.markdown("#### 🧪 시나리오 정의")
-        st.caption("분양가/공사비/버스증편/인프라투자만 다르게 하며, 나머지는 공통 입력을 상속합니다.")
-        def scenario_inputs(label, sale_default, cost_default, bus_default, infra_default):
-            a, b, c, d = st.columns(4, gap="small")
-            with a:
-                sale = st.number_input(f"{label}·분양가(만원/㎡)", 500.0, 3000.0, sale_default, 10.0, key=f"sale_{label}")
-            with b:
-                cost = st.number_input(f"{label}·공사비(만원/㎡)", 300.0, 2500.0, cost_default, 10.0, key=f"cost_{label}")
-            with c:
-                bus = st.slider(f"{label}·버스증편(%)", 0, 100, bus_default, 5, key=f"bus_{label}")
-            with d:
-                infra = st.number_input(f"{label}·인프라(억원)", 0.0, 1000.0, infra_default, 5.0, key=f"infra_{label}")
-            return sale, cost, bus, infra
-
-        saleA, costA, busA, infraA = scenario_inputs("A", 1200.0, 900.0, base_bus_inc, 30.0)
-        saleB, costB, busB, infraB = scenario_inputs("B", 1300.0, 950.0, base_bus_inc+10, 50.0)
-        saleC, costC, busC, infraC = scenario_inputs("C", 1100.0, 850.0, max(0, base_bus_inc-5), 20.0)
-
-        scenarios = {
-            "A": dict(sale=saleA, cost=costA, bus=busA, infra=infraA),
-            "B": dict(sale=saleB, cost=costB, bus=busB, infra=infraB),
-            "C": dict(sale=saleC, cost=costC, bus=busC, infra=infraC),
-        }
-
-        # KPI 계산 & 비교표
-        import pandas as pd
-        rows = []
-        for name, s in scenarios.items():
-            k = calc_kpis(
-                households, avg_py, s["sale"], s["cost"], s["infra"],
-                congestion_base, s["bus"], non_sale_ratio, sale_rate, disc_rate, years
+        st.caption("분양가/공사비/버스증편/인프라투자만 다르게 하며, 나머지는 공통 입력을 상속합니다. "
+                   "행을 추가/삭제해 시나리오 개수를 자유롭게 조정할 수 있습니다.")
+
+        # 시나리오 테이블(컬럼형) — 세션에 한 번만 생성, 프리셋이 통째로 교체
+        if SCENARIO_TABLE_KEY not in st.session_state:
+            st.session_state[SCENARIO_TABLE_KEY] = default_scenario_table(base_bus_inc)
+
+        (sale_lo, sale_hi), (cost_lo, cost_hi), (bus_lo, bus_hi), (infra_lo, infra_hi) = SCENARIO_COLUMNS.values()
+        edited_scn = st.data_editor(
+            st.session_state[SCENARIO_TABLE_KEY],
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "name": st.column_config.TextColumn("시나리오", required=True),
+                "sale": st.column_config.NumberColumn("분양가(만원/㎡)", min_value=sale_lo, max_value=sale_hi, step=10.0),
+                "cost": st.column_config.NumberColumn("공사비(만원/㎡)", min_value=cost_lo, max_value=cost_hi, step=10.0),
+                "bus": st.column_config.NumberColumn("버스증편(%)", min_value=bus_lo, max_value=bus_hi, step=5),
+                "infra": st.column_config.NumberColumn("인프라(억원)", min_value=infra_lo, max_value=infra_hi, step=5.0),
+            },
+            key=SCENARIO_EDITOR_KEY,
+        )
+        scn = clean_scenario_table(edited_scn)
+        if scn.empty:
+            st.info("시나리오가 없습니다. 표에 행을 추가하세요.")
+            return
+
+        # 공통 입력 튜플 (세 탭의 캐시 키에 공통 포함)
+        common_key = normalize_key(households, avg_py, congestion_base, non_sale_ratio, sale_rate, disc_rate, years)
+
+        # 예상혼잡도: 세대 발생 통행 + 배경 교통량 × 승용차 수요 배율 → 반경 링크 BPR
+        # (시나리오 표 · 민감도 · 확률 탭이 같은 함수를 씀 — 링크 데이터가 없으면 None = 간이식)
+        def predict_congestion(bus):
+            if not np.isfinite(site_base):
+                return None
+            factors = car_demand_factor(np.atleast_1d(bus))
+            background = (assignment_model().volume_ratio(impact.weights.link_keys, factors)
+                          if use_assignment else factors)
+            trips = peak_trips(households, avg_py, factors)
+            return impact.site_congestion(impact.congestion(trips[:, None], background))[:, 0]
+
+        impact_key = ()
+        if np.isfinite(site_base):
+            if use_assignment:
+                model = assignment_model()
+                base = model.solve(1.0)
+                st.caption(f"배정: OD {'CSV' if OD_CSV_PATH.exists() else '합성(격자 존)'} {len(model.zones)}개 존 · "
+                           f"총 {model.total_trips:,.0f}대/h · FW {base.iterations}회, 상대 gap {base.gap:.2%}")
+            st.caption(f"사업지 발생 통행 {peak_trips(households, avg_py):,.0f}대/h ({IMPACT_HOUR:02d}시, 버스 증편 전) → "
+                       f"반경 링크 {len(impact):,}개에 거리 가중 배분 · BPR로 사업 후 속도·혼잡도 재계산")
+            # 예측 입력: 사업지 링크 모형 내용 + (배정 시) 배정 모형 원천 파일 버전
+            impact_key = normalize_key(impact.fingerprint, assignment_data_version() if use_assignment else None)
+
+        # KPI 계산 (전체 시나리오를 한 번에) & 비교표
+        def _scenario_kpis():
+            out = calc_kpis_batch(
+                households, avg_py, scn["sale"], scn["cost"], scn["infra"],
+                congestion_base, scn["bus"], non_sale_ratio, sale_rate, disc_rate, years,
+                predicted_congestion=predict_congestion(scn["bus"]),
             )
-            rows.append({"시나리오": name, **k})
-        df_scn = pd.DataFrame(rows).set_index("시나리오")
+            out.index = pd.Index(scn["name"], name="시나리오")
+            return out
+
+        df_scn = kpi_caches()["scenario"].get_or_compute(common_key + normalize_key(scn) + impact_key, _scenario_kpis)
 
         st.markdown("#### 📊 시나리오 비교표")
         st.dataframe(df_scn, use_container_width=True)
 
+        # 비교 차트 (시나리오 수와 무관하게 1개)
+        df_scn_chart = df_scn.reset_index()
+        scn_chart = alt.Chart(df_scn_chart).mark_bar().encode(
+            x=alt.X("시나리오:N", sort=None, title="시나리오"),
+            y=alt.Y("NPV(억원):Q", title="NPV(억원)"),
+            color=alt.Color("마진율(%):Q", title="마진율(%)", scale=alt.Scale(scheme="redyellowgreen")),
+            tooltip=["시나리오:N", "NPV(억원):Q", "마진율(%):Q", "이익(억원):Q", "예상혼잡도(%):Q", "회수기간(년):Q"],
+        ).properties(height=220)
+        st.altair_chart(scn_chart, use_container_width=True)
+
         # 하이라이트 카드
         best = df_scn.sort_values("NPV(억원)", ascending=False).head(1)
         st.success(f"**추천 시나리오: {best.index[0]}** · NPV {best['NPV(억원)'].iloc[0]:,.1f}억원 · 마진율 {best['마진율(%)'].iloc[0]:.1f}%")
@@ -1196,28 +1851,30 @@ with col4:
 
         def kpi_with(sale, cost, bus, infra):
             return calc_kpis(households, avg_py, sale, cost, infra, congestion_base, bus,
-                             non_sale_ratio, sale_rate, disc_rate, years)["NPV(억원)"]
-
-        import numpy as np, altair as alt
-        base_npv = kpi_with(base_sale, base_cost, base_bus, base_infra)
-        factors = []
-        for name, (lo, hi) in {
-            "분양가": (base_sale*(1-pct/100), base_sale*(1+pct/100)),
-            "공사비": (base_cost*(1-pct/100), base_cost*(1+pct/100)),
-            "버스증편": (max(0, base_bus-pct), min(100, base_bus+pct)),
-            "인프라": (max(0, base_infra*(1-pct/100)), base_infra*(1+pct/100)),
-        }.items():
-            npv_lo = kpi_with(lo if name=="분양가" else base_sale,
-                              lo if name=="공사비" else base_cost,
-                              lo if name=="버스증편" else base_bus,
-                              lo if name=="인프라" else base_infra)
-            npv_hi = kpi_with(hi if name=="분양가" else base_sale,
-                              hi if name=="공사비" else base_cost,
-                              hi if name=="버스증편" else base_bus,
-                              hi if name=="인프라" else base_infra)
-            factors.append({"요인": name, "NPV_low": npv_lo, "NPV_high": npv_hi})
-
-        df_tornado = pd.DataFrame(factors)
+                             non_sale_ratio, sale_rate, disc_rate, years,
+                             predicted_congestion=predict_congestion(bus))["NPV(억원)"]
+
+        def _tornado():
+            factors = []
+            for name, (lo, hi) in {
+                "분양가": (base_sale*(1-pct/100), base_sale*(1+pct/100)),
+                "공사비": (base_cost*(1-pct/100), base_cost*(1+pct/100)),
+                "버스증편": (max(0, base_bus-pct), min(100, base_bus+pct)),
+                "인프라": (max(0, base_infra*(1-pct/100)), base_infra*(1+pct/100)),
+            }.items():
+                npv_lo = kpi_with(lo if name=="분양가" else base_sale,
+                                  lo if name=="공사비" else base_cost,
+                                  lo if name=="버스증편" else base_bus,
+                                  lo if name=="인프라" else base_infra)
+                npv_hi = kpi_with(hi if name=="분양가" else base_sale,
+                                  hi if name=="공사비" else base_cost,
+                                  hi if name=="버스증편" else base_bus,
+                                  hi if name=="인프라" else base_infra)
+                factors.append({"요인": name, "NPV_low": npv_lo, "NPV_high": npv_hi})
+            return pd.DataFrame(factors)
+
+        base_key = normalize_key(base_sale, base_cost, base_bus, base_infra)
+        df_tornado = kpi_caches()["tornado"].get_or_compute(common_key + base_key + impact_key + (pct,), _tornado)
         bars = alt.Chart(df_tornado).transform_fold(
             ["NPV_low","NPV_high"], as_=["type","NPV"]
         ).mark_bar().encode(
@@ -1238,14 +1895,20 @@ with col4:
         sigma_sale = st.slider("분양가 표준편차(%)", 1, 20, 7)
         sigma_cost = st.slider("공사비 표준편차(%)", 1, 20, 5)
 
-        rng = np.random.default_rng(42)
-        sale_samples = rng.normal(loc=base_sale, scale=base_sale*sigma_sale/100, size=n)
-        cost_samples = rng.normal(loc=base_cost, scale=base_cost*sigma_cost/100, size=n)
-
-        npvs = []
-        for s, c in zip(sale_samples, cost_samples):
-            npvs.append(kpi_with(max(100, s), max(100, c), base_bus, base_infra))
-        ser = pd.Series(npvs)
+        def _monte_carlo():
+            rng = np.random.default_rng(42)
+            sale_samples = rng.normal(loc=base_sale, scale=base_sale*sigma_sale/100, size=n)
+            cost_samples = rng.normal(loc=base_cost, scale=base_cost*sigma_cost/100, size=n)
+            # n개 샘플을 한 번의 배열 연산으로 평가
+            return calc_kpis_batch(
+                households, avg_py, np.maximum(100, sale_samples), np.maximum(100, cost_samples),
+                base_infra, congestion_base, base_bus, non_sale_ratio, sale_rate, disc_rate, years,
+                predicted_congestion=predict_congestion(base_bus),
+            )["NPV(억원)"]
+
+        ser = kpi_caches()["montecarlo"].get_or_compute(
+            common_key + base_key + impact_key + (n, sigma_sale, sigma_cost), _monte_carlo
+        )
         p10, p50, p90 = np.percentile(ser, [10,50,90])
 
         st.metric("P10 NPV", f"{p10:,.1f} 억원")
@@ -1264,10 +1927,12 @@ with col4:
     # ---------------------------
     with tab4:
         st.markdown("#### 🧷 행정 협의 체크리스트 (자동 생성)")
-        imp = float(df_scn.loc["A","혼잡도개선(Δ%)"]) if "A" in df_scn.index else 0.0
+        imp = float(df_scn["혼잡도개선(Δ%)"].iloc[0]) if not df_scn.empty else 0.0
         msg = []
         if imp >= 5:
             msg.append("• 교통영향평가 협의 시, **혼잡도 개선 Δ≥5%** 근거 제시 (버스 증편 + 노선 최적화)")
+        elif imp < 0:
+            msg.append(f"• 사업 후 혼잡도 **악화(Δ{imp:+.1f}%p)** → 발생 통행 저감대책(버스 증편 확대/진출입 동선) 제시 필요")
         else:
             msg.append("• 혼잡도 개선이 작음 → **정류장 위치/환승편의** 시뮬레이션 보완 권고")
         if df_scn["마진율(%)"].max() < 10:
@@ -1321,3 +1986,15 @@ with col4:
         if st.button("📄 PDF 리포트 다운로드"):
             pdf_path = export_pdf_simple()
             st.success(f"PDF 생성 완료: {pdf_path}")
+
+    with st.expander("⚙️ KPI 캐시 현황", expanded=False):
+        st.dataframe(
+            pd.DataFrame.from_dict({name: c.stats() for name, c in kpi_caches().items()}, orient="index"),
+            use_container_width=True,
+        )
+        st.caption("탭별 입력 튜플이 같으면 재계산 없이 결과를 재사용합니다 (hits↑ = 재계산 회피).")
+
+
+with col4:
+    st.markdown("### 🧾 [3사분면] · 시나리오 & 재무/민감도 & 리포트")
+    render_scenario_quadrant(current, impact=scenario_impact)
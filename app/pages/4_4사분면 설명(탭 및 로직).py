@@ -83,8 +83,8 @@ def app():
     st.header("② 시나리오 탭 (🧩 입력·비교)")
     st.markdown("""
     - 공통 입력: 세대수, 평균면적, 혼잡도, 비분양비율, 분양률, 할인율 등  
-    - 시나리오 A/B/C: **분양가·공사비·버스증편·인프라투자**만 다르게 설정  
-    - 각 시나리오의 KPI를 계산하여 비교표(DataFrame)로 표시  
+    - 시나리오 표: **분양가·공사비·버스증편·인프라투자**만 다르게 설정 (행 추가/삭제로 개수 자유)  
+    - 전체 시나리오의 KPI를 한 번에 계산하여 비교표(DataFrame) + NPV 비교 차트로 표시  
     - NPV가 가장 높은 시나리오를 ‘추천 시나리오’로 표시
     """)
 
@@ -122,7 +122,7 @@ def app():
     st.markdown("""
     1️⃣ 대상지 선택  
     2️⃣ 공통 입력 설정  
-    3️⃣ 시나리오 A/B/C 입력 및 결과 비교  
+    3️⃣ 시나리오 표 입력 및 결과 비교  
     4️⃣ 민감도 분석으로 주요 변수 확인  
     5️⃣ 확률 분석으로 리스크 파악  
     6️⃣ 리포트 탭에서 결과 정리·PDF 저장
@@ -0,0 +1,11 @@
+# tests/conftest.py
+# ---------------------------------------------------------------------
+# 프로젝트 루트를 sys.path에 추가 (app/app.py와 같은 방식) → `pytest`만으로 utils 임포트
+# ---------------------------------------------------------------------
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
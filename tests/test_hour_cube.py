@@ -0,0 +1,52 @@
+# tests/test_hour_cube.py
+# ---------------------------------------------------------------------
+# HourCube 누적합 구간 평균 — 자정 넘김 포함, 시간대를 직접 모은 평균과 비교
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from utils.hour_cube import HourCube, hour_window_mean, window_hours
+
+
+def _brute_mean(matrix, start, end):
+    """[start, end) 시간대를 하나씩 모아 NaN 제외 평균 (자정 넘김은 24를 더해 나열)"""
+    stop = end if end > start else end + 24
+    cols = [h % 24 for h in range(start, stop)]
+    out = np.full(len(matrix), np.nan)
+    for i, row in enumerate(matrix[:, cols]):
+        ok = np.isfinite(row)
+        if ok.any():
+            out[i] = row[ok].mean()
+    return out
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(7)
+    m = rng.uniform(0, 100, (6, 24))
+    m[rng.random(m.shape) < 0.3] = np.nan
+    m[0] = np.nan                     # 값이 하나도 없는 링크
+    m[1, :] = np.nan
+    m[1, 23] = 42.0                   # 23시 하나만 있는 링크
+    return m
+
+
+@pytest.mark.parametrize("start, end", [(22, 2), (23, 1), (20, 6), (0, 24), (7, 9), (5, 6), (23, 24), (18, 0)])
+def test_window_mean_matches_brute_force(matrix, start, end):
+    cube = HourCube(np.arange(len(matrix))).add_metric("v", matrix)
+    np.testing.assert_allclose(cube.window_mean("v", start, end), _brute_mean(matrix, start, end), equal_nan=True)
+    np.testing.assert_allclose(hour_window_mean(matrix, start, end), _brute_mean(matrix, start, end), equal_nan=True)
+
+
+def test_window_mean_keys_order_and_missing(matrix):
+    cube = HourCube(np.arange(len(matrix)) + 100).add_metric("v", matrix)
+    got = cube.window_mean("v", 22, 2, keys=[103, 999, 101])
+    want = _brute_mean(matrix, 22, 2)
+    np.testing.assert_allclose(got, [want[3], np.nan, want[1]], equal_nan=True)
+
+
+def test_window_hours_wraps_midnight():
+    assert window_hours(22, 2).tolist() == [22, 23, 0, 1]
+    assert window_hours(0, 24).tolist() == list(range(24))
+    assert window_hours(9, 9).tolist() == []
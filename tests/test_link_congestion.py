@@ -0,0 +1,87 @@
+# tests/test_link_congestion.py
+# ---------------------------------------------------------------------
+# LinkCongestion 자유류·혼잡도 — 예전 앱의 링크별 groupby 계산(long 테이블)과 비교
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.link_congestion import (
+    MIN_FREE_FLOW, LinkCongestion, build_link_congestion, free_flow_speed,
+)
+
+
+def _old_congestion(long_df):
+    """app.py의 예전 compute_congestion_from_speed + 일평균 (링크별 groupby)"""
+    d = long_df.copy()
+    d["평균속도(km/h)"] = pd.to_numeric(d["평균속도(km/h)"], errors="coerce")
+    d["free_flow"] = d.groupby("link_id")["평균속도(km/h)"].transform("max").clip(lower=1)
+    d["value"] = ((1 - (d["평균속도(km/h)"] / d["free_flow"]).clip(0, 1)) * 100).clip(0, 100)
+    daily = d.groupby("link_id")["value"].mean()
+    return d, daily
+
+
+@pytest.fixture
+def long_df():
+    """링크 5개 long 테이블 — 결측 시간대 행 누락·NaN 속도·0.5km/h 링크·속도 전부 NaN인 링크"""
+    rng = np.random.default_rng(11)
+    rows = []
+    for link in range(5):
+        for hour in range(24):
+            if link == 1 and hour % 3 == 0:
+                continue                                # 시간대 행 자체가 없음
+            v = rng.uniform(5, 60)
+            if link == 2 and hour % 4 == 0:
+                v = np.nan
+            if link == 3:
+                v = 0.5 if hour < 12 else 0.2           # 자유류가 하한(1km/h)에 걸림
+            if link == 4:
+                v = np.nan
+            rows.append((1010000 + link, hour, v))
+    return pd.DataFrame(rows, columns=["link_id", "hour", "평균속도(km/h)"])
+
+
+def _matrix(long_df):
+    keys = np.sort(long_df["link_id"].unique()).astype(np.int64)
+    m = np.full((len(keys), 24), np.nan)
+    m[np.searchsorted(keys, long_df["link_id"]), long_df["hour"]] = long_df["평균속도(km/h)"]
+    return keys, m
+
+
+def _check_against_old(table, long_df):
+    old, daily = _old_congestion(long_df)
+    ok = old["free_flow"].notna()
+    keys = old["link_id"].to_numpy(np.int64)
+
+    np.testing.assert_allclose(table.lookup("free_flow", keys[ok]), old.loc[ok, "free_flow"])
+    np.testing.assert_allclose(table.lookup("congestion", keys, hours=old["hour"]), old["value"], equal_nan=True)
+    np.testing.assert_allclose(table.lookup("daily", daily.index.to_numpy(np.int64)), daily, equal_nan=True)
+
+
+def test_from_speed_matches_per_link_groupby(long_df):
+    keys, m = _matrix(long_df)
+    table = LinkCongestion.from_speed(keys, m)
+
+    _check_against_old(table, long_df)
+    assert table.free_flow[-1] == MIN_FREE_FLOW          # 속도가 하나도 없는 링크
+
+
+def test_build_link_congestion_from_csv(long_df, tmp_path):
+    csv = tmp_path / "speed.csv"
+    long_df.to_csv(csv, index=False)
+
+    _check_against_old(build_link_congestion(csv), long_df)
+
+
+@pytest.mark.parametrize("p", [50, 85, 95, 100])
+def test_percentile_free_flow_matches_nanpercentile(long_df, p):
+    _, m = _matrix(long_df)
+    want = np.array([np.nanpercentile(r, p) if np.isfinite(r).any() else MIN_FREE_FLOW for r in m])
+
+    np.testing.assert_allclose(free_flow_speed(m, p), np.clip(want, MIN_FREE_FLOW, None))
+
+
+def test_percentile_out_of_range_raises():
+    with pytest.raises(ValueError):
+        free_flow_speed(np.ones((2, 24)), 0)
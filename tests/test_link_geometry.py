@@ -0,0 +1,47 @@
+# tests/test_link_geometry.py
+# ---------------------------------------------------------------------
+# LinkArrays ↔ GeoDataFrame 상호 변환
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+shapely = pytest.importorskip("shapely")
+
+from utils.link_geometry import LinkArrays  # noqa: E402
+
+
+def _sample_gdf():
+    """EPSG:5186 링크 3개 — 단일 선, 2파트 멀티라인, 꼭짓점 1개짜리 선(점)"""
+    from shapely.geometry import LineString, MultiLineString, Point
+
+    return gpd.GeoDataFrame(
+        {"link_id": ["1010001", "1010002", "1010003"]},
+        geometry=[
+            LineString([(200000, 550000), (200100, 550050), (200300, 550040)]),
+            MultiLineString([[(201000, 551000), (201200, 551100)], [(201200, 551100), (201250, 551400)]]),
+            Point(202000, 552000),
+        ],
+        crs=5186,
+    )
+
+
+def test_geodataframe_round_trip_keeps_arrays():
+    links = LinkArrays.from_geodataframe(_sample_gdf(), "link_id")
+    back = LinkArrays.from_geodataframe(links.to_geodataframe(), "link_id")
+
+    assert len(links) == 4                                  # 멀티라인은 파트별 행
+    np.testing.assert_array_equal(back.keys, links.keys)
+    np.testing.assert_array_equal(back.offsets, links.offsets)
+    np.testing.assert_allclose(back.coords, links.coords)
+
+
+def test_to_geodataframe_reprojects_to_source_crs():
+    src = _sample_gdf()
+    gdf = LinkArrays.from_geodataframe(src, "link_id").to_geodataframe(crs=5186)
+
+    assert gdf.crs.to_epsg() == 5186
+    assert gdf["link_id"].tolist() == [1010001, 1010002, 1010002, 1010003]
+    np.testing.assert_allclose(shapely.get_coordinates(gdf.geometry.values),
+                               shapely.get_coordinates(src.geometry.values), atol=1e-3)
@@ -0,0 +1,78 @@
+# tests/test_traffic_assignment.py
+# ---------------------------------------------------------------------
+# 2경로 장난감 도로망(O→A→D, O→B→D) — 전량배정 · Frank–Wolfe 균형을 해석해와 비교
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pytest
+from scipy.optimize import brentq
+
+from utils.road_graph import RoadGraph
+from utils.traffic_assignment import all_or_nothing, bpr_time, frank_wolfe
+
+# 링크 0: O→A (경로 1 병목), 1: A→D, 2: O→B (경로 2 병목), 3: B→D
+# 병목이 아닌 링크는 자유류 시간이 작고 용량이 커서 경로 시간은 사실상 병목 링크 하나로 정해진다.
+FREE_TIME = np.array([600.0, 1.0, 900.0, 1.0])
+CAPACITY = np.array([1000.0, 1e9, 2000.0, 1e9])
+ZONES = np.array([0, 3])
+
+
+def _graph():
+    return RoadGraph(node_ids=[10, 11, 12, 13],
+                     node_xy=[(0, 0), (1000, 500), (1000, -500), (2000, 0)],
+                     link_keys=[100, 101, 102, 103],
+                     link_from=[0, 1, 0, 2], link_to=[1, 3, 2, 3],
+                     link_len=[1000.0, 1000.0, 1000.0, 1000.0])
+
+
+def _trips(demand):
+    return np.array([[0.0, demand], [0.0, 0.0]])
+
+
+def _route_times(x1, demand):
+    """경로 1에 x1, 경로 2에 나머지를 실었을 때 두 경로 통행시간"""
+    v = np.array([x1, x1, demand - x1, demand - x1])
+    t = bpr_time(FREE_TIME, v, CAPACITY)
+    return t[0] + t[1], t[2] + t[3]
+
+
+def _equilibrium_x1(demand):
+    """Wardrop 균형 — 두 경로 시간이 같아지는 x1 (경로 2가 늘 더 느리면 전량 경로 1)"""
+    gap = lambda x1: np.subtract(*_route_times(x1, demand))
+    return demand if gap(demand) <= 0 else brentq(gap, 0.0, demand, xtol=1e-9)
+
+
+def test_all_or_nothing_takes_cheaper_route():
+    vol = all_or_nothing(_graph(), FREE_TIME, ZONES, _trips(3000.0))
+    np.testing.assert_allclose(vol, [3000.0, 3000.0, 0.0, 0.0])
+
+    swapped = FREE_TIME[[2, 3, 0, 1]]
+    vol = all_or_nothing(_graph(), swapped, ZONES, _trips(3000.0))
+    np.testing.assert_allclose(vol, [0.0, 0.0, 3000.0, 3000.0])
+
+
+@pytest.mark.parametrize("demand", [1000.0, 3000.0, 6000.0])
+def test_frank_wolfe_reaches_wardrop_equilibrium(demand):
+    res = frank_wolfe(_graph(), FREE_TIME, CAPACITY, ZONES, _trips(demand), max_iter=200, tol=1e-6)
+    x1 = _equilibrium_x1(demand)
+
+    assert res.gap <= 1e-6
+    np.testing.assert_allclose(res.volume, [x1, x1, demand - x1, demand - x1], rtol=1e-3, atol=1e-3 * demand)
+    if 0 < x1 < demand:                               # 두 경로 모두 쓰이면 통행시간이 같다
+        t1, t2 = _route_times(res.volume[0], demand)
+        assert t1 == pytest.approx(t2, rel=1e-3)
+
+
+def test_frank_wolfe_identical_routes_split_evenly():
+    free_time = np.array([600.0, 1.0, 600.0, 1.0])
+    capacity = np.array([1000.0, 1e9, 1000.0, 1e9])
+    res = frank_wolfe(_graph(), free_time, capacity, ZONES, _trips(2000.0), max_iter=200, tol=1e-6)
+
+    np.testing.assert_allclose(res.volume, [1000.0, 1000.0, 1000.0, 1000.0], rtol=1e-3)
+
+
+def test_frank_wolfe_default_tolerance_stops_within_gap():
+    res = frank_wolfe(_graph(), FREE_TIME, CAPACITY, ZONES, _trips(3000.0))
+
+    assert res.gap <= 1e-2
+    assert res.volume[0] + res.volume[2] == pytest.approx(3000.0)   # 수요 보존
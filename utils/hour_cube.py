@@ -0,0 +1,145 @@
+# utils/hour_cube.py
+# ---------------------------------------------------------------------
+# 링크 × 시간대 누적합(prefix-sum) 큐브 — 시간대 구간 평균을 O(1)/링크로
+# - hour_matrix: long 테이블(link_key, hour, 값) → (링크, 24) 행렬
+# - HourCube: 지표별 (n, 25) 누적합 + 유효 개수 누적
+#     · window_mean(metric, start, end): [start, end) 시간대 평균 (자정 넘김 가능)
+#     · add_metric: 교통량 등 지표 추가
+# - HourCube.from_speed_csv: 속도 CSV → speed / congestion 큐브 (link_congestion 사전계산 배열 사용)
+# - load_hour_cube: from_speed_csv 프로세스 캐시 (파일 수정시각 기준)
+# - window_hours / hour_window_mean: (n, 24) 행렬의 [start, end) 구간 평균 (누적합 없이 1회용)
+# - HOUR_WINDOWS: 첨두 구간 프리셋 (종일 / 오전 7–9시 / 오후 17–19시)
+#
+# 시간대 h = h시~h+1시 구간(속도 CSV의 hour와 동일). 구간 [7, 9) = 7시, 8시.
+# ---------------------------------------------------------------------
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from utils.link_congestion import FREE_FLOW_DEFAULT, load_link_congestion
+from utils.link_keys import LinkIndex
+
+HOUR_WINDOWS = {
+    "종일": (0, 24),
+    "오전 첨두(7–9시)": (7, 9),
+    "오후 첨두(17–19시)": (17, 19),
+}
+
+
+def hour_matrix(keys, link_key, hour, values) -> np.ndarray:
+    """(link_key, hour, value) 행들 → keys 순서의 (len(keys), 24) 평균 행렬 (없는 칸 NaN)"""
+    keys = np.asarray(keys, dtype=np.int64)
+    rows, src = LinkIndex(keys).rows(np.asarray(link_key, dtype=np.int64))
+    v = np.asarray(values, dtype=float)[src]
+    h = np.asarray(hour, dtype=np.int64)[src] % 24
+    ok = np.isfinite(v)
+    cell = rows[ok] * 24 + h[ok]
+    total = np.bincount(cell, weights=v[ok], minlength=len(keys) * 24)
+    count = np.bincount(cell, minlength=len(keys) * 24)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (total / count).reshape(len(keys), 24)
+
+
+def window_hours(start: int, end: int) -> np.ndarray:
+    """[start, end) 시간대 번호 (자정 넘김 가능, start == end 이면 빈 구간)"""
+    start, end = int(start) % 24, (24 if int(end) == 24 else int(end) % 24)
+    return np.arange(start, end + 24 if end < start else end) % 24
+
+
+def hour_window_mean(matrix, start: int, end: int) -> np.ndarray:
+    """(n, 24) → (n,) [start, end) 유효 시간대 평균 (값이 없으면 NaN)"""
+    m = np.asarray(matrix, dtype=float)[:, window_hours(start, end)]
+    ok = np.isfinite(m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(ok.any(axis=1), np.where(ok, m, 0.0).sum(axis=1) / ok.sum(axis=1), np.nan)
+
+
+class HourCube:
+    """
+    keys : (n,) int64 링크 키
+    지표별 cum[m] (n, 25): cum[:, h] = Σ_{t<h} 값 (NaN은 0), cnt[m]: 유효 시간대 수 누적
+    → [a, b) 구간 합 = cum[:, b] - cum[:, a]  (링크 전체를 한 번에 벡터 연산)
+    """
+
+    def __init__(self, keys):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.index = LinkIndex(self.keys)
+        self._cum = {}
+        self._cnt = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def metrics(self):
+        return list(self._cum)
+
+    def add_metric(self, name: str, matrix) -> "HourCube":
+        """(n, 24) 지표 행렬 추가 (keys 순서)"""
+        m = np.asarray(matrix, dtype=float).reshape(len(self.keys), 24)
+        ok = np.isfinite(m)
+        self._cum[name] = np.concatenate([np.zeros((len(m), 1)), np.cumsum(np.where(ok, m, 0.0), axis=1)], axis=1)
+        self._cnt[name] = np.concatenate([np.zeros((len(m), 1)), np.cumsum(ok, axis=1)], axis=1)
+        return self
+
+    def add_long(self, name: str, df: pd.DataFrame, value_col: str,
+                 key_col: str = "link_key", hour_col: str = "hour") -> "HourCube":
+        """long 테이블(교통량 CSV 등) → 지표 추가"""
+        return self.add_metric(name, hour_matrix(self.keys, df[key_col], df[hour_col], df[value_col]))
+
+    def _window(self, name: str, start: int, end: int, rows):
+        cum, cnt = self._cum[name], self._cnt[name]
+        if rows is not None:
+            cum, cnt = cum[rows], cnt[rows]
+        start, end = int(start) % 24, (24 if int(end) == 24 else int(end) % 24)
+        if start == end:
+            return np.zeros(len(cum)), np.zeros(len(cum))
+        if start < end:
+            return cum[:, end] - cum[:, start], cnt[:, end] - cnt[:, start]
+        # 자정 넘김 (예: 22–2시) = [start, 24) + [0, end)
+        return (cum[:, 24] - cum[:, start] + cum[:, end],
+                cnt[:, 24] - cnt[:, start] + cnt[:, end])
+
+    def matrix(self, name: str) -> np.ndarray:
+        """누적합을 되돌린 (n, 24) 원 행렬 (값 없는 칸 NaN)"""
+        return np.where(np.diff(self._cnt[name], axis=1) > 0, np.diff(self._cum[name], axis=1), np.nan)
+
+    def window_mean(self, name: str, start: int, end: int, keys=None) -> np.ndarray:
+        """
+        [start, end) 시간대 평균 (n,) — keys 지정 시 그 순서로(큐브에 없는 키는 NaN)
+        start == end 이면 빈 구간(NaN).
+        """
+        if keys is None:
+            s, c = self._window(name, start, end, None)
+        else:
+            keys = np.asarray(keys, dtype=np.int64)
+            rows, src = self.index.rows(keys)
+            s = np.full(len(keys), np.nan)
+            c = np.zeros(len(keys))
+            s[src], c[src] = self._window(name, start, end, rows)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(c > 0, s / np.where(c > 0, c, 1), np.nan)
+
+    @classmethod
+    def from_speed_csv(cls, csv_path: Union[str, Path], method=FREE_FLOW_DEFAULT) -> "HourCube":
+        """
+        속도 CSV → speed(km/h) / congestion(%) 큐브
+        혼잡도는 적재 시 링크 전체에 대해 한 번 계산된 값(utils.link_congestion)을 그대로 쓴다.
+        """
+        table = load_link_congestion(csv_path, method)
+        return cls(table.keys).add_metric("speed", table.speed).add_metric("congestion", table.congestion)
+
+
+@lru_cache(maxsize=2)
+def _load_hour_cube_cached(csv_path: str, mtime: float) -> HourCube:
+    return HourCube.from_speed_csv(csv_path)
+
+
+def load_hour_cube(csv_path: Union[str, Path]) -> HourCube:
+    """속도 CSV → HourCube (파일 수정시각 기준 프로세스 캐시, 반환 객체는 수정 금지)"""
+    csv_path = Path(csv_path)
+    return _load_hour_cube_cached(str(csv_path), csv_path.stat().st_mtime)
@@ -0,0 +1,134 @@
+# utils/isochrones.py
+# ---------------------------------------------------------------------
+# 시간대별 통행시간 등시선(5/10/15분) — 도로 그래프(RoadGraph) + 링크 시간대 속도
+# - link_travel_time: (L, 24) 링크 통행시간(초) = 길이 / 평균속도(km/h)
+#     · 속도 결측 링크는 같은 시간대 전체 링크 중앙값, 그래도 없으면 DEFAULT_SPEED_KMH
+# - compute_isochrones: 출발 노드 S개 × 시간대 H개를 한 번에
+#     · 시간대마다 비용만 바꾼 CSR로 csgraph.dijkstra(indices=S개, limit=최대 분) 1회 (방향 있음)
+#     · min_only=True 다중 출발 1회로 "구 사업지 중 어디서든" 도달 범위(coverage)도 함께
+# - Isochrones: node_time (H, S, N) + 접근성 KPI (H, S, M) 도달 도로 연장(km)
+#     · reachable_links / polygon(시간대, 출발, 분): 도달 링크 집합 · 도달 노드 concave hull
+#
+# 출발점 → 최근접 노드 접근 시간은 더하지 않는다 (노드 간 거리가 수백 m 이하).
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+from utils.link_geometry import WEB_MERCATOR_R
+from utils.road_graph import RoadGraph
+
+ISOCHRONE_MINUTES = (5, 10, 15)
+DEFAULT_SPEED_KMH = 20.0
+MIN_SPEED_KMH = 3.0
+HULL_RATIO = 0.3                 # shapely.concave_hull 오목 정도 (0 = 가장 오목, 1 = 볼록 껍질)
+HULL_BUFFER_M = 60.0             # 도달 노드 껍질 바깥 여유 (EPSG:3857 m)
+
+
+def link_travel_time(graph: RoadGraph, speed) -> np.ndarray:
+    """
+    speed (L, 24) km/h (graph.link_keys 순서, 결측 NaN) → (L, 24) 통행시간(초)
+    """
+    sp = np.asarray(speed, dtype=float).reshape(len(graph), 24)
+    with np.errstate(invalid="ignore"):
+        hour_median = np.nanmedian(np.where(np.isfinite(sp).any(axis=0), sp, DEFAULT_SPEED_KMH), axis=0)
+    sp = np.where(np.isfinite(sp), sp, hour_median[None, :])
+    sp = np.clip(np.nan_to_num(sp, nan=DEFAULT_SPEED_KMH), MIN_SPEED_KMH, None)
+    return graph.link_len[:, None] / (sp / 3.6)
+
+
+class Isochrones:
+    """
+    hours        : (H,) 시간대, sources: (S,) 출발 노드 번호, minutes: (M,) 등시선 분
+    node_time    : (H, S, N) float32 출발 → 노드 최단 통행시간(초), 한도 밖 inf
+    reach_km     : (H, S, M) 링크 중점 도달시간 ≤ 분인 링크 길이 합(km) — 접근성 KPI
+    coverage_km  : (H, M) 출발점 중 어디서든 도달하는 링크 길이 합(km) (다중 출발 min_only)
+    """
+
+    def __init__(self, graph: RoadGraph, travel_time, hours, sources, minutes, node_time, reach_km, coverage_km):
+        self.graph = graph
+        self.travel_time = np.asarray(travel_time, dtype=float)
+        self.hours = np.asarray(hours, dtype=np.int64)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.minutes = tuple(minutes)
+        self.node_time = node_time
+        self.reach_km = reach_km
+        self.coverage_km = coverage_km
+
+    def hour_index(self, hour: int) -> int:
+        hit = np.flatnonzero(self.hours == int(hour))
+        if not len(hit):
+            raise KeyError(f"계산하지 않은 시간대: {hour} (계산: {self.hours.tolist()})")
+        return int(hit[0])
+
+    def link_time(self, hour: int, source: int) -> np.ndarray:
+        """(L,) 링크 중점 도달시간(초) — 시작 노드 도달 + 링크 통행시간의 절반"""
+        h = self.hour_index(hour)
+        return self.graph.link_distance(self.node_time[h, source], cost=self.travel_time[:, self.hours[h]],
+                                        directed=True)
+
+    def reachable_links(self, hour: int, source: int, minutes: float) -> np.ndarray:
+        """도달 링크 키 (중점 도달시간 ≤ minutes)"""
+        return self.graph.link_keys[self.link_time(hour, source) <= minutes * 60]
+
+    def polygon(self, hour: int, source: int, minutes: float):
+        """도달 노드(+ 출발 노드) concave hull + 여유 버퍼 (EPSG:3857 shapely 도형, 도달 없으면 None)"""
+        import shapely
+
+        t = self.node_time[self.hour_index(hour), source]
+        pts = self.graph.node_xy[(t <= minutes * 60) & np.isfinite(self.graph.node_xy).all(axis=1)]
+        if not len(pts):
+            return None
+        hull = shapely.concave_hull(shapely.multipoints(pts), ratio=HULL_RATIO)
+        return hull.buffer(HULL_BUFFER_M)
+
+    def polygons_frame(self, source: int) -> pd.DataFrame:
+        """출발점 1곳 × 계산한 시간대 × 분 → [hour, minutes, polygon(경위도 링), reach_km] (PolygonLayer용)"""
+        rows = []
+        for h, hour in enumerate(self.hours):
+            for m_i, minutes in enumerate(self.minutes):
+                geom = self.polygon(hour, source, minutes)
+                if geom is None:
+                    continue
+                rings = [g.exterior.coords for g in getattr(geom, "geoms", [geom])]
+                for ring in rings:
+                    rows.append((int(hour), minutes, _ring_lonlat(np.asarray(ring)),
+                                 float(self.reach_km[h, source, m_i])))
+        return pd.DataFrame(rows, columns=["hour", "minutes", "polygon", "reach_km"])
+
+
+def _ring_lonlat(xy: np.ndarray) -> list:
+    lon = np.degrees(xy[:, 0] / WEB_MERCATOR_R)
+    lat = np.degrees(2 * np.arctan(np.exp(xy[:, 1] / WEB_MERCATOR_R)) - np.pi / 2)
+    return np.column_stack([lon, lat]).round(6).tolist()
+
+
+def _reach_km(graph: RoadGraph, link_time: np.ndarray, minutes) -> np.ndarray:
+    """link_time (..., L) 초 → (..., M) 분 이내 도달 링크 길이 합(km)"""
+    limits = np.asarray(minutes, dtype=float) * 60
+    return ((link_time[..., None] <= limits) * graph.link_len[:, None]).sum(axis=-2) / 1000
+
+
+def compute_isochrones(graph: RoadGraph, travel_time, sources, hours=range(24),
+                       minutes=ISOCHRONE_MINUTES) -> Isochrones:
+    """
+    출발 노드 (S,) × 시간대 → Isochrones
+    시간대마다 CSR 비용만 교체해 S개 출발을 Dijkstra 1회(limit = 최대 분)로, coverage는 min_only 1회로.
+    """
+    tt = np.asarray(travel_time, dtype=float)
+    sources = np.asarray(sources, dtype=np.int64)
+    hours = np.asarray(list(hours), dtype=np.int64)
+    limit = max(minutes) * 60.0
+    node_time = np.empty((len(hours), len(sources), graph.n_nodes), dtype=np.float32)
+    reach = np.zeros((len(hours), len(sources), len(minutes)))
+    coverage = np.zeros((len(hours), len(minutes)))
+    for h_i, hour in enumerate(hours):
+        cost = tt[:, hour % 24]
+        adj = graph.adjacency(cost)
+        d = np.atleast_2d(graph.distances(sources, limit, directed=True, adj=adj))
+        node_time[h_i] = d
+        reach[h_i] = _reach_km(graph, graph.link_distance(d, cost=cost, directed=True), minutes)
+        d_any = graph.distances(sources, limit, directed=True, min_only=True, adj=adj)
+        coverage[h_i] = _reach_km(graph, graph.link_distance(d_any, cost=cost, directed=True), minutes)
+    return Isochrones(graph, tt, hours, sources, minutes, node_time, reach, coverage)
+
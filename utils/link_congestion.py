@@ -0,0 +1,164 @@
+# utils/link_congestion.py
+# ---------------------------------------------------------------------
+# 서울 전체 링크 자유류 속도 · 시간대별 혼잡도 · 일평균 사전계산 (적재 시 1회)
+# - free_flow_speed: (n, 24) 속도 → 링크별 자유류 속도
+#     · "max"   : 시간대 최대속도 (기존 정의)
+#     · 숫자 p  : 시간대 속도의 p 분위수 (이상치에 강한 높은 분위수, 예: 95)
+# - LinkCongestion: keys · speed · free_flow · congestion(%) · daily(%) 배열 + .npz 저장/로드
+# - load_link_congestion: 속도 CSV 옆 .congestion.npz 아티팩트 재사용 (없거나 오래되면 재생성)
+#
+# 혼잡도 = (1 - min(1, v / v_ff)) × 100, v_ff ≥ 1
+# 반경에 어떤 링크가 들어오든 같은 링크는 항상 같은 값 → 앱은 인덱싱만 한다.
+# ---------------------------------------------------------------------
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from utils.link_keys import INVALID_LINK_KEY, LinkIndex
+
+ARTIFACT_SUFFIX = ".congestion.npz"
+CONGESTION_VERSION = 1
+FREE_FLOW_DEFAULT = "max"
+MIN_FREE_FLOW = 1.0                 # km/h (0 나눗셈 방지)
+
+
+def free_flow_speed(speed, method: Union[str, float] = FREE_FLOW_DEFAULT) -> np.ndarray:
+    """(n, 24) 시간대 속도 → (n,) 자유류 속도 (시간대 값이 모두 없으면 MIN_FREE_FLOW)"""
+    sp = np.asarray(speed, dtype=float)
+    with np.errstate(invalid="ignore"):
+        if method == "max":
+            ff = np.fmax.reduce(sp, axis=1)
+        else:
+            p = float(method)
+            if not 0 < p <= 100:
+                raise ValueError(f"자유류 분위수는 (0, 100] 범위여야 합니다: {method}")
+            ff = np.full(len(sp), np.nan)
+            has = np.isfinite(sp).any(axis=1)
+            if has.any():
+                ff[has] = np.nanpercentile(sp[has], p, axis=1)
+    return np.clip(np.nan_to_num(ff, nan=MIN_FREE_FLOW), MIN_FREE_FLOW, None)
+
+
+def _method_name(method: Union[str, float]) -> str:
+    """"max" / 95 / "95.0" → "max" / "95" (캐시·아티팩트 비교용 정규화)"""
+    return "max" if method == "max" else format(float(method), "g")
+
+
+def congestion_pct(speed, free_flow) -> np.ndarray:
+    """속도 (n, 24) · 자유류 (n,) → 혼잡도(%) (n, 24), 결측 속도는 NaN"""
+    sp = np.asarray(speed, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return (1 - np.clip(sp / np.asarray(free_flow, dtype=float)[:, None], 0, 1)) * 100
+
+
+def _row_nanmean(m: np.ndarray) -> np.ndarray:
+    ok = np.isfinite(m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(ok.any(axis=1), np.where(ok, m, 0.0).sum(axis=1) / ok.sum(axis=1), np.nan)
+
+
+class LinkCongestion:
+    """
+    링크 n개 (속도 CSV에 있는 링크 전체)
+    - keys       : (n,) int64 링크 키
+    - speed      : (n, 24) 시간대 평균속도(km/h), 결측 NaN
+    - free_flow  : (n,) 자유류 속도(km/h)
+    - congestion : (n, 24) 혼잡도(%), daily: (n,) 유효 시간대 평균 혼잡도(%)
+    """
+
+    FIELDS = ("keys", "speed", "free_flow", "congestion", "daily")
+
+    def __init__(self, keys, speed, free_flow, congestion, daily, method=FREE_FLOW_DEFAULT):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.speed = np.asarray(speed, dtype=float)
+        self.free_flow = np.asarray(free_flow, dtype=float)
+        self.congestion = np.asarray(congestion, dtype=float)
+        self.daily = np.asarray(daily, dtype=float)
+        self.method = _method_name(method)
+        self.index = LinkIndex(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_speed(cls, keys, speed, method: Union[str, float] = FREE_FLOW_DEFAULT) -> "LinkCongestion":
+        ff = free_flow_speed(speed, method)
+        cong = congestion_pct(speed, ff)
+        return cls(keys, speed, ff, cong, _row_nanmean(cong), method=method)
+
+    def lookup(self, name: str, keys, hours=None) -> np.ndarray:
+        """
+        keys (m,) 순서로 배열 조회 (없는 키는 NaN)
+        hours 지정 시 (m,) 행마다 그 시간대 값 — long 테이블(link_key, hour)에 바로 붙일 때
+        """
+        arr = getattr(self, name)
+        keys = np.asarray(keys, dtype=np.int64)
+        rows, src = self.index.rows(keys)
+        if hours is not None:
+            out = np.full(len(keys), np.nan)
+            out[src] = arr[rows, np.asarray(hours, dtype=np.int64)[src] % 24]
+            return out
+        out = np.full((len(keys),) + arr.shape[1:], np.nan)
+        out[src] = arr[rows]
+        return out
+
+    def save(self, path: Union[str, Path]):
+        np.savez_compressed(path, **{f: getattr(self, f) for f in self.FIELDS},
+                            method=self.method, version=CONGESTION_VERSION)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LinkCongestion":
+        with np.load(path, allow_pickle=False) as z:
+            if int(z["version"]) != CONGESTION_VERSION:
+                raise ValueError(f"혼잡도 아티팩트 버전 불일치: {int(z['version'])} != {CONGESTION_VERSION}")
+            return cls(**{f: z[f] for f in cls.FIELDS}, method=str(z["method"]))
+
+
+def artifact_path(csv_path: Union[str, Path]) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + ARTIFACT_SUFFIX)
+
+
+def build_link_congestion(csv_path: Union[str, Path],
+                          method: Union[str, float] = FREE_FLOW_DEFAULT) -> LinkCongestion:
+    """속도 CSV(long) → 링크 전체 LinkCongestion"""
+    from utils.hour_cube import hour_matrix
+    from utils.traffic_plot import load_speed_table
+
+    speed, index = load_speed_table(csv_path)
+    keys = index.keys[index.keys != INVALID_LINK_KEY]
+    v = pd.to_numeric(speed["평균속도(km/h)"], errors="coerce")
+    return LinkCongestion.from_speed(keys, hour_matrix(keys, speed["link_key"], speed["hour"], v), method)
+
+
+@lru_cache(maxsize=2)
+def _load_link_congestion_cached(csv_path: str, mtime: float, method: str) -> LinkCongestion:
+    art = artifact_path(csv_path)
+    if art.exists() and art.stat().st_mtime >= mtime:
+        try:
+            table = LinkCongestion.load(art)
+            if table.method == method:
+                return table
+        except Exception as e:
+            print("congestion artifact load fallback:", e)
+
+    table = build_link_congestion(csv_path, method)
+    try:
+        table.save(art)
+    except OSError as e:
+        print("congestion artifact save skipped:", e)
+    return table
+
+
+def load_link_congestion(csv_path: Union[str, Path],
+                         method: Union[str, float] = FREE_FLOW_DEFAULT) -> LinkCongestion:
+    """
+    속도 CSV → LinkCongestion (수정시각 기준 프로세스 캐시 + 옆 .congestion.npz 재사용)
+    method: "max" 또는 자유류 분위수(예: 95). 반환 객체는 수정 금지.
+    """
+    csv_path = Path(csv_path)
+    return _load_link_congestion_cached(str(csv_path), csv_path.stat().st_mtime, _method_name(method))
@@ -0,0 +1,431 @@
+# utils/link_geometry.py
+# ---------------------------------------------------------------------
+# 레벨 5.5 링크망의 압축 ragged 배열 표현 (shapely 객체 없이 NumPy로 연산)
+# - LinkArrays: 연속 float64 좌표 배열 + 오프셋 배열 (+ 정수 링크 키)
+#   · from_geodataframe / to_geodataframe: GeoDataFrame 상호 변환
+#   · distance_to_point: 점-폴리라인 최소거리 (세그먼트 단위 벡터화)
+#   · within: bbox 1차 필터 → 정밀 거리 (반경 질의)
+#   · within_batch: 여러 중심점 반경 질의를 STRtree 일괄 질의(dwithin) 한 번으로
+#   · bbox / lengths / index(키 → 행) / take / to_lonlat / save / load
+#   · simplified(tol): Douglas–Peucker 단순화 단계(tier) — 아티팩트에 함께 저장
+# - tolerance_for_zoom: 지도 줌 → 화면에서 구분 안 되는 단순화 허용오차 단계
+# - load_link_arrays: SHP → LinkArrays (프로세스 캐시 + .npz 아티팩트)
+# - load_link_window: 중심 ± 반경 bbox 안의 링크만 (아티팩트 없으면 SHP bbox 읽기)
+# - load_link_window_points: 여러 중심점의 반경을 모두 덮는 bbox 창 (구 사업지 전체 등)
+#
+# 좌표계는 EPSG:3857 — 반경 질의 쪽에서 지상 m ↔ 3857 거리를 mercator_scale(cos 위도)로 환산.
+# ---------------------------------------------------------------------
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from utils.link_keys import LinkIndex, to_link_key
+
+WEB_MERCATOR_R = 6378137.0
+ARTIFACT_SUFFIX = ".links.npz"
+LINK_ID_CANDIDATES = ("k_link_id", "link_id", "LINK_ID")  # 우선순위
+SIMPLIFY_TOLERANCES = (1.0, 2.0, 4.0, 8.0, 16.0)           # 단순화 단계 허용오차 (EPSG:3857 m)
+SIMPLIFY_MAX_PX = 0.5                                      # 화면 오차 한도 (픽셀)
+
+
+def pixel_size_m(zoom: float) -> float:
+    """웹 메르카토르 줌 z의 화면 1픽셀 = EPSG:3857 좌표 몇 m (256px 타일 기준, 위도 무관)"""
+    return 2 * np.pi * WEB_MERCATOR_R / (256 * 2 ** zoom)
+
+
+def tolerance_for_zoom(zoom: float, tolerances=SIMPLIFY_TOLERANCES, max_px: float = SIMPLIFY_MAX_PX) -> float:
+    """줌 z에서 오차가 max_px 픽셀 이하인 가장 큰 단순화 단계 (없으면 0 = 원본)"""
+    ok = [t for t in tolerances if t <= max_px * pixel_size_m(zoom)]
+    return max(ok) if ok else 0.0
+
+
+def _take_ragged(coords, offsets, rows):
+    """ragged (coords, offsets)에서 행 번호 배열만 골라 연속 배열로 재구성"""
+    rows = np.asarray(rows, dtype=np.int64)
+    counts = np.diff(offsets)[rows]
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_offsets[1:])
+    # 각 새 꼭짓점의 원래 위치 = 원래 시작 + (새 위치 - 새 시작)
+    src = np.repeat(offsets[rows] - new_offsets[:-1], counts) + np.arange(new_offsets[-1])
+    return coords[src], new_offsets
+
+
+def mercator_scale(lat):
+    """위도 lat에서 지상 1m = EPSG:3857 좌표 1 / cos(lat) m → 지상 거리 = 3857 거리 × mercator_scale(lat)"""
+    return np.cos(np.radians(lat))
+
+
+def mercator_to_lonlat(x, y):
+    """EPSG:3857 → 경위도 (구면 메르카토르 역변환, 스칼라/배열 모두 가능)"""
+    lon = np.degrees(np.asarray(x, dtype=float) / WEB_MERCATOR_R)
+    lat = np.degrees(2 * np.arctan(np.exp(np.asarray(y, dtype=float) / WEB_MERCATOR_R)) - np.pi / 2)
+    return lon, lat
+
+
+def lonlat_to_mercator(lon, lat):
+    """경위도 → EPSG:3857 (구면 메르카토르 정변환, 스칼라/배열 모두 가능)"""
+    x = np.radians(lon) * WEB_MERCATOR_R
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * WEB_MERCATOR_R
+    return x, y
+
+
+class LinkArrays:
+    """
+    링크 i의 꼭짓점 = coords[offsets[i]:offsets[i + 1]]
+    - keys   : (n,) int64 링크 키 (utils.link_keys.to_link_key, 무효 -1)
+    - coords : (N, 2) float64, EPSG:3857
+    - offsets: (n + 1,) int64
+    - tiers  : {허용오차: (coords, offsets)} 단순화 단계 (같은 keys/행 순서)
+    """
+
+    def __init__(self, keys, coords, offsets, tiers=None):
+        self.keys = to_link_key(keys)
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if len(self.offsets) != len(self.keys) + 1:
+            raise ValueError("offsets 길이는 링크 수 + 1 이어야 합니다.")
+        self.tiers = dict(tiers or {})
+        self._bbox = None
+        self._lengths = None
+        self._index = None
+        self._tree = None
+
+    # -----------------------------------------------------------------
+    # 기본 속성
+    # -----------------------------------------------------------------
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """링크별 꼭짓점 수"""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        return self.coords.nbytes + self.offsets.nbytes + self.keys.nbytes
+
+    @property
+    def index(self) -> LinkIndex:
+        """링크 키 → 행 번호 인덱스 (멀티파트는 같은 키 여러 행)"""
+        if self._index is None:
+            self._index = LinkIndex(self.keys)
+        return self._index
+
+    def _segments(self):
+        """(a, b, seg_link): 링크 경계를 넘는 세그먼트를 제외한 (x0,y0)→(x1,y1)"""
+        n_vertex = len(self.coords)
+        is_last = np.zeros(n_vertex, dtype=bool)
+        is_last[self.offsets[1:] - 1] = True
+        start = np.flatnonzero(~is_last[:-1]) if n_vertex > 1 else np.empty(0, dtype=np.int64)
+        seg_link = np.searchsorted(self.offsets, start, side="right") - 1
+        return self.coords[start], self.coords[start + 1], seg_link
+
+    def _segment_starts(self):
+        """세그먼트가 있는 링크 행과 각 링크의 첫 세그먼트 위치 (reduceat용)"""
+        has_seg = np.flatnonzero(self.counts > 1)
+        return has_seg, self.offsets[has_seg] - has_seg
+
+    @property
+    def bbox(self) -> np.ndarray:
+        """(n, 4) [minx, miny, maxx, maxy]"""
+        if self._bbox is None:
+            starts = self.offsets[:-1]
+            x, y = self.coords[:, 0], self.coords[:, 1]
+            self._bbox = np.column_stack([
+                np.minimum.reduceat(x, starts), np.minimum.reduceat(y, starts),
+                np.maximum.reduceat(x, starts), np.maximum.reduceat(y, starts),
+            ]) if len(self) else np.empty((0, 4))
+        return self._bbox
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """링크 길이 (좌표계 단위, EPSG:3857 m)"""
+        if self._lengths is None:
+            a, b, seg_link = self._segments()
+            self._lengths = np.bincount(seg_link, weights=np.hypot(*(b - a).T), minlength=len(self))
+        return self._lengths
+
+    # -----------------------------------------------------------------
+    # 거리/반경 질의
+    # -----------------------------------------------------------------
+    def distance_to_point(self, x: float, y: float) -> np.ndarray:
+        """점 (x, y)에서 각 링크 폴리라인까지의 최소거리 (n,)"""
+        out = np.full(len(self), np.inf)
+        if not len(self):
+            return out
+        a, b, _ = self._segments()
+        ab = b - a
+        ap = np.array([x, y]) - a
+        denom = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(np.einsum("ij,ij->i", ap, ab) / np.where(denom > 0, denom, 1.0), 0.0, 1.0)
+        d = np.hypot(ap[:, 0] - t * ab[:, 0], ap[:, 1] - t * ab[:, 1])
+        has_seg, seg_start = self._segment_starts()
+        if len(has_seg):
+            out[has_seg] = np.minimum.reduceat(d, seg_start)
+
+        # 꼭짓점이 1개뿐인 링크(세그먼트 없음)는 점 거리
+        single = np.flatnonzero(self.counts == 1)
+        if len(single):
+            p = self.coords[self.offsets[single]]
+            out[single] = np.hypot(p[:, 0] - x, p[:, 1] - y)
+        return out
+
+    def bbox_candidates(self, x: float, y: float, radius: float) -> np.ndarray:
+        """bbox가 (x, y)의 radius 사각형과 겹치는 링크 행 번호"""
+        bb = self.bbox
+        return np.flatnonzero(
+            (bb[:, 0] <= x + radius) & (bb[:, 2] >= x - radius)
+            & (bb[:, 1] <= y + radius) & (bb[:, 3] >= y - radius)
+        )
+
+    def within(self, x: float, y: float, radius: float):
+        """반경 내 링크 (rows, dist) — bbox 1차 필터 후 후보만 정밀 계산"""
+        cand = self.bbox_candidates(x, y, radius)
+        dist = self.take(cand).distance_to_point(x, y)
+        keep = dist <= radius
+        return cand[keep], dist[keep]
+
+    def within_batch(self, x, y, radius):
+        """
+        여러 중심점 (m,)과 반경(스칼라 또는 (m,))에 대한 반경 질의를 한 번에:
+        → (query, rows, dist) — query는 중심점 번호, (query, dist) 순 정렬
+        """
+        import shapely
+
+        x, y, radius = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(x, dtype=float)),
+            np.atleast_1d(np.asarray(y, dtype=float)),
+            np.atleast_1d(np.asarray(radius, dtype=float)),
+        )
+        pts = shapely.points(x, y)
+        query, rows = self.tree.query(pts, predicate="dwithin", distance=radius)
+        dist = shapely.distance(pts[query], self.geometries[rows])
+        order = np.lexsort((dist, query))
+        return query[order], rows[order], dist[order]
+
+    @property
+    def geometries(self) -> np.ndarray:
+        """shapely 지오메트리 배열 (꼭짓점 1개인 링크는 Point)"""
+        import shapely
+
+        counts = self.counts
+        out = np.empty(len(self), dtype=object)
+        line = np.flatnonzero(counts > 1)
+        if len(line):
+            is_line_vertex = np.repeat(counts > 1, counts)
+            vertex_line = np.repeat(np.arange(len(line)), counts[line])
+            out[line] = shapely.linestrings(self.coords[is_line_vertex], indices=vertex_line)
+        single = np.flatnonzero(counts == 1)
+        if len(single):
+            out[single] = shapely.points(self.coords[self.offsets[single]])
+        return out
+
+    @property
+    def tree(self):
+        """링크 지오메트리 STRtree (지연 생성, 배열당 1회)"""
+        if self._tree is None:
+            import shapely
+
+            self._tree = shapely.STRtree(self.geometries)
+        return self._tree
+
+    # -----------------------------------------------------------------
+    # 부분집합/좌표 변환
+    # -----------------------------------------------------------------
+    def take(self, rows) -> "LinkArrays":
+        """행 번호 배열로 부분 LinkArrays 생성 (좌표는 연속 배열로 재구성, 단순화 단계 포함)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        coords, offsets = _take_ragged(self.coords, self.offsets, rows)
+        tiers = {t: _take_ragged(c, o, rows) for t, (c, o) in self.tiers.items()}
+        return LinkArrays(self.keys[rows], coords, offsets, tiers=tiers)
+
+    # -----------------------------------------------------------------
+    # 단순화 단계 (Douglas–Peucker, EPSG:3857)
+    # -----------------------------------------------------------------
+    def _simplify(self, tolerance: float):
+        """(coords, offsets) — 링크마다 끝점 유지, 꼭짓점 1개 링크는 그대로"""
+        import shapely
+
+        simple = shapely.simplify(self.geometries, tolerance, preserve_topology=False)
+        coords, idx = shapely.get_coordinates(simple, return_index=True)
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(idx, minlength=len(self)), out=offsets[1:])
+        return coords, offsets
+
+    def build_tiers(self, tolerances=SIMPLIFY_TOLERANCES) -> "LinkArrays":
+        """단순화 단계를 미리 계산해 보관 (save 시 아티팩트에 함께 저장)"""
+        for t in tolerances:
+            if float(t) not in self.tiers:
+                self.tiers[float(t)] = self._simplify(float(t))
+        return self
+
+    def simplified(self, tolerance: float) -> "LinkArrays":
+        """
+        허용오차 tolerance(m) 단계의 LinkArrays (키/행 순서 동일)
+        저장된 단계가 있으면 그대로, 없으면 즉석 계산. 0 이하는 원본.
+        """
+        if tolerance <= 0:
+            return self
+        tier = self.tiers.get(float(tolerance))
+        coords, offsets = tier if tier is not None else self._simplify(float(tolerance))
+        return LinkArrays(self.keys, coords, offsets)
+
+    def to_lonlat(self) -> np.ndarray:
+        """EPSG:3857 → 경위도 (N, 2) (구면 메르카토르 역변환)"""
+        return np.column_stack(mercator_to_lonlat(self.coords[:, 0], self.coords[:, 1]))
+
+    # -----------------------------------------------------------------
+    # GeoDataFrame 상호 변환
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_geodataframe(cls, gdf, id_col: str) -> "LinkArrays":
+        """
+        GeoDataFrame → LinkArrays (EPSG:3857 변환 포함)
+        MultiLineString은 파트별 행으로 분해(같은 ID가 여러 행).
+        """
+        import shapely
+
+        if gdf.crs is None:
+            gdf = gdf.set_crs(epsg=5186, allow_override=True)
+        if gdf.crs.to_epsg() != 3857:
+            gdf = gdf.to_crs(epsg=3857)
+
+        parts, parent = shapely.get_parts(gdf.geometry.values, return_index=True)
+        coords, part_idx = shapely.get_coordinates(parts, return_index=True)
+        counts = np.bincount(part_idx, minlength=len(parts))
+        nonempty = counts > 0
+        if not nonempty.all():
+            keep = np.repeat(nonempty, counts)
+            coords = coords[keep]
+            parts_parent = parent[nonempty]
+            counts = counts[nonempty]
+        else:
+            parts_parent = parent
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        keys = to_link_key(gdf[id_col].to_numpy())[parts_parent]
+        return cls(keys, coords, offsets)
+
+    def to_geodataframe(self, id_col: str = "link_id", crs: Union[int, str] = 3857):
+        """LinkArrays → GeoDataFrame (파트 1행, 정수 키 id_col) — from_geodataframe로 되돌리면 같은 배열"""
+        import geopandas as gpd
+
+        gdf = gpd.GeoDataFrame({id_col: self.keys}, geometry=list(self.geometries), crs=3857)
+        return gdf if crs in (3857, "EPSG:3857") else gdf.to_crs(crs)
+
+    # -----------------------------------------------------------------
+    # 아티팩트(.npz)
+    # -----------------------------------------------------------------
+    def save(self, path: Union[str, Path]):
+        tols = sorted(self.tiers)
+        tier_arrays = {}
+        for i, t in enumerate(tols):
+            tier_arrays[f"tier{i}_coords"], tier_arrays[f"tier{i}_offsets"] = self.tiers[t]
+        np.savez_compressed(
+            path, keys=self.keys, coords=self.coords, offsets=self.offsets,
+            tier_tols=np.asarray(tols, dtype=float), **tier_arrays,
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LinkArrays":
+        with np.load(path, allow_pickle=False) as z:
+            keys = z["keys"] if "keys" in z.files else z["ids"]  # 구버전(문자열 ID) 호환
+            tols = z["tier_tols"] if "tier_tols" in z.files else []  # 구버전: 단순화 단계 없음
+            tiers = {float(t): (z[f"tier{i}_coords"], z[f"tier{i}_offsets"]) for i, t in enumerate(tols)}
+            return cls(keys, z["coords"], z["offsets"], tiers=tiers)
+
+
+def artifact_path(shp_path: Union[str, Path]) -> Path:
+    shp_path = Path(shp_path)
+    return shp_path.with_name(shp_path.stem + ARTIFACT_SUFFIX)
+
+
+@lru_cache(maxsize=4)
+def _load_link_arrays_cached(shp_path: str, mtime: float) -> LinkArrays:
+    from utils.traffic_plot import _read_shp_robust
+
+    art = artifact_path(shp_path)
+    if art.exists() and art.stat().st_mtime >= mtime:
+        try:
+            arrays = LinkArrays.load(art)
+            if set(SIMPLIFY_TOLERANCES) - set(arrays.tiers):   # 구버전 아티팩트 → 단계 추가 후 재저장
+                arrays.build_tiers().save(art)
+            return arrays
+        except Exception as e:
+            print("link artifact load fallback:", e)
+
+    gdf = _read_shp_robust(shp_path)
+    id_col = next((c for c in LINK_ID_CANDIDATES if c in gdf.columns), None)
+    if id_col is None:
+        raise RuntimeError(f"SHP에서 5.5 링크ID 컬럼(k_link_id/link_id/LINK_ID)을 찾지 못했습니다. (cols={list(gdf.columns)})")
+    arrays = LinkArrays.from_geodataframe(gdf[[id_col, "geometry"]], id_col).build_tiers()
+    try:
+        arrays.save(art)
+    except OSError as e:
+        print("link artifact save skipped:", e)
+    return arrays
+
+
+def _artifact_fresh(shp_path: Path) -> bool:
+    art = artifact_path(shp_path)
+    return art.exists() and art.stat().st_mtime >= shp_path.stat().st_mtime
+
+
+@lru_cache(maxsize=16)
+def _load_link_window_cached(shp_path: str, mtime: float, bbox: tuple) -> LinkArrays:
+    from utils.traffic_plot import _read_shp_robust
+
+    gdf = _read_shp_robust(shp_path, bbox=bbox)
+    id_col = next((c for c in LINK_ID_CANDIDATES if c in gdf.columns), None)
+    if id_col is None:
+        raise RuntimeError(f"SHP에서 5.5 링크ID 컬럼(k_link_id/link_id/LINK_ID)을 찾지 못했습니다. (cols={list(gdf.columns)})")
+    return LinkArrays.from_geodataframe(gdf[[id_col, "geometry"]], id_col)
+
+
+def load_link_window(shp_path: Union[str, Path], center_lon: float, center_lat: float,
+                     radius_m: float) -> LinkArrays:
+    """
+    중심 ± radius_m(EPSG:3857) 사각형과 겹치는 링크만 담은 LinkArrays.
+    - 전체 아티팩트(.links.npz)가 있으면: 전체 배열에서 bbox 후보만 take
+    - 없으면(배포 직후 콜드 스타트): SHP를 bbox 창으로만 읽음 (전체 읽기 X)
+    """
+    shp_path = Path(shp_path)
+    if _artifact_fresh(shp_path):
+        links = load_link_arrays(shp_path)
+        x, y = lonlat_to_mercator(center_lon, center_lat)
+        return links.take(links.bbox_candidates(x, y, radius_m))
+
+    from utils.traffic_plot import shp_bbox_around
+
+    minx, miny, maxx, maxy = shp_bbox_around(shp_path, center_lon, center_lat, radius_m)
+    bbox = (np.floor(minx), np.floor(miny), np.ceil(maxx), np.ceil(maxy))  # 바깥쪽으로 정수화(캐시 키)
+    return _load_link_window_cached(str(shp_path), shp_path.stat().st_mtime, bbox)
+
+
+def load_link_window_points(shp_path: Union[str, Path], lon, lat, radius_m: float) -> LinkArrays:
+    """
+    중심점 (m,) 각각의 반경 radius_m(지상 m)을 모두 덮는 정사각형 창의 LinkArrays (load_link_window 경유)
+    좌표가 있는 점이 없으면 빈 창 대신 전체 링크망.
+    """
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    ok = np.isfinite(lon) & np.isfinite(lat)
+    if not ok.any():
+        return load_link_arrays(shp_path)
+    x, y = lonlat_to_mercator(lon[ok], lat[ok])
+    cx, cy = (x.min() + x.max()) / 2, (y.min() + y.max()) / 2
+    half = max(x.max() - x.min(), y.max() - y.min()) / 2 + radius_m / mercator_scale(lat[ok]).min()
+    center_lon, center_lat = mercator_to_lonlat(cx, cy)
+    return load_link_window(shp_path, float(center_lon), float(center_lat), half)
+
+
+def load_link_arrays(shp_path: Union[str, Path]) -> LinkArrays:
+    """
+    SHP → LinkArrays (SHP 수정시각 기준 프로세스 캐시, 옆에 .links.npz 아티팩트 저장/재사용)
+    링크ID 컬럼 우선순위: k_link_id -> link_id -> LINK_ID
+    """
+    shp_path = Path(shp_path)
+    return _load_link_arrays_cached(str(shp_path), shp_path.stat().st_mtime)
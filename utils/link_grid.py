@@ -0,0 +1,140 @@
+# utils/link_grid.py
+# ---------------------------------------------------------------------
+# 링크 혼잡도 격자(육각/정사각) 집계 — 구·서울 전역 개요용
+# - link_midpoints: 링크(파트) 길이 절반 지점 (EPSG:3857)
+# - hex_cells / square_cells: 좌표 → 셀 (i, j) 정수 좌표 (벡터화 반올림)
+# - LinkGrid: 셀별 링크 수 · 길이가중 일평균/시간대별 혼잡도 (np.bincount)
+# - build_link_grid: SHP + 속도 CSV → LinkGrid (혼잡도 정의는 hour_cube와 동일)
+#
+# 수천 개 링크 선 대신 셀 수백~수천 개의 기둥(ColumnLayer)으로 먼저 보여주고,
+# 사업지를 고르면 반경 링크로 내려간다.
+# ---------------------------------------------------------------------
+
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from utils.hour_cube import load_hour_cube
+from utils.link_geometry import WEB_MERCATOR_R, load_link_arrays
+
+GRID_KINDS = ("hex", "square")
+_SQRT3 = np.sqrt(3.0)
+
+
+def link_midpoints(links) -> np.ndarray:
+    """(n, 2) 링크 행(파트)별 길이 절반 지점 — 꼭짓점 1개 링크는 그 점"""
+    import shapely
+
+    return shapely.get_coordinates(shapely.line_interpolate_point(links.geometries, 0.5, normalized=True))
+
+
+def hex_cells(x, y, size: float) -> np.ndarray:
+    """
+    pointy-top 육각 격자 (외접원 반지름 size) → (n, 2) 축좌표 (q, r)
+    분수 큐브 좌표를 반올림하고 오차가 가장 큰 축을 나머지 두 축으로 보정.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    qf = (_SQRT3 / 3 * x - y / 3) / size
+    rf = (2 / 3 * y) / size
+    sf = -qf - rf
+    q, r, s = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s, q)
+    r = np.where(fix_r, -q - s, r)
+    return np.column_stack([q, r]).astype(np.int64)
+
+
+def hex_centers(cells, size: float) -> np.ndarray:
+    q, r = np.asarray(cells, dtype=float).T
+    return np.column_stack([size * _SQRT3 * (q + r / 2), size * 1.5 * r])
+
+
+def square_cells(x, y, size: float) -> np.ndarray:
+    """한 변 size 정사각 격자 → (n, 2) (i, j)"""
+    return np.column_stack([np.floor(np.asarray(x) / size), np.floor(np.asarray(y) / size)]).astype(np.int64)
+
+
+def square_centers(cells, size: float) -> np.ndarray:
+    return (np.asarray(cells, dtype=float) + 0.5) * size
+
+
+class LinkGrid:
+    """
+    셀 C개
+    - cells   : (C, 2) int64 격자 좌표, centers: (C, 2) EPSG:3857 중심
+    - n_links : (C,) 셀에 중점이 속한 링크(속도 데이터 있는 것) 수
+    - daily   : (C,) 길이가중 일평균 혼잡도(%), hourly: (C, 24)
+    """
+
+    def __init__(self, kind: str, size: float, cells, centers, n_links, daily, hourly):
+        self.kind = kind
+        self.size = float(size)
+        self.cells = np.asarray(cells, dtype=np.int64)
+        self.centers = np.asarray(centers, dtype=float)
+        self.n_links = np.asarray(n_links, dtype=np.int64)
+        self.daily = np.asarray(daily, dtype=float)
+        self.hourly = np.asarray(hourly, dtype=float)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def to_lonlat(self) -> np.ndarray:
+        x, y = self.centers[:, 0], self.centers[:, 1]
+        lon = np.degrees(x / WEB_MERCATOR_R)
+        lat = np.degrees(2 * np.arctan(np.exp(y / WEB_MERCATOR_R)) - np.pi / 2)
+        return np.column_stack([lon, lat])
+
+    def ground_radius_m(self, lat: float) -> float:
+        """셀 외접원 반지름의 실제 지상 거리(m) — 3857 m × cos(위도)"""
+        half = self.size if self.kind == "hex" else self.size / np.sqrt(2)
+        return float(half * np.cos(np.radians(lat)))
+
+    def frame(self, hour=None) -> pd.DataFrame:
+        """지도용 DataFrame [lon, lat, n_links, value] (hour 지정 시 그 시간대, 아니면 일평균)"""
+        ll = self.to_lonlat()
+        value = self.daily if hour is None else self.hourly[:, int(hour)]
+        return pd.DataFrame({"lon": ll[:, 0], "lat": ll[:, 1], "n_links": self.n_links, "value": value})
+
+    @classmethod
+    def from_links(cls, points, weights, hourly, size: float, kind: str = "hex") -> "LinkGrid":
+        """
+        링크 점 (n, 2) · 가중치(길이) (n,) · 시간대별 혼잡도 (n, 24) → 셀 집계
+        값이 없는 시간대는 분자·분모에서 모두 제외.
+        """
+        if kind not in GRID_KINDS:
+            raise ValueError(f"지원하지 않는 격자 종류: {kind} (가능: {GRID_KINDS})")
+        has = np.isfinite(hourly).any(axis=1)
+        points, weights, hourly = points[has], np.asarray(weights, dtype=float)[has], hourly[has]
+        to_cells = hex_cells if kind == "hex" else square_cells
+        cells, cell_of = np.unique(to_cells(points[:, 0], points[:, 1], size), axis=0, return_inverse=True)
+        cell_of = cell_of.ravel()
+        n_cells = len(cells)
+
+        ok = np.isfinite(hourly)
+        w = weights[:, None] * ok
+        flat = cell_of[:, None] * 24 + np.arange(24)            # (셀, 시간) 평탄 인덱스
+        num = np.bincount(flat.ravel(), weights=(np.where(ok, hourly, 0.0) * w).ravel(), minlength=n_cells * 24)
+        den = np.bincount(flat.ravel(), weights=w.ravel(), minlength=n_cells * 24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cell_hourly = (num / den).reshape(n_cells, 24)
+            daily_link = np.nansum(hourly, axis=1) / ok.sum(axis=1)
+            daily = (np.bincount(cell_of, weights=daily_link * weights, minlength=n_cells)
+                     / np.bincount(cell_of, weights=weights, minlength=n_cells))
+        centers = (hex_centers if kind == "hex" else square_centers)(cells, size)
+        return cls(kind, size, cells, centers, np.bincount(cell_of, minlength=n_cells), daily, cell_hourly)
+
+
+def build_link_grid(shp_path: Union[str, Path], csv_path: Union[str, Path],
+                    size: float = 500.0, kind: str = "hex") -> LinkGrid:
+    """링크망 전체 → LinkGrid (링크 중점 기준, 링크 길이 가중)"""
+    links = load_link_arrays(shp_path)
+    cube = load_hour_cube(csv_path)
+    hourly = np.full((len(links), 24), np.nan)
+    rows, src = cube.index.rows(links.keys)
+    hourly[src] = cube.matrix("congestion")[rows]
+    return LinkGrid.from_links(link_midpoints(links), np.maximum(links.lengths, 1.0), hourly, size, kind)
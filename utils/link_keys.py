@@ -0,0 +1,81 @@
+# utils/link_keys.py
+# ---------------------------------------------------------------------
+# 링크 ID 정규화(정수 키) 유틸 — SHP·속도·교통량 데이터 공통
+# - to_link_key: 8891093.0 / "8891093.0" / " 8891093 " → 8891093 (int64)
+#                결측·0·-1·숫자 아님 → INVALID_LINK_KEY(-1)
+# - with_link_key: DataFrame에 link_key 컬럼이 없을 때만 추가
+# - LinkIndex: 정렬된 int64 키 → 행 번호 인덱스 (같은 키 여러 행 허용)
+#
+# 적재 시점에 한 번만 정수 키를 만들고, 이후 조인/필터는 문자열 정규식
+# 대신 정수 비교(searchsorted)로 처리한다.
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+INVALID_LINK_KEY = -1
+
+
+def to_link_key(values) -> np.ndarray:
+    """링크 ID(숫자/문자열 혼재 가능) → int64 키 배열"""
+    s = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values))
+    if s.dtype.kind in "iu":
+        keys = s.to_numpy(dtype=np.int64, copy=True)
+    else:
+        if s.dtype.kind != "f":
+            s = pd.to_numeric(s.astype(str).str.strip(), errors="coerce")
+        f = s.to_numpy(dtype=float, na_value=np.nan)
+        keys = np.where(np.isfinite(f), np.round(f), INVALID_LINK_KEY).astype(np.int64)
+    keys[keys <= 0] = INVALID_LINK_KEY   # 0/-1은 '링크 없음' 표기
+    return keys
+
+
+def with_link_key(df: pd.DataFrame, id_col: str = "link_id") -> pd.DataFrame:
+    """df에 link_key(int64) 컬럼 보장 (이미 있으면 그대로 반환)"""
+    if "link_key" in df.columns:
+        return df
+    out = df.copy()
+    out["link_key"] = to_link_key(out[id_col])
+    return out
+
+
+class LinkIndex:
+    """
+    키 배열(원본 행 순서) → 정렬 인덱스.
+    rows(keys): 요청 키에 해당하는 원본 행 번호와, 각 행이 요청의 몇 번째 키에서
+    왔는지(src)를 함께 반환 — inner merge와 같은 결과를 정수 연산만으로 얻는다.
+    """
+
+    def __init__(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys, self.starts, self.counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _locate(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        pos = np.searchsorted(self.keys, keys)
+        pos_c = np.minimum(pos, max(len(self.keys) - 1, 0))
+        found = (pos < len(self.keys)) & (self.keys[pos_c] == keys) if len(self.keys) else np.zeros(len(keys), bool)
+        found &= keys != INVALID_LINK_KEY
+        return pos_c, found
+
+    def contains(self, keys) -> np.ndarray:
+        return self._locate(keys)[1]
+
+    def rows(self, keys):
+        """(rows, src): 원본 행 번호(요청 키 순서, 키 내부는 원본 순서)와 요청 위치"""
+        pos, found = self._locate(keys)
+        src = np.flatnonzero(found)
+        counts = self.counts[pos[src]]
+        starts = self.starts[pos[src]]
+        total = int(counts.sum())
+        # 각 키의 [start, start + count) 구간을 한 번에 펼침
+        run_start = np.zeros(len(counts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=run_start[1:])
+        flat = np.repeat(starts - run_start, counts) + np.arange(total)
+        return self.order[flat], np.repeat(src, counts)
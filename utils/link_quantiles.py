@@ -0,0 +1,105 @@
+# utils/link_quantiles.py
+# ---------------------------------------------------------------------
+# 서울 전체 / 자치구별 링크 혼잡도 분위수 표 (상대 색 기준용, 데이터셋 버전당 1회)
+# - SEOUL_GU_CODES: SHP sigungu_id(통계청 행정구역 분류 11010~11250) → 구 이름
+# - load_link_gu: SHP 속성만(지오메트리 X) 읽어 링크 키 → 구 이름
+# - LinkQuantiles: 스트리밍 스케치(QuantileSketch) 한 번으로 서울 + 25개 구 분위수
+#     · table(window): [start, end) 구간 평균 분포 / window=None이면 24개 시간대 값 전체
+#     · breaks(scope, window): 색 경계(30/70 분위수) 조회 — 구간별 표는 처음 요청 때 1회 계산
+# - load_link_quantiles: (SHP, 속도 CSV) 수정시각 기준 프로세스 캐시
+#
+# 반경 단위 분위수는 SiteCatchment.quantiles(거리순 스트림)에서 같은 스케치로 만든다.
+# ---------------------------------------------------------------------
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.hour_cube import hour_window_mean
+from utils.link_congestion import load_link_congestion
+from utils.link_geometry import LINK_ID_CANDIDATES
+from utils.link_keys import to_link_key
+from utils.map_style import RELATIVE_QUANTILES
+from utils.quantile_sketch import QUANTILE_LEVELS, QuantileSketch
+
+CITY_SCOPE = "서울"
+
+SEOUL_GU_CODES = {
+    11010: "종로구", 11020: "중구", 11030: "용산구", 11040: "성동구", 11050: "광진구",
+    11060: "동대문구", 11070: "중랑구", 11080: "성북구", 11090: "강북구", 11100: "도봉구",
+    11110: "노원구", 11120: "은평구", 11130: "서대문구", 11140: "마포구", 11150: "양천구",
+    11160: "강서구", 11170: "구로구", 11180: "금천구", 11190: "영등포구", 11200: "동작구",
+    11210: "관악구", 11220: "서초구", 11230: "강남구", 11240: "송파구", 11250: "강동구",
+}
+
+
+def load_link_gu(shp_path: Union[str, Path]) -> pd.DataFrame:
+    """SHP 속성 → [link_key, gu] (구 코드를 모르는 링크는 gu = None)"""
+    import pyogrio
+
+    fields = list(pyogrio.read_info(str(shp_path))["fields"])
+    id_col = next((c for c in LINK_ID_CANDIDATES if c in fields), None)
+    if id_col is None or "sigungu_id" not in fields:
+        raise RuntimeError(f"SHP에 링크ID/sigungu_id 컬럼이 없습니다. (cols={fields})")
+    df = pyogrio.read_dataframe(str(shp_path), columns=[id_col, "sigungu_id"], read_geometry=False)
+    code = pd.to_numeric(df["sigungu_id"], errors="coerce")
+    return pd.DataFrame({"link_key": to_link_key(df[id_col].to_numpy()), "gu": code.map(SEOUL_GU_CODES)})
+
+
+class LinkQuantiles:
+    """
+    링크 n개 (속도 데이터가 있는 링크)
+    - hourly : (n, 24) 혼잡도(%), group: (n,) 구 번호(scopes의 1..; 모르면 -1)
+    - scopes : [서울, 구 …] — 표의 행 순서
+    """
+
+    def __init__(self, hourly, gu, levels=QUANTILE_LEVELS):
+        self.hourly = np.asarray(hourly, dtype=float)
+        gu = pd.Series(gu, dtype=object)
+        names = sorted(gu.dropna().unique())
+        self.scopes = [CITY_SCOPE] + names
+        self.group = gu.map({g: i + 1 for i, g in enumerate(names)}).fillna(-1).to_numpy(dtype=np.int64)
+        self.levels = tuple(levels)
+        self._tables = {}
+
+    def _quantiles(self, values) -> np.ndarray:
+        """values (n,) 또는 (n, 24) → (1 + 구 수, L) — 서울 전체 + 구별을 한 스케치에서"""
+        cols = 1 if values.ndim == 1 else values.shape[1]
+        group = np.repeat(self.group, cols)
+        sketch = QuantileSketch(n_groups=len(self.scopes))
+        sketch.update(values, np.zeros_like(group))
+        sketch.update(values, group)
+        return sketch.quantiles(self.levels)
+
+    def table(self, window: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
+        """scope × 분위수 표 (index = scope, columns = p10, p30, …)"""
+        key = None if window is None else (int(window[0]), int(window[1]))
+        if key not in self._tables:
+            values = self.hourly if key is None else hour_window_mean(self.hourly, *key)
+            self._tables[key] = pd.DataFrame(self._quantiles(values), index=self.scopes,
+                                             columns=[f"p{q:g}" for q in self.levels])
+        return self._tables[key]
+
+    def breaks(self, scope: str, window=None, quantiles=RELATIVE_QUANTILES) -> Tuple[float, float]:
+        """scope(서울/구 이름)의 (lo, hi) 색 경계 — 모르는 구는 서울 전체"""
+        table = self.table(window)
+        row = table.loc[scope if scope in table.index else CITY_SCOPE]
+        lo, hi = (float(row[f"p{q:g}"]) for q in quantiles)
+        return lo, hi
+
+
+@lru_cache(maxsize=2)
+def _load_link_quantiles_cached(shp_path: str, csv_path: str, shp_mtime: float, csv_mtime: float) -> LinkQuantiles:
+    table = load_link_congestion(csv_path)
+    gu = load_link_gu(shp_path).drop_duplicates("link_key").set_index("link_key")["gu"]
+    return LinkQuantiles(table.congestion, gu.reindex(table.keys).to_numpy())
+
+
+def load_link_quantiles(shp_path: Union[str, Path], csv_path: Union[str, Path]) -> LinkQuantiles:
+    """(SHP, 속도 CSV) → LinkQuantiles (원천 파일 수정시각 기준 프로세스 캐시, 반환 객체는 공유)"""
+    shp_path, csv_path = Path(shp_path), Path(csv_path)
+    return _load_link_quantiles_cached(str(shp_path), str(csv_path),
+                                       shp_path.stat().st_mtime, csv_path.stat().st_mtime)
@@ -0,0 +1,361 @@
+# utils/link_tiles.py
+# ---------------------------------------------------------------------
+# 서울 전체 링크망 → Mapbox Vector Tile(.pbf) 정적 타일 세트
+# - tile_range: EPSG:3857 bbox → 줌 z의 타일 x/y 범위 (XYZ, y는 북쪽이 0)
+# - encode_tile: 타일 좌표(정수) 폴리라인 + 속성 → MVT 2.1 바이트 (protobuf 직접 인코딩)
+# - build_link_tiles: 줌별로 링크를 타일 경계(+버퍼)로 잘라 {z}/{x}/{y}.pbf 저장
+#     속성: link(키) · daily(일평균 혼잡도) · am/pm(첨두 구간 평균) · tooltip_html
+# - serve_tiles: (선택) 정적 디렉터리를 CORS 허용 HTTP로 서빙
+#
+# 빌드:  python -m utils.link_tiles            → app/static/link_tiles/
+# 서빙:  Streamlit 정적 서빙(.streamlit/config.toml: server.enableStaticServing)
+#        또는 python -m utils.link_tiles --serve 8765
+# 앱은 pydeck MVTLayer로 화면에 보이는 타일만 받아 그린다.
+# ---------------------------------------------------------------------
+
+import json
+import struct
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import shapely
+
+from utils.hour_cube import HOUR_WINDOWS, load_hour_cube
+from utils.link_geometry import WEB_MERCATOR_R, load_link_arrays, tolerance_for_zoom
+from utils.map_style import fmt_num, tooltip_html
+
+TILE_EXTENT = 4096           # 타일 내부 좌표 범위 (MVT 기본값)
+TILE_BUFFER = 64             # 타일 경계 밖 여유(타일 좌표 단위) — 경계 선 끊김 방지
+TILE_ZOOMS = range(11, 16)   # 11~15 (15 초과는 MVTLayer가 15 타일을 확대)
+TILE_LAYER = "links"
+TILE_FORMAT_VERSION = 1
+_ORIGIN = np.pi * WEB_MERCATOR_R   # EPSG:3857 세계 좌표 범위의 절반
+
+
+# ---------------------------------------------------------------------
+# 타일 좌표
+# ---------------------------------------------------------------------
+def tile_size_m(z: int) -> float:
+    return 2 * _ORIGIN / (1 << z)
+
+
+def tile_range(bbox, z: int):
+    """(minx, miny, maxx, maxy) 3857 → (x0, y0, x1, y1) 포함 범위 (배열 입력 가능)"""
+    minx, miny, maxx, maxy = (np.asarray(v, dtype=float) for v in bbox)
+    size = tile_size_m(z)
+    last = (1 << z) - 1
+    x0 = np.clip(np.floor((minx + _ORIGIN) / size), 0, last).astype(np.int64)
+    x1 = np.clip(np.floor((maxx + _ORIGIN) / size), 0, last).astype(np.int64)
+    y0 = np.clip(np.floor((_ORIGIN - maxy) / size), 0, last).astype(np.int64)
+    y1 = np.clip(np.floor((_ORIGIN - miny) / size), 0, last).astype(np.int64)
+    return x0, y0, x1, y1
+
+
+def tile_bounds(z: int, x, y):
+    """타일 (z, x, y) → 3857 bbox (minx, miny, maxx, maxy)"""
+    size = tile_size_m(z)
+    minx = np.asarray(x) * size - _ORIGIN
+    maxy = _ORIGIN - np.asarray(y) * size
+    return minx, maxy - size, minx + size, maxy
+
+
+# ---------------------------------------------------------------------
+# protobuf 인코딩 (vector_tile.proto 2.1 — 필요한 필드만)
+# ---------------------------------------------------------------------
+def _varints(values) -> bytes:
+    """부호 없는 정수 배열 → 이어붙인 varint 바이트 (벡터화)"""
+    v = np.asarray(values, dtype=np.uint64)
+    if not len(v):
+        return b""
+    nbytes = np.ones(len(v), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += v >= np.uint64(1 << (7 * k))
+    starts = np.zeros(len(v), dtype=np.int64)
+    np.cumsum(nbytes[:-1], out=starts[1:])
+    out = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max())):
+        m = nbytes > k
+        byte = (v[m] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        out[starts[m] + k] = byte | np.where(nbytes[m] > k + 1, np.uint64(0x80), np.uint64(0))
+    return out.tobytes()
+
+
+def _varint(value: int) -> bytes:
+    """단일 varint (태그·길이 등 스칼라용 — 배열 경로보다 빠름)"""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(num: int, payload: bytes) -> bytes:
+    """length-delimited 필드 (wire type 2)"""
+    return _varint((num << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _zigzag(v: np.ndarray) -> np.ndarray:
+    v = v.astype(np.int64)
+    return ((v << 1) ^ (v >> 63)).astype(np.uint64)
+
+
+def _value(v) -> bytes:
+    """Layer.values 항목: 문자열(1) / double(3) / uint(5)"""
+    if isinstance(v, str):
+        return _field(1, v.encode("utf-8"))
+    if isinstance(v, (int, np.integer)):
+        return _varint((5 << 3) | 0) + _varint(int(v))
+    return _varint((3 << 3) | 1) + struct.pack("<d", float(v))
+
+
+def _line_geometry(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    타일 정수 좌표 파트들 → MVT 명령 배열 (MoveTo 1 + LineTo n-1, 커서 기준 zigzag 델타)
+    파트 사이에도 커서는 이어진다.
+    """
+    counts = np.diff(offsets)
+    delta = np.diff(np.vstack([[0, 0], coords]), axis=0)
+    zz = _zigzag(delta).reshape(-1)                          # 꼭짓점마다 (dx, dy)
+    # 파트 p: [MoveTo|1] dx dy [LineTo|(n-1)] (dx dy)*(n-1) → 길이 2n + 2
+    out_len = 2 * counts + 2
+    starts = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(out_len[:-1], out=starts[1:])
+    out = np.zeros(int(out_len.sum()), dtype=np.uint64)
+    out[starts] = 9                                          # MoveTo(1), count 1
+    out[starts + 3] = 2 | ((counts - 1) << 3)                # LineTo(2), count n-1
+    # 좌표 위치: 첫 꼭짓점 → starts+1,2 / 나머지 → starts+4 ...
+    vert_part = np.repeat(np.arange(len(counts)), counts)
+    vert_rank = np.arange(len(coords)) - offsets[:-1][vert_part]
+    pos = starts[vert_part] + 1 + 2 * vert_rank + np.where(vert_rank > 0, 1, 0)
+    out[pos] = zz[0::2]
+    out[pos + 1] = zz[1::2]
+    return out
+
+
+def encode_tile(coords, offsets, feature_of_part, feature_ids, properties: dict,
+                layer: str = TILE_LAYER, extent: int = TILE_EXTENT) -> bytes:
+    """
+    한 타일의 MVT 바이트
+    - coords (N, 2) int: 타일 좌표(0..extent, 버퍼 밖 허용), offsets (P + 1,): 파트 구간
+    - feature_of_part (P,): 파트 → 피처 번호(0..F-1, 오름차순), feature_ids (F,) 피처 id
+    - properties: {속성명: (F,) 배열} — NaN 값은 태그 생략
+    """
+    keys = list(properties)
+    value_table, value_index = [], {}
+    feat_tags = [[] for _ in range(len(feature_ids))]
+    for ki, name in enumerate(keys):
+        for fi, v in enumerate(properties[name]):
+            if isinstance(v, (float, np.floating)) and not np.isfinite(v):
+                continue
+            v = v.item() if isinstance(v, np.generic) else v
+            vi = value_index.setdefault((type(v).__name__, v), len(value_table))
+            if vi == len(value_table):
+                value_table.append(v)
+            feat_tags[fi] += (ki, vi)
+
+    part_start = np.searchsorted(feature_of_part, np.arange(len(feature_ids) + 1))
+    features = []
+    for fi, fid in enumerate(feature_ids):
+        p0, p1 = part_start[fi], part_start[fi + 1]
+        geom = _line_geometry(coords[offsets[p0]:offsets[p1]], offsets[p0:p1 + 1] - offsets[p0])
+        features.append(
+            _varint((1 << 3) | 0) + _varint(int(fid))
+            + _field(2, _varints(feat_tags[fi]))
+            + _varint((3 << 3) | 0) + _varint(2)             # GeomType.LINESTRING
+            + _field(4, _varints(geom))
+        )
+    body = (
+        _varint((15 << 3) | 0) + _varint(2)                  # version 2
+        + _field(1, layer.encode("utf-8"))
+        + b"".join(_field(2, f) for f in features)
+        + b"".join(_field(3, k.encode("utf-8")) for k in keys)
+        + b"".join(_field(4, _value(v)) for v in value_table)
+        + _varint((5 << 3) | 0) + _varint(extent)
+    )
+    return _field(3, body)
+
+
+# ---------------------------------------------------------------------
+# 타일 세트 빌드
+# ---------------------------------------------------------------------
+def _quantize(parts_coords, part_idx, n_parts, minx, maxy, size, extent):
+    """
+    잘린 파트 좌표(3857) → 타일 정수 좌표, 연속 중복점 제거 후 꼭짓점 2개 미만 파트 제외
+    반환: (coords, offsets, keep_part)
+    """
+    q = np.empty((len(parts_coords), 2), dtype=np.int64)
+    q[:, 0] = np.round((parts_coords[:, 0] - minx[part_idx]) / size * extent)
+    q[:, 1] = np.round((maxy[part_idx] - parts_coords[:, 1]) / size * extent)
+    dup = np.r_[False, (part_idx[1:] == part_idx[:-1]) & np.all(q[1:] == q[:-1], axis=1)]
+    q, part_idx = q[~dup], part_idx[~dup]
+    counts = np.bincount(part_idx, minlength=n_parts)
+    keep = counts >= 2
+    q = q[keep[part_idx]]
+    offsets = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    np.cumsum(counts[keep], out=offsets[1:])
+    return q, offsets, keep
+
+
+def link_tile_attributes(csv_path: Union[str, Path], keys: np.ndarray) -> dict:
+    """링크 키 → 타일 속성 {daily, am, pm} (없는 링크 NaN, 소수 1자리)"""
+    cube = load_hour_cube(csv_path)
+    out = {}
+    for name, (s, e) in (("daily", HOUR_WINDOWS["종일"]),
+                         ("am", HOUR_WINDOWS["오전 첨두(7–9시)"]),
+                         ("pm", HOUR_WINDOWS["오후 첨두(17–19시)"])):
+        out[name] = np.round(cube.window_mean("congestion", s, e, keys=keys), 1)
+    return out
+
+
+def _tooltips(keys, attrs) -> np.ndarray:
+    return tooltip_html([
+        ("<b>링크:</b> ", keys),
+        ("<b>일평균 혼잡도:</b> ", fmt_num(attrs["daily"], 1) + "%"),
+        ("<b>오전 첨두(7–9시):</b> ", fmt_num(attrs["am"], 1) + "%"),
+        ("<b>오후 첨두(17–19시):</b> ", fmt_num(attrs["pm"], 1) + "%"),
+    ]).to_numpy()
+
+
+def build_link_tiles(
+        shp_path: Union[str, Path],
+        csv_path: Union[str, Path],
+        out_dir: Union[str, Path],
+        zooms=TILE_ZOOMS,
+) -> dict:
+    """
+    링크망 전체 → out_dir/{z}/{x}/{y}.pbf (+ meta.json)
+    줌마다 단순화 단계를 고른 뒤 (링크 파트, 타일) 쌍을 bbox로 한 번에 펼치고
+    shapely.intersection으로 일괄 절단.
+    """
+    out_dir = Path(out_dir)
+    links = load_link_arrays(shp_path)
+    ukeys, inverse = np.unique(links.keys, return_inverse=True)   # 멀티파트 → 피처 1개
+    attrs = link_tile_attributes(csv_path, ukeys)
+    tips = _tooltips(ukeys, attrs)
+    stats = {}
+
+    for z in zooms:
+        # 줌별 단순화 단계 (아티팩트에 저장된 Douglas–Peucker tier, 0.5px 이하 오차)
+        tier = links.simplified(tolerance_for_zoom(z))
+        geoms, bx = tier.geometries, tier.bbox
+        size = tile_size_m(z)
+        x0, y0, x1, y1 = tile_range((bx[:, 0], bx[:, 1], bx[:, 2], bx[:, 3]), z)
+        nx, ny = x1 - x0 + 1, y1 - y0 + 1
+        n_pair = nx * ny
+        row = np.repeat(np.arange(len(links)), n_pair)
+        rank = np.arange(int(n_pair.sum())) - np.repeat(np.cumsum(n_pair) - n_pair, n_pair)
+        tx = x0[row] + rank % nx[row]
+        ty = y0[row] + rank // nx[row]
+
+        minx, miny, maxx, maxy = tile_bounds(z, tx, ty)
+        pad = size * TILE_BUFFER / TILE_EXTENT
+        clipped = shapely.intersection(geoms[row], shapely.box(minx - pad, miny - pad, maxx + pad, maxy + pad))
+        parts, pair_of_part = shapely.get_parts(clipped, return_index=True)
+        is_line = shapely.get_type_id(parts) == 1
+        parts, pair_of_part = parts[is_line], pair_of_part[is_line]
+        pc, part_idx = shapely.get_coordinates(parts, return_index=True)
+        q, offsets, keep = _quantize(pc, part_idx, len(parts), minx[pair_of_part], maxy[pair_of_part],
+                                     size, TILE_EXTENT)
+        pair_of_part = pair_of_part[keep]
+
+        # 타일 → 피처(링크 키) → 파트 순 정렬
+        tile_id = tx[pair_of_part] * (1 << z) + ty[pair_of_part]
+        feat = inverse[row[pair_of_part]]
+        order = np.lexsort((feat, tile_id))
+        counts = np.diff(offsets)[order]
+        new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=new_offsets[1:])
+        q = q[np.repeat(offsets[:-1][order] - new_offsets[:-1], counts) + np.arange(int(counts.sum()))]
+        offsets = new_offsets
+        tile_id, feat = tile_id[order], feat[order]
+
+        bounds = np.flatnonzero(np.r_[True, tile_id[1:] != tile_id[:-1], True])
+        total = 0
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            t = int(tile_id[a])
+            fx, fy = t >> z, t & ((1 << z) - 1)
+            f_uniq, f_local = np.unique(feat[a:b], return_inverse=True)
+            data = encode_tile(
+                q[offsets[a]:offsets[b]], offsets[a:b + 1] - offsets[a], f_local, ukeys[f_uniq],
+                {"link": ukeys[f_uniq], "daily": attrs["daily"][f_uniq], "am": attrs["am"][f_uniq],
+                 "pm": attrs["pm"][f_uniq], "tooltip_html": tips[f_uniq]},
+            )
+            path = out_dir / str(z) / str(fx) / f"{fy}.pbf"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            total += len(data)
+        stats[z] = {"tiles": len(bounds) - 1, "bytes": total}
+
+    meta = {
+        "version": TILE_FORMAT_VERSION,
+        "layer": TILE_LAYER,
+        "min_zoom": min(zooms),
+        "max_zoom": max(zooms),
+        "bounds_lonlat": _lonlat_bounds(links),
+        "built_from_mtime": max(Path(shp_path).stat().st_mtime, Path(csv_path).stat().st_mtime),
+        "stats": stats,
+    }
+    (out_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    return meta
+
+
+def _lonlat_bounds(links) -> list:
+    ll = links.to_lonlat()
+    return [float(ll[:, 0].min()), float(ll[:, 1].min()), float(ll[:, 0].max()), float(ll[:, 1].max())]
+
+
+def load_tile_meta(out_dir: Union[str, Path], *sources):
+    """meta.json → dict (없거나 버전이 다르거나 원천 파일이 더 새것이면 None)"""
+    path = Path(out_dir) / "meta.json"
+    if not path.exists():
+        return None
+    try:
+        meta = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != TILE_FORMAT_VERSION:
+        return None
+    built = float(meta.get("built_from_mtime", 0))
+    if any(Path(p).exists() and Path(p).stat().st_mtime > built for p in sources):
+        return None
+    return meta
+
+
+def serve_tiles(out_dir: Union[str, Path], port: int = 8765):
+    """정적 타일 디렉터리를 CORS 허용 HTTP로 서빙 (Streamlit 정적 서빙을 쓰지 않을 때)"""
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(SimpleHTTPRequestHandler):
+        extensions_map = {**SimpleHTTPRequestHandler.extensions_map, ".pbf": "application/x-protobuf"}
+
+        def end_headers(self):
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Cache-Control", "public, max-age=3600")
+            super().end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(Handler, directory=str(out_dir)))
+    print(f"link tiles: http://127.0.0.1:{port}/{{z}}/{{x}}/{{y}}.pbf")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    root = Path(__file__).resolve().parent.parent
+    tiles_dir = root / "app" / "static" / "link_tiles"
+    ap = argparse.ArgumentParser(description="서울 링크망 벡터 타일 빌드/서빙")
+    ap.add_argument("--serve", type=int, metavar="PORT", help="빌드 대신 타일 디렉터리를 HTTP로 서빙")
+    args = ap.parse_args()
+    if args.serve:
+        serve_tiles(tiles_dir, args.serve)
+    else:
+        t0 = time.time()
+        meta = build_link_tiles(root / "data" / "seoul_link_lev5.5_2023.shp",
+                                root / "data" / "AverageSpeed_Seoul_2023.csv", tiles_dir)
+        for z, s in meta["stats"].items():
+            print(f"z{z}: {s['tiles']} tiles, {s['bytes'] / 1e3:.0f} KB")
+        print(f"→ {tiles_dir} ({time.time() - t0:.1f}s)")
@@ -0,0 +1,47 @@
+# utils/map_payload.py
+# ---------------------------------------------------------------------
+# pydeck 지도 레이어용 경량 페이로드 유틸
+# - ragged_from_geoms: (Multi)LineString 배열 → 평탄 좌표 배열 + 오프셋 배열
+# - path_frame: 좌표/오프셋 + 링크별 컬럼 → PathLayer용 DataFrame
+#
+# GeoDataFrame.to_json() → json.loads() 왕복과 모든 컬럼의 properties 전송을
+# 피하고, 필요한 컬럼(path/색/값/툴팁)만 PathLayer에 싣기 위한 것.
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+import shapely
+
+COORD_DECIMALS = 6  # 경위도 소수 6자리 ≈ 0.1 m
+
+
+def ragged_from_geoms(geoms):
+    """
+    LineString/MultiLineString 배열 → (coords, offsets, parent)
+    - coords : (N, 2) float64, 모든 선형 파트의 좌표를 이어붙인 평탄 배열
+    - offsets: (P + 1,) int64, 파트 p의 좌표 = coords[offsets[p]:offsets[p + 1]]
+    - parent : (P,) int64, 파트 p가 속한 입력 지오메트리 행 번호
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    parts, parent = shapely.get_parts(geoms, return_index=True)
+    coords, part_idx = shapely.get_coordinates(parts, return_index=True)
+    counts = np.bincount(part_idx, minlength=len(parts))
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return coords, offsets, parent.astype(np.int64)
+
+
+def path_frame(coords, offsets, parent=None, decimals: int = COORD_DECIMALS, **columns) -> pd.DataFrame:
+    """
+    PathLayer data: 행 = 선형 파트 1개, path = [[lon, lat], ...]
+    columns는 원본 행(링크) 단위 배열이며 parent로 파트에 펼쳐짐.
+    """
+    n_parts = len(offsets) - 1
+    parent = np.arange(n_parts) if parent is None else np.asarray(parent)
+    flat = np.round(np.asarray(coords, dtype=float), decimals)
+    paths = [p.tolist() for p in np.split(flat, offsets[1:-1])] if n_parts else []
+    out = pd.DataFrame({"path": pd.Series(paths, dtype=object)})
+    for name, values in columns.items():
+        values = np.asarray(values)
+        out[name] = values[parent].tolist() if values.ndim > 1 else values[parent]
+    return out
@@ -0,0 +1,96 @@
+# utils/map_style.py
+# ---------------------------------------------------------------------
+# 지도 레이어 색상·툴팁 벡터화 유틸 (행 단위 apply 대신 배열 연산)
+# - congestion_bucket: 혼잡도 배열 → 구간 번호 (np.select, 0 초록 · 1 노랑 · 2 빨강 · 3 결측)
+# - quantile_breaks: 상대 기준(분포의 30/70 분위수) 경계
+# - congestion_rgba: 혼잡도 배열 → RGBA (LUT 인덱싱, 입력 shape 유지 + 마지막 축 4)
+#     · breaks 지정 시 그 경계(사전계산 분위수 표 등)를 그대로 사용
+# - rgba_column: (n, 4) RGBA → pydeck get_color용 리스트 컬럼
+# - fmt_num / tooltip_html: 숫자 서식 + 문자열 컬럼 이어붙이기로 툴팁 HTML 일괄 생성
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+CONGESTION_BREAKS = (30.0, 70.0)    # 절대 색 기준(%)
+RELATIVE_QUANTILES = (30, 70)       # 상대 색 기준(분위수, %)
+LINK_ALPHA = 220
+
+# 구간 번호 → RGBA (초록 · 노랑 · 빨강 · 결측 회색)
+CONGESTION_LUT = np.array([
+    [0, 200, 0, LINK_ALPHA],
+    [255, 200, 0, LINK_ALPHA],
+    [255, 0, 0, LINK_ALPHA],
+    [200, 200, 200, LINK_ALPHA],
+], dtype=np.uint8)
+MISSING_BUCKET = 3
+
+
+def congestion_bucket(values, breaks=CONGESTION_BREAKS) -> np.ndarray:
+    """값 < lo → 0, < hi → 1, 그 외 → 2, NaN → 3 (입력 shape 유지)"""
+    v = np.asarray(values, dtype=float)
+    lo, hi = breaks
+    ok = np.isfinite(v)
+    with np.errstate(invalid="ignore"):
+        return np.select([~ok, v < lo, v < hi], [MISSING_BUCKET, 0, 1], default=2).astype(np.int8)
+
+
+def quantile_breaks(values, quantiles=RELATIVE_QUANTILES):
+    """유효값 분포의 분위수 경계 (유효값이 없으면 절대 기준)"""
+    v = np.asarray(values, dtype=float)
+    v = v[np.isfinite(v)]
+    if not len(v):
+        return CONGESTION_BREAKS
+    lo, hi = np.percentile(v, quantiles)
+    return float(lo), float(hi)
+
+
+def congestion_rgba(values, relative: bool = False, breaks=None) -> np.ndarray:
+    """
+    혼잡도 → RGBA uint8 (..., 4)
+    breaks=(lo, hi) 지정 시 그 경계, 아니면 relative=True면 같은 배열의 30/70 분위수, 그 외 절대 기준
+    """
+    if breaks is None:
+        breaks = quantile_breaks(values) if relative else CONGESTION_BREAKS
+    return CONGESTION_LUT[congestion_bucket(values, breaks)]
+
+
+def rgba_column(rgba) -> list:
+    """(n, 4) → [[r, g, b, a], ...] (pydeck 색 접근자 컬럼)"""
+    return np.asarray(rgba).tolist()
+
+
+def fmt_num(values, decimals: int = 1, thousands: bool = False, na: str = "-") -> pd.Series:
+    """숫자 배열 → 문자열 Series (결측은 na)"""
+    s = pd.Series(np.asarray(values, dtype=float))
+    if thousands:
+        text = s.map(f"{{:,.{decimals}f}}".format)
+    else:
+        text = s.round(decimals).astype(str)
+    return text.where(s.notna(), na)
+
+
+def tooltip_html(lines, title=None, index=None) -> pd.Series:
+    """
+    툴팁 HTML 일괄 생성 (행마다 f-string 대신 컬럼 단위 문자열 더하기)
+    - lines : (접두 HTML, 값 배열[, 표시 여부 bool 배열]) 목록 → 줄마다 "<br/>" 구분
+              예) ("<b>링크:</b> ", keys) / ("자치구: ", gu) / ("주변 혼잡도: ", txt, mask)
+    - title : 첫 줄(굵게) 값 배열 또는 None
+    """
+    parts = []
+    if title is not None:
+        parts.append("<b>" + pd.Series(np.asarray(title, dtype=object)).astype(str).to_numpy() + "</b>")
+    for line in lines:
+        piece = line[0] + pd.Series(np.asarray(line[1], dtype=object)).astype(str).to_numpy()
+        if len(line) > 2:
+            piece = np.where(np.asarray(line[2], dtype=bool), piece, None)
+        parts.append(piece)
+    if not parts:
+        return pd.Series([], dtype=object, index=index)
+    out = pd.Series(parts[0], dtype=object)
+    for piece in parts[1:]:
+        # 숨김 줄(None)은 구분자까지 생략
+        out = out + pd.Series(np.where(pd.isna(piece), "", "<br/>" + pd.Series(piece).fillna("")), dtype=object)
+    if index is not None:
+        out.index = index
+    return out
@@ -0,0 +1,91 @@
+# utils/memo.py
+# ---------------------------------------------------------------------
+# 입력 튜플 기반 메모이제이션 유틸 (Streamlit 비의존)
+# - normalize_key: 숫자/배열/DataFrame 입력을 해시 가능한 튜플로 정규화
+# - BoundedCache: 크기 제한 LRU 캐시 + hit/miss 카운터
+# ---------------------------------------------------------------------
+
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_key(*values, ndigits: int = 6) -> tuple:
+    """
+    캐시 키 정규화:
+    - float/np.floating → round(ndigits) (위젯 float 오차로 인한 miss 방지)
+    - np.integer/bool → int
+    - list/tuple/ndarray/Series → 원소별 정규화 튜플
+    - DataFrame → (컬럼명 튜플, 행 튜플...)
+    """
+    def _norm(v):
+        if isinstance(v, (bool, np.bool_)):
+            return bool(v)
+        if isinstance(v, (int, np.integer)):
+            return int(v)
+        if isinstance(v, (float, np.floating)):
+            v = float(v)
+            return v if np.isnan(v) else round(v, ndigits)
+        if isinstance(v, pd.DataFrame):
+            return (tuple(map(str, v.columns)),) + tuple(
+                tuple(_norm(x) for x in row) for row in v.itertuples(index=False, name=None)
+            )
+        if isinstance(v, (pd.Series, np.ndarray, list, tuple)):
+            return tuple(_norm(x) for x in (v.tolist() if hasattr(v, "tolist") else v))
+        if isinstance(v, dict):
+            return tuple(sorted((str(k), _norm(x)) for k, x in v.items()))
+        return v
+
+    return tuple(_norm(v) for v in values)
+
+
+class BoundedCache:
+    """
+    최근 사용 순(LRU)으로 최대 maxsize개 결과만 보관하는 캐시.
+    hits/misses로 재계산 회피 효과를 확인할 수 있음.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = max(1, int(maxsize))
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_compute(self, key, fn):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = fn()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,93 @@
+# utils/pipeline.py
+# ---------------------------------------------------------------------
+# 의존성 추적형 메모이제이션 계산 그래프 (Streamlit 비의존)
+# - ComputeGraph.add: 이름 있는 노드 등록 (상위 노드 deps + 자기 파라미터 params)
+# - ComputeGraph.evaluate: 필요한 노드만 계산, 나머지는 캐시 재사용
+#
+# 노드 키 = hash(노드명, 노드 함수 코드, 자기 파라미터 값, 상위 노드 키)
+#   → 상위 노드의 '출력'을 해시하지 않고 키만 전파(머클 방식)하므로
+#     큰 DataFrame도 해시 비용 없이 변경 여부를 판단할 수 있다.
+#   → 예) color_mode만 바뀌면 color 노드와 그 하위만 다시 계산.
+#   → 노드 함수 코드가 바뀌면(코드 재적재) 이전 결과를 쓰지 않는다.
+#
+# store: 노드 캐시·실행 횟수를 담는 dict (세션 상태 등 바깥에 두면 그래프는 매 실행 새로 만들어도
+#        메모가 유지되고, 노드 함수(클로저)는 항상 현재 실행의 것을 쓴다)
+# ---------------------------------------------------------------------
+
+import hashlib
+from typing import Optional
+
+from utils.memo import BoundedCache, normalize_key
+
+
+class ComputeGraph:
+    def __init__(self, cache_size: int = 8, store: Optional[dict] = None):
+        self.cache_size = cache_size
+        store = {} if store is None else store
+        self._nodes = {}                                # name -> (fn, deps, params)
+        self._caches = store.setdefault("caches", {})   # name -> BoundedCache
+        self.runs = store.setdefault("runs", {})        # name -> 실제 계산 횟수
+
+    def add(self, name: str, fn, deps=(), params=()):
+        """
+        fn(*상위 노드 출력, **자기 파라미터) 형태로 호출되는 노드 등록.
+        deps는 이미 등록된 노드만 허용(등록 순서 = 위상 정렬 순서).
+        """
+        missing = [d for d in deps if d not in self._nodes]
+        if missing:
+            raise KeyError(f"노드 '{name}'의 상위 노드가 등록되지 않았습니다: {missing}")
+        self._nodes[name] = (fn, tuple(deps), tuple(params))
+        self._caches.setdefault(name, BoundedCache(maxsize=self.cache_size))
+        self.runs.setdefault(name, 0)
+        return self
+
+    def key(self, name: str, params: dict, _memo=None) -> str:
+        _memo = {} if _memo is None else _memo
+        if name in _memo:
+            return _memo[name]
+        fn, deps, own = self._nodes[name]
+        try:
+            own_vals = normalize_key(*[params[p] for p in own])
+        except KeyError as e:
+            raise KeyError(f"노드 '{name}'에 필요한 파라미터가 없습니다: {e}") from None
+        dep_keys = tuple(self.key(d, params, _memo) for d in deps)
+        code = hash(getattr(fn, "__code__", fn))
+        k = hashlib.sha1(repr((name, code, own, own_vals, dep_keys)).encode("utf-8")).hexdigest()
+        _memo[name] = k
+        return k
+
+    def evaluate(self, name: str, **params):
+        """name 노드 출력 반환 (입력 키가 같은 노드는 재계산하지 않음)"""
+        return self._evaluate(name, params, {})
+
+    def _evaluate(self, name, params, _memo):
+        fn, deps, own = self._nodes[name]
+        k = self.key(name, params, _memo)
+
+        def _compute():
+            args = [self._evaluate(d, params, _memo) for d in deps]
+            self.runs[name] += 1
+            return fn(*args, **{p: params[p] for p in own})
+
+        return self._caches[name].get_or_compute(k, _compute)
+
+    def clear(self):
+        for c in self._caches.values():
+            c.clear()
+        for name in self.runs:
+            self.runs[name] = 0
+
+    def stats(self) -> dict:
+        """노드별 {runs, hits, misses, size}"""
+        out = {}
+        for name, (fn, deps, own) in self._nodes.items():
+            s = self._caches[name].stats()
+            out[name] = {
+                "deps": ", ".join(deps),
+                "params": ", ".join(own),
+                "runs": self.runs[name],
+                "hits": s["hits"],
+                "misses": s["misses"],
+                "size": s["size"],
+            }
+        return out
@@ -0,0 +1,76 @@
+# utils/point_clusters.py
+# ---------------------------------------------------------------------
+# 사업지 점 격자 기반 계층 클러스터 (저줌 지도용)
+# - PointClusters: 줌 단계마다 화면 cell_px 픽셀 격자(EPSG:3857)로 점을 묶음
+#     · 줌이 1 오르면 셀이 정확히 4등분 → 줌 z 클러스터는 z-1 클러스터 안에 포함(계층)
+#     · labels[z] (n,) 점 → 클러스터, parent[z] 클러스터 → 한 단계 위 클러스터
+# - clusters(zoom, mask): 보이는(필터된) 점만 bincount로 개수·중심 재집계
+#
+# 데이터셋(좌표 파일)마다 한 번 만들고, 필터·줌 변경은 배열 인덱싱만 한다.
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+from utils.link_geometry import WEB_MERCATOR_R, lonlat_to_mercator, pixel_size_m
+
+CLUSTER_ZOOMS = range(8, 17)     # 8 ~ 16
+CLUSTER_CELL_PX = 48             # 클러스터 격자 한 변 (화면 픽셀)
+
+
+class PointClusters:
+    """
+    lon/lat (n,) 점 → 줌별 격자 클러스터
+    labels[z] : (n,) 클러스터 번호 (좌표 없는 점은 -1)
+    parent[z] : (C_z,) 줌 z-1의 상위 클러스터 번호 (최저 줌은 없음)
+    """
+
+    def __init__(self, lon, lat, zooms=CLUSTER_ZOOMS, cell_px: int = CLUSTER_CELL_PX):
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        self.valid = np.isfinite(lon) & np.isfinite(lat)
+        self.x, self.y = lonlat_to_mercator(np.where(self.valid, lon, 0.0), np.where(self.valid, lat, 0.0))
+        self.zooms = list(zooms)
+        self.cell_px = cell_px
+        self.labels = {}
+        self.parent = {}
+        prev = None
+        for z in self.zooms:
+            size = cell_px * pixel_size_m(z)
+            cell = np.column_stack([np.floor(self.x / size), np.floor(self.y / size)]).astype(np.int64)
+            _, lab = np.unique(cell[self.valid], axis=0, return_inverse=True)
+            labels = np.full(len(lon), -1, dtype=np.int64)
+            labels[self.valid] = lab.ravel()
+            self.labels[z] = labels
+            if prev is not None:
+                par = np.full(int(labels.max()) + 1 if self.valid.any() else 0, -1, dtype=np.int64)
+                par[labels[self.valid]] = self.labels[prev][self.valid]
+                self.parent[z] = par
+            prev = z
+
+    def __len__(self):
+        return len(self.x)
+
+    def level(self, zoom: float) -> int:
+        """zoom 이하 가장 가까운 저장 단계 (범위 밖은 양 끝)"""
+        lower = [z for z in self.zooms if z <= zoom]
+        return lower[-1] if lower else self.zooms[0]
+
+    def clusters(self, zoom: float, mask=None) -> pd.DataFrame:
+        """
+        줌 zoom에서 mask(보이는 점)만의 클러스터 [lon, lat, count, member]
+        member = 클러스터의 첫 점 행 번호 (count == 1이면 그 점 자체)
+        """
+        labels = self.labels[self.level(zoom)]
+        keep = self.valid if mask is None else (self.valid & np.asarray(mask, dtype=bool))
+        idx = np.flatnonzero(keep)
+        lab = labels[idx]
+        uniq, inv, count = np.unique(lab, return_inverse=True, return_counts=True)
+        inv = inv.ravel()
+        cx = np.bincount(inv, weights=self.x[idx], minlength=len(uniq)) / np.maximum(count, 1)
+        cy = np.bincount(inv, weights=self.y[idx], minlength=len(uniq)) / np.maximum(count, 1)
+        member = np.full(len(uniq), -1, dtype=np.int64)
+        member[inv[::-1]] = idx[::-1]                       # 같은 클러스터면 앞쪽 점이 남도록 역순 대입
+        lon = np.degrees(cx / WEB_MERCATOR_R)
+        lat = np.degrees(2 * np.arctan(np.exp(cy / WEB_MERCATOR_R)) - np.pi / 2)
+        return pd.DataFrame({"cluster": uniq, "lon": lon, "lat": lat, "count": count, "member": member})
@@ -0,0 +1,90 @@
+# utils/quantile_sketch.py
+# ---------------------------------------------------------------------
+# 스트리밍 분위수 스케치 (값 범위가 정해진 혼잡도 0~100%용)
+# - QuantileSketch: 고정 폭 히스토그램 G개(그룹별) — update(값, 그룹)로 누적, merge로 병합
+#     · quantiles(levels): np.percentile 'linear'처럼 (n-1)·p 위치의 두 순서통계량을 보간 —
+#       순서통계량은 누적 개수로 구간을 찾고 구간 안에 고르게 놓아 추정 → 오차 ≤ 구간 폭(기본 0.1%p)
+#     · 정렬·원본 보관 없이 bincount 한 번씩 → 링크 수와 무관한 메모리
+# - prefix_quantiles: 거리순 값 목록을 앞에서부터 흘려 넣으며 반경 단계마다 분위수 스냅샷
+#
+# 색 기준(상대 30/70 등)을 상호작용마다 np.percentile로 다시 구하지 않도록
+# 데이터셋(원천 파일)마다 한 번 만든 분위수 표를 조회하는 용도.
+# ---------------------------------------------------------------------
+
+import numpy as np
+
+QUANTILE_LEVELS = (10, 30, 50, 70, 90)   # 분위수 표에 저장하는 수준(%) — 색 기준은 이 중 30/70
+SKETCH_RANGE = (0.0, 100.0)
+SKETCH_BINS = 1000
+
+
+class QuantileSketch:
+    """
+    counts : (G, B) int64 — 그룹 g의 [lo + b·w, lo + (b+1)·w) 구간 값 개수 (범위 밖은 양 끝 구간)
+    """
+
+    def __init__(self, n_groups: int = 1, lo: float = SKETCH_RANGE[0], hi: float = SKETCH_RANGE[1],
+                 bins: int = SKETCH_BINS):
+        self.lo, self.hi, self.bins = float(lo), float(hi), int(bins)
+        self.width = (self.hi - self.lo) / self.bins
+        self.counts = np.zeros((int(n_groups), self.bins), dtype=np.int64)
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.counts)
+
+    def count(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    def update(self, values, groups=None) -> "QuantileSketch":
+        """값 (m,)(NaN 무시)과 그룹 번호 (m,)(없으면 0, 음수는 무시)를 누적"""
+        v = np.asarray(values, dtype=float).ravel()
+        g = np.zeros(len(v), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64).ravel()
+        ok = np.isfinite(v) & (g >= 0)
+        b = np.clip(((v[ok] - self.lo) / self.width).astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(g[ok] * self.bins + b,
+                                   minlength=self.counts.size).reshape(self.counts.shape)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if (other.lo, other.hi, other.bins) != (self.lo, self.hi, self.bins):
+            raise ValueError("구간 설정이 다른 스케치는 병합할 수 없습니다.")
+        self.counts += other.counts
+        return self
+
+    def _order_stat(self, cum, counts, j) -> np.ndarray:
+        """0부터 센 j번째 작은 값 추정 — 들어 있는 구간 안에 구간 값들을 고르게 놓았을 때의 위치"""
+        b = np.searchsorted(cum, j, side="right")
+        below = np.where(b > 0, cum[b - 1], 0)
+        return self.lo + (b + (j - below + 0.5) / counts[b]) * self.width
+
+    def quantiles(self, levels=QUANTILE_LEVELS) -> np.ndarray:
+        """(G, L) 분위수 — 값이 없는 그룹은 NaN (범위 안 값이면 np.percentile 'linear'와 구간 폭 이내로 일치)"""
+        levels = np.asarray(levels, dtype=float) / 100
+        cum = np.cumsum(self.counts, axis=1)
+        n = cum[:, -1]
+        out = np.full((self.n_groups, len(levels)), np.nan)
+        for g in np.flatnonzero(n):
+            pos = levels * (n[g] - 1)
+            j = np.floor(pos)
+            v_lo = self._order_stat(cum[g], self.counts[g], j)
+            v_hi = self._order_stat(cum[g], self.counts[g], np.minimum(j + 1, n[g] - 1))
+            out[g] = v_lo + (pos - j) * (v_hi - v_lo)
+        return out
+
+
+def prefix_quantiles(values, cuts, levels=QUANTILE_LEVELS, **sketch_kw) -> np.ndarray:
+    """
+    values (n, ...) 행을 앞에서부터 흘려 넣으며 cuts (R,) 지점(앞 k행)마다 분위수 → (R, L)
+    cuts는 오름차순. 거리순 링크 목록 + 반경 단계 k에 쓰면 반경별 분위수가 한 번의 스트림으로 나온다.
+    """
+    sketch = QuantileSketch(**sketch_kw)
+    values = np.asarray(values, dtype=float)
+    out = np.full((len(cuts), len(levels)), np.nan)
+    done = 0
+    for i, k in enumerate(np.asarray(cuts, dtype=np.int64)):
+        if k > done:
+            sketch.update(values[done:k])
+            done = int(k)
+        out[i] = sketch.quantiles(levels)[0]
+    return out
@@ -0,0 +1,204 @@
+# utils/road_graph.py
+# ---------------------------------------------------------------------
+# 5.5 레벨 링크망 → 도로 그래프 (CSR 인접 배열) + 제한 거리 Dijkstra
+# - RoadGraph: 노드 N개 · 링크 L개 (SHP fnode_id → tnode_id, 방향 있음)
+#     · node_xy (N, 2): 노드 좌표(EPSG:3857) — 링크 첫/끝 꼭짓점
+#     · link_from / link_to / link_len(m, k_length 실거리)
+#     · adjacency(cost): 링크 비용 → CSR (같은 노드쌍 중복 링크는 최소 비용 1개)
+#     · edge_links / edge_index: CSR edge ↔ 링크 번호 (경로 → 링크 교통량 적재용)
+#     · distances: scipy.sparse.csgraph.dijkstra(limit=…) — 한도 밖 노드는 탐색하지 않음
+#     · link_distance: 노드 거리 → 링크 중점까지 도로망 거리
+#     · catchment: 사업지 최근접 노드에서 도로망 거리 r 안 링크 (거리순)
+# - load_road_graph: SHP 수정시각 기준 프로세스 캐시 (속성 + LinkArrays 재사용)
+#
+# 직선 반경은 강·고속도로 건너편 링크까지 포함하므로, 실제 길을 따라 닿는 범위로 집계할 때 쓴다.
+# 방향: 기본은 양방향(directed=False) — 일방통행도 '가까운 도로'로 본다.
+# ---------------------------------------------------------------------
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from utils.link_geometry import LINK_ID_CANDIDATES, load_link_arrays, lonlat_to_mercator
+from utils.link_keys import INVALID_LINK_KEY, to_link_key
+
+NODE_COLUMNS = ("fnode_id", "tnode_id")
+LENGTH_COLUMN = "k_length"          # km
+SEOUL_LAT = 37.55                   # k_length 결측 시 3857 길이 → 실거리 축척
+
+
+class RoadGraph:
+    """
+    node_ids  : (N,) int64 원 노드 ID, node_xy: (N, 2) EPSG:3857
+    link_keys : (L,) int64, link_from / link_to: (L,) 노드 번호, link_len: (L,) 실거리(m)
+    CSR 구조(edge 순서 · 노드쌍 대표)는 한 번만 만들고 비용 배열만 바꿔 끼운다.
+    """
+
+    def __init__(self, node_ids, node_xy, link_keys, link_from, link_to, link_len):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.node_xy = np.asarray(node_xy, dtype=float)
+        self.link_keys = np.asarray(link_keys, dtype=np.int64)
+        self.link_from = np.asarray(link_from, dtype=np.int64)
+        self.link_to = np.asarray(link_to, dtype=np.int64)
+        self.link_len = np.asarray(link_len, dtype=float)
+
+        # (from, to) 정렬 → 같은 노드쌍 구간 시작점 (중복 링크는 비용 최소값으로 reduceat)
+        self._order = np.lexsort((self.link_to, self.link_from))
+        u, v = self.link_from[self._order], self.link_to[self._order]
+        self._starts = np.flatnonzero(np.r_[True, (u[1:] != u[:-1]) | (v[1:] != v[:-1])])
+        self._edge_u, self._edge_v = u[self._starts], v[self._starts]
+        self._edge_key = self._edge_u * self.n_nodes + self._edge_v        # 오름차순 (edge 번호 검색용)
+        self._indptr = np.searchsorted(self._edge_u, np.arange(self.n_nodes + 1)).astype(np.int32)
+        self._tree = None
+        self._csr = {}
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self) -> int:
+        """CSR edge(서로 다른 노드쌍) 수 — 병렬 링크는 1개로"""
+        return len(self._edge_key)
+
+    def __len__(self):
+        return len(self.link_keys)
+
+    def adjacency(self, cost=None) -> sparse.csr_matrix:
+        """링크 비용 (L,) → (N, N) CSR (기본: 링크 길이 m). NaN/음수 비용 링크는 통행 불가"""
+        if cost is None:
+            if "length" not in self._csr:
+                self._csr["length"] = self.adjacency(self.link_len)
+            return self._csr["length"]
+        c = _clean_cost(cost)[self._order]
+        w = np.minimum.reduceat(c, self._starts)
+        # csgraph는 0 가중치를 '간선 없음'으로 보므로 아주 작은 값으로, inf 간선은 제외
+        w = np.where(w > 0, w, 1e-9)
+        keep = np.isfinite(w)
+        if keep.all():
+            return sparse.csr_matrix((w, self._edge_v.astype(np.int32), self._indptr),
+                                     shape=(self.n_nodes, self.n_nodes))
+        return sparse.csr_matrix((w[keep], (self._edge_u[keep], self._edge_v[keep])),
+                                 shape=(self.n_nodes, self.n_nodes))
+
+    def edge_links(self, cost=None) -> np.ndarray:
+        """CSR edge (E,) → 그 노드쌍의 대표 링크 번호 (adjacency(cost)와 같은 최소 비용 링크)"""
+        c = self.link_len if cost is None else _clean_cost(cost)
+        return np.lexsort((c, self.link_to, self.link_from))[self._starts]
+
+    def edge_index(self, u, v) -> np.ndarray:
+        """노드쌍 (u, v) 배열 → CSR edge 번호 (u → v 링크가 있는 쌍만 넣을 것)"""
+        return np.searchsorted(self._edge_key, np.asarray(u, dtype=np.int64) * self.n_nodes + v)
+
+    def nearest_node(self, x, y) -> np.ndarray:
+        """EPSG:3857 점(들) → 최근접 노드 번호 (좌표 없는 노드 제외)"""
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+
+            self._tree_nodes = np.flatnonzero(np.isfinite(self.node_xy).all(axis=1))
+            self._tree = cKDTree(self.node_xy[self._tree_nodes])
+        return self._tree_nodes[self._tree.query(np.column_stack([np.atleast_1d(x), np.atleast_1d(y)]))[1]]
+
+    def distances(self, sources, limit: float = np.inf, cost=None, directed: bool = False,
+                  min_only: bool = False, adj=None) -> np.ndarray:
+        """
+        출발 노드(들) → 노드별 최단 비용 (한도 limit 초과·미도달은 inf)
+        sources가 여러 개면 (S, N), min_only=True면 가장 가까운 출발점 기준 (N,) (다중 출발 1회)
+        adj: 같은 비용으로 여러 번 질의할 때 미리 만든 adjacency(cost) 재사용
+        """
+        return csgraph.dijkstra(self.adjacency(cost) if adj is None else adj, directed=directed,
+                                indices=np.asarray(sources), limit=limit, min_only=min_only)
+
+    def link_distance(self, node_dist, cost=None, directed: bool = False) -> np.ndarray:
+        """
+        노드 거리 (..., N) → 링크 중점까지 거리 (..., L)
+        양방향이면 양 끝 노드 중 가까운 쪽 + 링크 비용의 절반, 방향 있음이면 시작 노드 기준.
+        """
+        c = self.link_len if cost is None else np.asarray(cost, dtype=float)
+        d = np.asarray(node_dist, dtype=float)
+        head = d[..., self.link_from]
+        if not directed:
+            head = np.minimum(head, d[..., self.link_to])
+        return head + c / 2
+
+    def catchment(self, x: float, y: float, radius_m: float, directed: bool = False) -> pd.DataFrame:
+        """
+        EPSG:3857 점 → 최근접 노드에서 도로망 거리 radius_m(실거리) 안 링크 [link_key, distance_m] (거리순)
+        점에서 최근접 노드까지의 직선 거리는 더하지 않는다.
+        """
+        src = int(self.nearest_node(x, y)[0])
+        d = self.link_distance(self.distances(src, limit=radius_m, directed=directed), directed=directed)
+        hit = np.flatnonzero(d <= radius_m)
+        hit = hit[np.argsort(d[hit], kind="stable")]
+        return pd.DataFrame({"link_key": self.link_keys[hit], "distance_m": d[hit]})
+
+    def catchment_lonlat(self, lon: float, lat: float, radius_m: float, directed: bool = False) -> pd.DataFrame:
+        x, y = lonlat_to_mercator(lon, lat)
+        return self.catchment(float(x), float(y), radius_m, directed=directed)
+
+
+def _clean_cost(cost) -> np.ndarray:
+    """NaN/음수 비용 → inf (통행 불가)"""
+    c = np.asarray(cost, dtype=float)
+    return np.where(np.isfinite(c) & (c >= 0), c, np.inf)
+
+
+def build_road_graph(shp_path: Union[str, Path]) -> RoadGraph:
+    """SHP 속성(링크ID · fnode_id · tnode_id · k_length) + 링크 지오메트리(노드 좌표) → RoadGraph"""
+    import pyogrio
+
+    fields = list(pyogrio.read_info(str(shp_path))["fields"])
+    id_col = next((c for c in LINK_ID_CANDIDATES if c in fields), None)
+    missing = [c for c in NODE_COLUMNS if c not in fields]
+    if id_col is None or missing:
+        raise RuntimeError(f"SHP에 링크ID/노드 컬럼이 없습니다: {missing or 'link id'} (cols={fields})")
+    cols = [id_col, *NODE_COLUMNS] + ([LENGTH_COLUMN] if LENGTH_COLUMN in fields else [])
+    attrs = pyogrio.read_dataframe(str(shp_path), columns=cols, read_geometry=False)
+
+    keys = to_link_key(attrs[id_col].to_numpy())
+    fnode = pd.to_numeric(attrs["fnode_id"], errors="coerce").to_numpy()
+    tnode = pd.to_numeric(attrs["tnode_id"], errors="coerce").to_numpy()
+    ok = (keys != INVALID_LINK_KEY) & np.isfinite(fnode) & np.isfinite(tnode)
+    keys, fnode, tnode = keys[ok], fnode[ok].astype(np.int64), tnode[ok].astype(np.int64)
+
+    # 링크 첫/끝 꼭짓점 (멀티파트: 첫 파트 시작, 마지막 파트 끝)
+    links = load_link_arrays(shp_path)
+    uniq, first_row, key_of_row = np.unique(links.keys, return_index=True, return_inverse=True)
+    _, last_rev = np.unique(links.keys[::-1], return_index=True)
+    last_row = len(links) - 1 - last_rev
+    pos = np.clip(np.searchsorted(uniq, keys), 0, len(uniq) - 1)
+    has = uniq[pos] == keys
+    first = links.coords[links.offsets[first_row[pos[has]]]]
+    last = links.coords[links.offsets[last_row[pos[has]] + 1] - 1]
+
+    length = pd.to_numeric(attrs[LENGTH_COLUMN], errors="coerce").to_numpy()[ok] * 1000 \
+        if LENGTH_COLUMN in attrs.columns else np.full(len(keys), np.nan)
+    geom_len = np.full(len(keys), np.nan)
+    key_len = np.bincount(key_of_row.ravel(), weights=links.lengths, minlength=len(uniq))
+    geom_len[has] = key_len[pos[has]] * np.cos(np.radians(SEOUL_LAT))   # 3857 m → 실거리 근사
+    length = np.where(np.isfinite(length) & (length > 0), length, geom_len)
+    length = np.where(np.isfinite(length), length, 0.0)
+
+    node_ids, inv = np.unique(np.concatenate([fnode, tnode]), return_inverse=True)
+    inv = inv.ravel()
+    link_from, link_to = inv[:len(keys)], inv[len(keys):]
+    node_xy = np.full((len(node_ids), 2), np.nan)
+    node_xy[link_to[has]] = last
+    node_xy[link_from[has]] = first
+    return RoadGraph(node_ids, node_xy, keys, link_from, link_to, length)
+
+
+@lru_cache(maxsize=2)
+def _load_road_graph_cached(shp_path: str, mtime: float) -> RoadGraph:
+    return build_road_graph(shp_path)
+
+
+def load_road_graph(shp_path: Union[str, Path]) -> RoadGraph:
+    """SHP → RoadGraph (수정시각 기준 프로세스 캐시, 반환 객체는 공유 — 수정 금지)"""
+    shp_path = Path(shp_path)
+    return _load_road_graph_cached(str(shp_path), shp_path.stat().st_mtime)
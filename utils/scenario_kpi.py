@@ -0,0 +1,170 @@
+# utils/scenario_kpi.py
+# ---------------------------------------------------------------------
+# 3사분면 시나리오 KPI 계산 유틸
+# - SCENARIO_COLUMNS: 시나리오 테이블(컬럼형) 스키마
+# - scenario_table: 시나리오 레코드(list[dict]) → 컬럼형 DataFrame
+# - default_scenario_table: 기본 A/B/C 시나리오
+# - clean_scenario_table: 편집기 입력 정리(결측/범위/이름 중복)
+# - car_demand_factor: 버스 증편(%) → 승용차 OD 수요 배율 (교통 배정 모형 입력)
+# - calc_kpis_batch: N개 시나리오 KPI를 배열 연산 한 번으로 계산
+#     · predicted_congestion을 주면(교통 배정 결과 등) 간이식 대신 그 값을 예상혼잡도로
+#     · 혼잡도개선(Δ%) = 기준 − 예상 (부호 유지, 음수 = 사업 후 악화)
+# - calc_kpis: 단일 시나리오 KPI(dict) — calc_kpis_batch의 1행 버전
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+# 시나리오 테이블 컬럼: (컬럼명, 최소, 최대) — number_input/slider 제한과 동일
+SCENARIO_COLUMNS = {
+    "sale": (500.0, 3000.0),    # 분양가(만원/㎡)
+    "cost": (300.0, 2500.0),    # 공사비(만원/㎡)
+    "bus": (0, 100),            # 버스 증편(%)
+    "infra": (0.0, 1000.0),     # 인프라 투자(억원)
+}
+
+M2_PER_PY = 3.3058
+BUS_CAR_SHIFT = 0.2             # 버스 증편 100% → 승용차 통행 20% 전환 (간이 수단전환 가정)
+
+
+def scenario_table(records) -> pd.DataFrame:
+    """
+    [{"name": "A", "sale": .., "cost": .., "bus": .., "infra": ..}, ...]
+    → 컬럼형 시나리오 테이블(name + SCENARIO_COLUMNS)
+    """
+    df = pd.DataFrame(list(records), columns=["name", *SCENARIO_COLUMNS])
+    df["name"] = df["name"].astype(str)
+    for col in ["sale", "cost", "infra"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    df["bus"] = pd.to_numeric(df["bus"], errors="coerce").fillna(0).astype(int)
+    return df.reset_index(drop=True)
+
+
+def default_scenario_table(base_bus_inc: int = 10) -> pd.DataFrame:
+    """기존 A/B/C 기본값(버스 증편은 베이스라인 기준 ±)"""
+    return scenario_table([
+        {"name": "A", "sale": 1200.0, "cost": 900.0, "bus": base_bus_inc, "infra": 30.0},
+        {"name": "B", "sale": 1300.0, "cost": 950.0, "bus": min(100, base_bus_inc + 10), "infra": 50.0},
+        {"name": "C", "sale": 1100.0, "cost": 850.0, "bus": max(0, base_bus_inc - 5), "infra": 20.0},
+    ])
+
+
+def clean_scenario_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    data_editor 결과 정리:
+    - 값이 하나도 없는 행 제거, 결측 이름은 S1, S2 ... 로 채움
+    - 수치는 입력 위젯과 같은 범위로 클립, 결측은 각 컬럼의 최소값
+    - 이름 중복 시 뒤쪽에 '(2)', '(3)' 접미사
+    """
+    d = df.copy()
+    d = d.dropna(how="all", subset=list(SCENARIO_COLUMNS)).reset_index(drop=True)
+
+    names = d["name"].astype("object").where(d["name"].notna(), "").astype(str).str.strip()
+    names = pd.Series(
+        [n if n and n.lower() not in ("nan", "none") else f"S{i + 1}" for i, n in enumerate(names)],
+        index=d.index,
+    )
+    dup = names.groupby(names).cumcount()
+    d["name"] = names.where(dup == 0, names + "(" + (dup + 1).astype(str) + ")")
+
+    for col, (lo, hi) in SCENARIO_COLUMNS.items():
+        d[col] = pd.to_numeric(d[col], errors="coerce").fillna(lo).clip(lo, hi)
+    d["bus"] = d["bus"].round().astype(int)
+    return d
+
+
+def car_demand_factor(bus_inc_pct) -> np.ndarray:
+    """버스 증편(%) (스칼라/배열) → 승용차 OD 수요 배율 1 - 전환율 × 증편/100"""
+    bus = np.clip(np.asarray(bus_inc_pct, dtype=float), 0, 100)
+    return 1 - BUS_CAR_SHIFT * bus / 100
+
+
+def calc_kpis_batch(
+    households,
+    avg_py,                       # 전용평형(평)
+    sale_price_per_m2,            # 분양가 (만원/㎡)
+    build_cost_per_m2,            # 공사비 (만원/㎡)
+    infra_invest_billion,         # 교통 등 인프라 투자(억원)
+    congestion_base,              # 기준 혼잡도(%)
+    bus_inc_pct,                  # 버스 증편(%)
+    non_sale_ratio=0.15,          # 비분양 비율(공공/커뮤니티 등)
+    sale_rate=0.98,               # 분양률
+    disc_rate=0.07,               # 할인율
+    years: int = 4,               # 회수기간(년)
+    predicted_congestion=None,    # 예상혼잡도(%) 직접 지정 (교통 배정 등) — 없으면 간이식
+) -> pd.DataFrame:
+    """
+    calc_kpis의 벡터화 버전. 모든 입력은 스칼라 또는 같은 길이의 배열이며
+    (브로드캐스팅), 행 하나가 시나리오/샘플 하나인 KPI DataFrame을 반환.
+    """
+    households, avg_py, sale, cost, infra, cong, bus, nsr, srate, disc = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype=float)) for x in (
+            households, avg_py, sale_price_per_m2, build_cost_per_m2, infra_invest_billion,
+            congestion_base, bus_inc_pct, non_sale_ratio, sale_rate, disc_rate,
+        )]
+    )
+    years = int(years)
+
+    # 면적 환산
+    avg_m2 = avg_py * M2_PER_PY
+    sellable_m2 = households * avg_m2 * (1 - nsr)  # 분양면적
+    # 혼잡도 개선 (배정 결과가 없으면 간이 모델)
+    if predicted_congestion is None:
+        predicted_cong = np.maximum(0.0, cong * (1 - bus / 150))
+    else:
+        predicted_cong = np.broadcast_to(np.maximum(0.0, np.asarray(predicted_congestion, dtype=float)), cong.shape)
+    # 표시값(소수 1자리)끼리의 차 — 기준 − 예상이 표에서 그대로 맞고 변화 없음이 -0.0으로 보이지 않게
+    # 음수 = 악화 (사업 자체 발생 통행이 버스 증편 효과보다 클 때)
+    predicted_cong = np.round(predicted_cong, 1)
+    cong_improve = np.round(np.round(cong, 1) - predicted_cong, 1) + 0.0
+
+    # 매출/비용 (만원 단위 -> 억원 환산)
+    total_cost_bil = sellable_m2 * cost / 1e4 / 100 + infra       # (억원)
+    total_rev_bil = sellable_m2 * sale * srate / 1e4 / 100        # (억원)
+
+    profit_bil = total_rev_bil - total_cost_bil
+    margin_pct = np.where(total_cost_bil > 0, profit_bil / np.where(total_cost_bil > 0, total_cost_bil, 1) * 100, 0.0)
+
+    # 간이 NPV (균등현금흐름 가정): 연금현가계수 Σ 1/(1+r)^t
+    t = np.arange(1, years + 1)
+    annuity = (1.0 / (1 + disc[:, None]) ** t[None, :]).sum(axis=1)
+    cf_annual = profit_bil / years
+    npv = cf_annual * annuity
+    payback = np.clip(np.ceil(total_cost_bil / np.maximum(1e-6, cf_annual)), 1, years).astype(int)
+
+    return pd.DataFrame({
+        "분양면적(㎡)": sellable_m2,
+        "예상혼잡도(%)": predicted_cong,
+        "혼잡도개선(Δ%)": cong_improve,
+        "총매출(억원)": np.round(total_rev_bil, 1),
+        "총사업비(억원)": np.round(total_cost_bil, 1),
+        "이익(억원)": np.round(profit_bil, 1),
+        "마진율(%)": np.round(margin_pct, 1),
+        "NPV(억원)": np.round(npv, 1),
+        "회수기간(년)": payback,
+    })
+
+
+def calc_kpis(
+    households: int,
+    avg_py: float,
+    sale_price_per_m2: float,
+    build_cost_per_m2: float,
+    infra_invest_billion: float,
+    congestion_base: float,
+    bus_inc_pct: int,
+    non_sale_ratio: float = 0.15,
+    sale_rate: float = 0.98,
+    disc_rate: float = 0.07,
+    years: int = 4,
+    predicted_congestion=None,
+) -> dict:
+    """단일 시나리오 KPI (calc_kpis_batch 1행)"""
+    row = calc_kpis_batch(
+        households, avg_py, sale_price_per_m2, build_cost_per_m2, infra_invest_billion,
+        congestion_base, bus_inc_pct, non_sale_ratio, sale_rate, disc_rate, years,
+        predicted_congestion=predicted_congestion,
+    ).iloc[0]
+    out = {k: float(v) for k, v in row.items()}
+    out["회수기간(년)"] = int(row["회수기간(년)"])
+    return out
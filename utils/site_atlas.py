@@ -0,0 +1,231 @@
+# utils/site_atlas.py
+# ---------------------------------------------------------------------
+# 서울 전역 사업지 혼잡도 아틀라스 (오프라인 사전계산 → 앱은 조회만)
+# - link_congestion_table: 속도 CSV → 링크×시간대 혼잡도 행렬 (앱과 같은 정의)
+# - link_daily_congestion: 링크별 일평균 혼잡도
+# - build_site_atlas: 모든 사업지 × 반경 단계(500~3000m, 250m)에 대해
+#     반경 내 링크 수 · 일평균 혼잡도 · 시간대별 프로파일 · 혼잡 상위 링크
+# - SiteAtlas: 압축 .npz 저장/로드 + (lon, lat, radius) 조회
+#
+# 빌드:  python -m utils.site_atlas   (프로젝트 루트에서 실행)
+#   → data/site_atlas.npz (좌표 CSV의 사업지 전체 대상)
+# ---------------------------------------------------------------------
+
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.hour_cube import load_hour_cube
+from utils.link_keys import LinkIndex
+from utils.traffic_plot import get_nearby_links_batch
+
+RADIUS_STEPS = np.arange(500, 3001, 250)   # 앱 반경 슬라이더와 동일
+TOP_K = 10                                  # 사업지·반경별 혼잡 상위 링크 수
+ATLAS_VERSION = 2                           # 2: 반경을 지상 거리(m)로
+COORD_DECIMALS = 6                          # 사업지 조회 키(경위도 반올림 자리수)
+
+
+def _coord_key(lon, lat) -> np.ndarray:
+    """경위도 → 조회용 정수 키 쌍 (소수 COORD_DECIMALS자리)"""
+    scale = 10 ** COORD_DECIMALS
+    return np.column_stack([
+        np.round(np.asarray(lon, dtype=float) * scale),
+        np.round(np.asarray(lat, dtype=float) * scale),
+    ]).astype(np.int64)
+
+
+def link_congestion_table(csv_path: Union[str, Path]):
+    """
+    속도 CSV → (keys (n,), hourly (n, 24)) 링크별 시간대 혼잡도(%)
+    혼잡도 = (1 - min(1, v / v_ff)) × 100, v_ff = 링크별 시간대 최대속도(≥1)
+    (app.compute_congestion_from_speed와 같은 정의, 결측 시간대는 NaN)
+    """
+    cube = load_hour_cube(csv_path)
+    return cube.keys, cube.matrix("congestion")
+
+
+def _row_nanmean(hourly: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(hourly, axis=1) / np.isfinite(hourly).sum(axis=1)
+
+
+def link_daily_congestion(csv_path: Union[str, Path]):
+    """속도 CSV → (keys (n,), daily (n,)) 링크별 일평균 혼잡도(%)"""
+    keys, hourly = link_congestion_table(csv_path)
+    return keys, _row_nanmean(hourly)
+
+
+class SiteAtlas:
+    """
+    사업지 S개 × 반경 R단계 사전계산 결과
+    - lon, lat, site_ids : (S,)
+    - radii              : (R,)
+    - n_links            : (S, R) 반경 내 (속도 데이터가 있는) 링크 수
+    - daily              : (S, R) 링크 일평균 혼잡도의 평균(%)
+    - hourly             : (S, R, 24) 시간대별 평균 혼잡도(%)
+    - top_keys, top_vals : (S, R, K) 일평균 혼잡도 상위 링크 (빈 칸은 -1 / NaN)
+    """
+
+    FIELDS = ("lon", "lat", "site_ids", "radii", "n_links", "daily", "hourly", "top_keys", "top_vals")
+
+    def __init__(self, lon, lat, site_ids, radii, n_links, daily, hourly, top_keys, top_vals, meta=None):
+        self.lon = np.asarray(lon, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.site_ids = np.asarray(site_ids).astype(str)
+        self.radii = np.asarray(radii, dtype=np.int64)
+        self.n_links = np.asarray(n_links, dtype=np.int32)
+        self.daily = np.asarray(daily, dtype=np.float32)
+        self.hourly = np.asarray(hourly, dtype=np.float32)
+        self.top_keys = np.asarray(top_keys, dtype=np.int64)
+        self.top_vals = np.asarray(top_vals, dtype=np.float32)
+        self.meta = dict(meta or {})
+        self._site_of = {tuple(k): i for i, k in enumerate(_coord_key(self.lon, self.lat))}
+
+    def __len__(self):
+        return len(self.lon)
+
+    def site_index(self, lon: float, lat: float) -> Optional[int]:
+        return self._site_of.get(tuple(_coord_key([lon], [lat])[0]))
+
+    def lookup(self, lon: float, lat: float, radius_m: int) -> Optional[dict]:
+        """(lon, lat, 반경) → {n_links, daily, hourly(DataFrame), top(DataFrame)} / 없으면 None"""
+        i = self.site_index(lon, lat)
+        hit = np.flatnonzero(self.radii == int(radius_m))
+        if i is None or not len(hit):
+            return None
+        r = int(hit[0])
+        keep = self.top_keys[i, r] >= 0
+        return {
+            "n_links": int(self.n_links[i, r]),
+            "daily": float(self.daily[i, r]),
+            "hourly": pd.DataFrame({"hour": np.arange(24), "value": self.hourly[i, r].astype(float)}),
+            "top": pd.DataFrame({
+                "link_key": self.top_keys[i, r][keep],
+                "daily_value": self.top_vals[i, r][keep].astype(float),
+            }),
+        }
+
+    def is_fresh(self, *sources) -> bool:
+        """빌드에 쓴 원천 파일(SHP, 속도 CSV)이 그 뒤로 수정되지 않았는지"""
+        built = float(self.meta.get("built_from_mtime", 0))
+        return all(Path(p).stat().st_mtime <= built for p in sources if Path(p).exists())
+
+    def save(self, path: Union[str, Path]):
+        np.savez_compressed(
+            path,
+            **{f: getattr(self, f) for f in self.FIELDS},
+            version=ATLAS_VERSION,
+            built_from_mtime=float(self.meta.get("built_from_mtime", 0)),
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SiteAtlas":
+        with np.load(path, allow_pickle=False) as z:
+            if int(z["version"]) != ATLAS_VERSION:
+                raise ValueError(f"아틀라스 버전 불일치: {int(z['version'])} != {ATLAS_VERSION}")
+            return cls(**{f: z[f] for f in cls.FIELDS},
+                       meta={"built_from_mtime": float(z["built_from_mtime"])})
+
+
+def build_site_atlas(
+        site_lon,
+        site_lat,
+        shp_path: Union[str, Path],
+        csv_path: Union[str, Path],
+        site_ids=None,
+        radii=RADIUS_STEPS,
+        top_k: int = TOP_K,
+) -> SiteAtlas:
+    """
+    모든 사업지 × 반경 단계 혼잡도 요약을 한 번에 계산.
+    최대 반경으로 일괄 근접 질의 1회 → 작은 반경은 거리 필터만 적용.
+    """
+    lon = np.asarray(site_lon, dtype=float)
+    lat = np.asarray(site_lat, dtype=float)
+    radii = np.asarray(radii, dtype=np.int64)
+    n_site, n_rad = len(lon), len(radii)
+    site_ids = np.arange(n_site).astype(str) if site_ids is None else np.asarray(site_ids).astype(str)
+
+    pairs = get_nearby_links_batch(shp_path, lon, lat, radius_m=float(radii.max()),
+                                   project_ids=np.arange(n_site))
+    keys, hourly = link_congestion_table(csv_path)
+    link_rows, src = LinkIndex(keys).rows(pairs["link_key"].to_numpy())
+    site = pairs["project_id"].to_numpy(dtype=np.int64)[src]
+    dist = pairs["distance_m"].to_numpy(dtype=float)[src]
+    link_daily = _row_nanmean(hourly)
+
+    n_links = np.zeros((n_site, n_rad), dtype=np.int32)
+    daily = np.full((n_site, n_rad), np.nan)
+    prof = np.full((n_site, n_rad, 24), np.nan)
+    top_keys = np.full((n_site, n_rad, top_k), -1, dtype=np.int64)
+    top_vals = np.full((n_site, n_rad, top_k), np.nan)
+
+    for r_i, r in enumerate(radii):
+        m = dist <= r
+        s, lr = site[m], link_rows[m]
+        n_links[:, r_i] = np.bincount(s, minlength=n_site)
+
+        dv = link_daily[lr]
+        ok = np.isfinite(dv)
+        cnt = np.bincount(s[ok], minlength=n_site)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            daily[:, r_i] = np.bincount(s[ok], weights=dv[ok], minlength=n_site) / cnt
+            for h in range(24):
+                hv = hourly[lr, h]
+                hok = np.isfinite(hv)
+                prof[:, r_i, h] = (np.bincount(s[hok], weights=hv[hok], minlength=n_site)
+                                   / np.bincount(s[hok], minlength=n_site))
+
+        # 사업지별 일평균 혼잡도 내림차순 상위 K
+        s_ok, lr_ok, dv_ok = s[ok], lr[ok], dv[ok]
+        order = np.lexsort((-dv_ok, s_ok))
+        s_sorted = s_ok[order]
+        first = np.searchsorted(s_sorted, s_sorted, side="left")
+        rank = np.arange(len(s_sorted)) - first
+        take = rank < top_k
+        top_keys[s_sorted[take], r_i, rank[take]] = keys[lr_ok[order][take]]
+        top_vals[s_sorted[take], r_i, rank[take]] = dv_ok[order][take]
+
+    built = max(Path(shp_path).stat().st_mtime, Path(csv_path).stat().st_mtime)
+    return SiteAtlas(lon, lat, site_ids, radii, n_links, daily, prof, top_keys, top_vals,
+                     meta={"built_from_mtime": built})
+
+
+def _read_csv_any(path: Path) -> pd.DataFrame:
+    for enc in ("utf-8-sig", "cp949", "euc-kr"):
+        try:
+            return pd.read_csv(path, encoding=enc)
+        except UnicodeDecodeError:
+            continue
+    return pd.read_csv(path, encoding="utf-8", encoding_errors="replace")
+
+
+def load_project_sites(coord_csv: Union[str, Path]) -> pd.DataFrame:
+    """좌표 CSV(사업번호, lon, lat) → 좌표가 있는 고유 사업지 [site_id, lon, lat]"""
+    df = _read_csv_any(Path(coord_csv))
+    out = pd.DataFrame({
+        "site_id": df["사업번호"].astype(str) if "사업번호" in df.columns else df.index.astype(str),
+        "lon": pd.to_numeric(df["lon"], errors="coerce"),
+        "lat": pd.to_numeric(df["lat"], errors="coerce"),
+    }).dropna(subset=["lon", "lat"])
+    return out.drop_duplicates(subset=["lon", "lat"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import time
+
+    data_dir = Path(__file__).resolve().parent.parent / "data"
+    sites = load_project_sites(data_dir / "서울시_재개발재건축_clean_kakao.csv")
+    t0 = time.time()
+    atlas = build_site_atlas(
+        sites["lon"], sites["lat"],
+        shp_path=data_dir / "seoul_link_lev5.5_2023.shp",
+        csv_path=data_dir / "AverageSpeed_Seoul_2023.csv",
+        site_ids=sites["site_id"],
+    )
+    out = data_dir / "site_atlas.npz"
+    atlas.save(out)
+    print(f"site atlas: {len(atlas)} sites × {len(atlas.radii)} radii "
+          f"→ {out.name} ({out.stat().st_size / 1e3:.0f} KB, {time.time() - t0:.1f}s)")
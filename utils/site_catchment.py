@@ -0,0 +1,182 @@
+# utils/site_catchment.py
+# ---------------------------------------------------------------------
+# 사업지 1곳의 최대 반경(3,000m) 링크 목록 — 거리순 정렬 + 누적(prefix) 집계
+# - SiteCatchment.build: 중심점 → 거리 오름차순 링크 키/거리 + 누적합
+# - SiteCatchment.build_network: 같은 구조를 도로망 거리(RoadGraph 제한 Dijkstra)로
+#     · 일평균 혼잡도 합/개수, 색 구간(초록 <30 · 노랑 30~70 · 빨강 ≥70) 개수,
+#       시간대별 혼잡도 합/개수
+# - cut(radius): 이분 탐색(searchsorted) 한 번으로 반경 r 안의 링크 수 k
+# - keys_within / summary: 반경이 바뀌어도 재질의·재계산 없이 prefix[k] 조회
+# - quantiles / breaks: 거리순 스트림 한 번으로 반경 단계별 분위수 표 (시간대 구간마다 1회)
+#
+# 반경 1,000m 링크 집합은 1,500m 집합의 앞부분(prefix)이라는 점을 이용한다.
+# ---------------------------------------------------------------------
+
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from utils.link_geometry import load_link_arrays, load_link_window, lonlat_to_mercator, mercator_scale
+from utils.hour_cube import hour_window_mean
+from utils.link_keys import INVALID_LINK_KEY, LinkIndex
+from utils.map_style import CONGESTION_BREAKS, RELATIVE_QUANTILES
+from utils.quantile_sketch import QUANTILE_LEVELS, prefix_quantiles
+from utils.road_graph import load_road_graph
+from utils.site_atlas import RADIUS_STEPS, link_congestion_table
+
+MAX_RADIUS_M = 3000
+NEAREST_FALLBACK = 50            # 반경 내 링크가 없을 때 최근접 링크 수 (get_nearby_speed_data와 동일)
+COLOR_BREAKS = CONGESTION_BREAKS  # 절대 색 기준(%) — 지도 색과 동일
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """(n, ...) → (n + 1, ...) 누적합 (첫 행 0)"""
+    out = np.zeros((len(values) + 1,) + values.shape[1:], dtype=float)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+class SiteCatchment:
+    """
+    keys/dist : (n,) 거리 오름차순 링크 키(멀티파트는 최단거리 1개)와 지상 거리(m)
+    daily     : (n,) 링크 일평균 혼잡도(속도 데이터 없으면 NaN)
+    hourly    : (n, 24) 링크 시간대별 혼잡도
+    cum_*     : (n + 1, ...) 누적합 → 반경 r의 집계 = cum[k] (k = cut(r))
+    """
+
+    def __init__(self, keys, dist, daily, hourly, max_radius_m: float = MAX_RADIUS_M):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.dist = np.asarray(dist, dtype=float)
+        self.daily = np.asarray(daily, dtype=float)
+        self.hourly = np.asarray(hourly, dtype=float).reshape(len(self.keys), 24)
+        self.max_radius_m = float(max_radius_m)
+
+        ok = np.isfinite(self.daily)
+        lo, hi = COLOR_BREAKS
+        bucket = np.column_stack([ok & (self.daily < lo), ok & (self.daily >= lo) & (self.daily < hi),
+                                  ok & (self.daily >= hi)])
+        hok = np.isfinite(self.hourly)
+        self.cum_daily_sum = _prefix(np.where(ok, self.daily, 0.0))
+        self.cum_daily_cnt = _prefix(ok.astype(float))
+        self.cum_bucket = _prefix(bucket.astype(float))
+        self.cum_hour_sum = _prefix(np.where(hok, self.hourly, 0.0))
+        self.cum_hour_cnt = _prefix(hok.astype(float))
+        self._quantiles = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, shp_path: Union[str, Path], csv_path: Union[str, Path],
+              center_lon: float, center_lat: float, max_radius_m: float = MAX_RADIUS_M) -> "SiteCatchment":
+        """
+        중심점 → 최대 반경 안의 링크를 거리순으로 1회 질의 (반경 내 없으면 최근접 링크)
+        반경·거리는 지상 m — 3857 좌표 거리에 cos(위도)를 곱해 도로망 거리(k_length)와 같은 단위로.
+        """
+        scale = mercator_scale(center_lat)
+        radius_3857 = max_radius_m / scale
+        links = load_link_window(shp_path, center_lon, center_lat, radius_3857)
+        x, y = lonlat_to_mercator(center_lon, center_lat)
+        rows, dist = links.within(x, y, radius_3857)
+        if len(rows) < NEAREST_FALLBACK:
+            # 최근접 fallback(앞쪽 NEAREST_FALLBACK개)을 보장하도록 전체 링크망에서 보충
+            links = load_link_arrays(shp_path)
+            d_all = links.distance_to_point(x, y)
+            rows = np.union1d(np.flatnonzero(d_all <= radius_3857),
+                              np.argsort(d_all, kind="stable")[:NEAREST_FALLBACK])
+            dist = d_all[rows]
+        keys, dist = links.keys[rows], dist * scale
+
+        # 거리순 정렬 + 멀티파트(같은 키 여러 행)는 최단거리만 + 무효 키 제외
+        order = np.lexsort((dist, keys))
+        keys, dist = keys[order], dist[order]
+        first = np.r_[True, keys[1:] != keys[:-1]] & (keys != INVALID_LINK_KEY)
+        keys, dist = keys[first], dist[first]
+        order = np.argsort(dist, kind="stable")
+        return cls._with_congestion(keys[order], dist[order], csv_path, max_radius_m)
+
+    @classmethod
+    def build_network(cls, shp_path: Union[str, Path], csv_path: Union[str, Path],
+                      center_lon: float, center_lat: float, max_radius_m: float = MAX_RADIUS_M) -> "SiteCatchment":
+        """
+        중심점 최근접 노드 → 도로망 거리(실거리 m) max_radius_m 안 링크를 거리순으로 (그래프는 SHP당 1회)
+        도달 링크가 없으면(고립 노드 등) 직선 거리 목록으로 대체.
+        """
+        hit = load_road_graph(shp_path).catchment_lonlat(center_lon, center_lat, max_radius_m)
+        if hit.empty:
+            return cls.build(shp_path, csv_path, center_lon, center_lat, max_radius_m=max_radius_m)
+        hit = hit.drop_duplicates("link_key")
+        return cls._with_congestion(hit["link_key"].to_numpy(), hit["distance_m"].to_numpy(),
+                                    csv_path, max_radius_m)
+
+    @classmethod
+    def _with_congestion(cls, keys, dist, csv_path, max_radius_m) -> "SiteCatchment":
+        """거리순 (keys, dist) + 링크별 시간대 혼잡도 → SiteCatchment"""
+        table_keys, hourly_all = link_congestion_table(csv_path)
+        hourly = np.full((len(keys), 24), np.nan)
+        rows_t, src = LinkIndex(table_keys).rows(keys)
+        hourly[src] = hourly_all[rows_t]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            daily = np.nansum(hourly, axis=1) / np.isfinite(hourly).sum(axis=1)
+        return cls(keys, dist, daily, hourly, max_radius_m=max_radius_m)
+
+    # -----------------------------------------------------------------
+    # 반경 조회 (이분 탐색 + prefix)
+    # -----------------------------------------------------------------
+    def cut(self, radius_m: float) -> int:
+        """반경 안 링크 수 k (dist ≤ radius) — 없으면 최근접 NEAREST_FALLBACK개"""
+        if radius_m > self.max_radius_m:
+            raise ValueError(f"반경 {radius_m}m > 사전 질의 최대 반경 {self.max_radius_m:.0f}m")
+        k = int(np.searchsorted(self.dist, radius_m, side="right"))
+        return k if k > 0 else min(NEAREST_FALLBACK, len(self))
+
+    def keys_within(self, radius_m: float) -> np.ndarray:
+        return self.keys[:self.cut(radius_m)]
+
+    def summary(self, radius_m: float, top_k: int = 10) -> dict:
+        """
+        반경 r 집계 (SiteAtlas.lookup과 같은 형식):
+        n_links(속도 데이터 있는 링크) · daily · buckets(초록/노랑/빨강) · hourly · top
+        """
+        k = self.cut(radius_m)
+        cnt = self.cum_daily_cnt[k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            hourly = self.cum_hour_sum[k] / self.cum_hour_cnt[k]
+        head = self.daily[:k]
+        ok = np.flatnonzero(np.isfinite(head))
+        top = ok[np.argsort(-head[ok], kind="stable")[:top_k]]
+        return {
+            "n_links": int(cnt),
+            "daily": float(self.cum_daily_sum[k] / cnt) if cnt else float("nan"),
+            "buckets": dict(zip(("green", "yellow", "red"), self.cum_bucket[k].astype(int).tolist())),
+            "hourly": pd.DataFrame({"hour": np.arange(24), "value": hourly}),
+            "top": pd.DataFrame({"link_key": self.keys[top], "daily_value": head[top]}),
+        }
+
+    # -----------------------------------------------------------------
+    # 반경 분위수 (상대 색 기준)
+    # -----------------------------------------------------------------
+    def quantiles(self, window=None, levels=QUANTILE_LEVELS) -> pd.DataFrame:
+        """
+        반경 단계(RADIUS_STEPS) × 분위수 표 — 거리순 값을 앞에서부터 스케치에 흘려 넣으며 스냅샷
+        window=(start, end): 링크별 구간 평균 분포 / None: 24개 시간대 값 전체
+        """
+        key = (None if window is None else (int(window[0]), int(window[1])), tuple(levels))
+        if key not in self._quantiles:
+            radii = RADIUS_STEPS[RADIUS_STEPS <= self.max_radius_m]
+            values = self.hourly if key[0] is None else hour_window_mean(self.hourly, *key[0])
+            q = prefix_quantiles(values, [self.cut(r) for r in radii], levels)
+            self._quantiles[key] = pd.DataFrame(q, index=radii, columns=[f"p{v:g}" for v in levels])
+        return self._quantiles[key]
+
+    def breaks(self, radius_m: float, window=None, quantiles=RELATIVE_QUANTILES):
+        """반경 r 안 링크의 (lo, hi) 색 경계 — 단계 밖 반경은 그 자리에서 한 번 계산"""
+        table = self.quantiles(window)
+        if int(radius_m) in table.index:
+            row = table.loc[int(radius_m)]
+            return tuple(float(row[f"p{q:g}"]) for q in quantiles)
+        values = self.hourly if window is None else hour_window_mean(self.hourly, *window)
+        lo, hi = prefix_quantiles(values, [self.cut(radius_m)], quantiles)[0]
+        return float(lo), float(hi)
@@ -0,0 +1,141 @@
+# utils/site_weights.py
+# ---------------------------------------------------------------------
+# 사업지 × 링크 거리감쇠 가중치 희소행렬 (scipy.sparse CSR)
+# - decay_weights: 거리 → 가중치 (indicator / linear / gaussian)
+# - SiteLinkWeights: 행 = 사업지, 열 = 링크(link_key)
+#     · aggregate: 링크 지표(혼잡도·CFI·h시 속도 등) → 사업지 지표 (희소 mat-vec 1회)
+#     · link_load: 사업지 값(세대수 등) → 링크별 누적 부하 (Wᵀx)
+#     · cumulative_exposure: 영향권이 겹치는 인접 사업지 값의 누적 (자기 자신 제외)
+# - build_site_link_weights: 사업지 경위도 배열 → SiteLinkWeights
+# ---------------------------------------------------------------------
+
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.link_geometry import load_link_arrays
+from utils.link_keys import INVALID_LINK_KEY, LinkIndex
+from utils.traffic_plot import get_nearby_links_batch
+
+DECAY_KINDS = ("indicator", "linear", "gaussian")
+
+
+def decay_weights(dist, radius_m, kind: str = "linear") -> np.ndarray:
+    """
+    거리(m) → 가중치 (반경 밖은 0)
+    - indicator: 1
+    - linear   : 1 - d / R
+    - gaussian : exp(-0.5 · (d / (R/2))²)
+    """
+    d = np.asarray(dist, dtype=float)
+    r = np.broadcast_to(np.asarray(radius_m, dtype=float), d.shape)
+    if kind == "indicator":
+        w = np.ones_like(d)
+    elif kind == "linear":
+        w = 1.0 - d / np.maximum(r, 1e-9)
+    elif kind == "gaussian":
+        w = np.exp(-0.5 * (d / np.maximum(r / 2, 1e-9)) ** 2)
+    else:
+        raise ValueError(f"지원하지 않는 감쇠 종류: {kind} (가능: {DECAY_KINDS})")
+    return np.where(d <= r, np.clip(w, 0.0, 1.0), 0.0)
+
+
+class SiteLinkWeights:
+    """
+    W (S × L, CSR) — W[i, j] = 사업지 i에서 링크 j까지 거리감쇠 가중치
+    link_keys (L,) 는 열 순서(정렬된 int64 키).
+    """
+
+    def __init__(self, matrix, link_keys):
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.link_keys = np.asarray(link_keys, dtype=np.int64)
+        if self.matrix.shape[1] != len(self.link_keys):
+            raise ValueError("행렬 열 수와 link_keys 길이가 다릅니다.")
+        self._col_index = LinkIndex(self.link_keys)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @classmethod
+    def from_pairs(cls, pairs: pd.DataFrame, n_projects: int, radius_m, kind: str = "linear",
+                   link_keys=None) -> "SiteLinkWeights":
+        """
+        long 테이블 [project_id(0..S-1), link_key, distance_m] → W
+        link_keys 미지정 시 pairs에 등장한 키만 열로 사용.
+        """
+        keys = np.unique(pairs["link_key"].to_numpy(dtype=np.int64)) if link_keys is None \
+            else np.unique(np.asarray(link_keys, dtype=np.int64))
+        keys = keys[keys != INVALID_LINK_KEY]
+        cols, src = LinkIndex(keys).rows(pairs["link_key"].to_numpy(dtype=np.int64))
+        rows = pairs["project_id"].to_numpy(dtype=np.int64)[src]
+        radius = np.broadcast_to(np.asarray(radius_m, dtype=float), (n_projects,))[rows]
+        w = decay_weights(pairs["distance_m"].to_numpy(dtype=float)[src], radius, kind)
+        keep = w > 0
+        m = sparse.csr_matrix((w[keep], (rows[keep], cols[keep])), shape=(n_projects, len(keys)))
+        return cls(m, keys)
+
+    def align(self, values, link_keys=None) -> np.ndarray:
+        """링크 값 → 열 순서 배열 (Series[link_key] 또는 (values, link_keys)), 없는 링크는 NaN"""
+        if link_keys is None:
+            if not isinstance(values, pd.Series):
+                values = np.asarray(values, dtype=float)
+                if len(values) != len(self.link_keys):
+                    raise ValueError("link_keys 없이 넘긴 값은 열 순서(link_keys)와 길이가 같아야 합니다.")
+                return values
+            link_keys, values = values.index.to_numpy(), values.to_numpy()
+        out = np.full(len(self.link_keys), np.nan)
+        cols, src = self._col_index.rows(np.asarray(link_keys, dtype=np.int64))
+        out[cols] = np.asarray(values, dtype=float)[src]
+        return out
+
+    def aggregate(self, values, link_keys=None) -> np.ndarray:
+        """사업지별 가중평균 Σ w·v / Σ w (값이 없는 링크는 분모에서도 제외, 링크 없으면 NaN)"""
+        v = self.align(values, link_keys)
+        ok = np.isfinite(v)
+        num = self.matrix @ np.where(ok, v, 0.0)
+        den = self.matrix @ ok.astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(den > 0, num / den, np.nan)
+
+    def link_load(self, project_values) -> np.ndarray:
+        """사업지 값 x (S,) → 링크별 누적 부하 Wᵀx (L,)"""
+        x = np.nan_to_num(np.asarray(project_values, dtype=float))
+        return self.matrix.T @ x
+
+    def cumulative_exposure(self, project_values) -> np.ndarray:
+        """
+        인접 사업지 누적 영향 (S,): Σ_{j≠i} overlap_ij · x_j
+        overlap_ij = (행 정규화 W_i) · W_j — i 영향권 가중치 중 j 영향권과 겹치는 비율
+        """
+        x = np.nan_to_num(np.asarray(project_values, dtype=float))
+        row_sum = np.asarray(self.matrix.sum(axis=1)).ravel()
+        inv = sparse.diags(np.where(row_sum > 0, 1.0 / np.where(row_sum > 0, row_sum, 1.0), 0.0))
+        overlap = (inv @ self.matrix) @ self.matrix.T
+        return overlap @ x - overlap.diagonal() * x
+
+
+def build_site_link_weights(
+        shp_path: Union[str, Path],
+        center_lon,
+        center_lat,
+        radius_m=1000,
+        kind: str = "linear",
+        link_keys=None,
+        links=None,
+) -> SiteLinkWeights:
+    """
+    사업지 경위도 배열 → SiteLinkWeights (행 순서 = 입력 순서, 좌표 없는 사업지는 빈 행)
+    열은 link_keys(미지정 시 질의한 링크망의 키) 기준.
+    links: 질의할 LinkArrays — 반경을 모두 덮는 창(load_link_window_points)을 주면 전체 링크망을 읽지 않음
+    """
+    lon = np.atleast_1d(np.asarray(center_lon, dtype=float))
+    if links is None:
+        links = load_link_arrays(shp_path)
+    pairs = get_nearby_links_batch(shp_path, lon, center_lat, radius_m=radius_m, links=links)
+    if link_keys is None:
+        link_keys = links.keys
+    return SiteLinkWeights.from_pairs(pairs, len(lon), radius_m, kind=kind, link_keys=link_keys)
@@ -0,0 +1,310 @@
+# utils/traffic_assignment.py
+# ---------------------------------------------------------------------
+# 도로 그래프(RoadGraph) 위 OD 통행 배정 — 전량배정(all-or-nothing) + BPR + Frank–Wolfe 균형
+# - link_capacity: SHP 차로수(lane) × 도로등급(road_rank)별 차로당 용량(대/h)
+# - bpr_time: t = t0 · (1 + α (v/c)^β)
+# - OD: zones (Z,) 노드 번호 + trips (Z, Z) 첨두시 통행(대/h)
+#     · grid_zones + synthetic_od: 격자 존 + 중력모형 합성 OD (도로 연장×차로 = 활동량 대리변수)
+#     · load_od_csv: 로컬 OD CSV(o_lon, o_lat, d_lon, d_lat, trips) → 최근접 노드로 스냅
+# - all_or_nothing: 출발 존 Z개 Dijkstra 1회(predecessor) → OD쌍 전체를 선행 노드로 동시에 거슬러 올라가며
+#                   edge별 bincount 누적 (반복 횟수 = 최장 경로 링크 수)
+# - frank_wolfe: 전량배정(conjugate 혼합) 방향 + 이분 탐색 선형 탐색, 상대 gap ≤ tol 이면 종료 → Assignment
+# - AssignmentModel: 그래프·자유류 시간·용량·OD 묶음, 수요 배율별 균형 결과 메모 (가까운 배율에서 웜스타트)
+#     · volume_ratio(keys, 배율): 링크별 균형 교통량 V(배율) / V(1)
+#
+# 배정 혼잡도 = (1 - t0 / t) × 100 — 관측 혼잡도(1 - v / v_ff)와 같은 정의.
+# 합성 OD는 수준보다 변화(수요 배율에 따른 경로 전환)를 보는 용도 — 앱은 volume_ratio를
+# 관측 속도에서 역산한 배경 교통량의 링크별 배율로 쓴다 (utils.trip_impact).
+# ---------------------------------------------------------------------
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csgraph
+
+from utils.link_geometry import LINK_ID_CANDIDATES, lonlat_to_mercator
+from utils.link_keys import LinkIndex, to_link_key
+from utils.road_graph import SEOUL_LAT, RoadGraph
+
+BPR_ALPHA = 0.15
+BPR_BETA = 4.0
+LANE_CAPACITY_VPH = {101: 2000.0, 102: 1800.0}   # 고속국도 · 도시고속도로 (대/h/차로)
+DEFAULT_LANE_CAPACITY_VPH = 800.0                # 신호 교차로가 있는 일반 도로 (녹색시간 비율 반영)
+ZONE_SPACING_M = 2000.0                          # 합성 OD 격자 존 간격 (실거리)
+GRAVITY_DECAY_M = 6000.0                         # 중력모형 거리 감쇠 exp(-d / 감쇠)
+SYNTHETIC_TRIPS = 5.0e5                          # 합성 OD 첨두시 총 통행(대/h) — 균형 v/c 중앙 ≈ 0.4, 상위 10% ≥ 1.3
+FW_MAX_ITER = 40
+FW_GAP = 1e-2
+RATIO_MAX_ITER = 100
+RATIO_GAP = 2e-3                                 # AssignmentModel 배율 비교용 — 1%면 웜스타트가 2~3회에 멈춰 비율이 배율과 같아짐
+LINE_SEARCH_STEPS = 24
+CFW_DELTA = 0.01                                 # conjugate FW 혼합 비율 상한 1 - δ
+OD_COLUMNS = ("o_lon", "o_lat", "d_lon", "d_lat", "trips")
+
+
+def link_capacity(lanes, road_rank) -> np.ndarray:
+    """차로수 (L,) · 도로등급 (L,) → 링크 용량(대/h) (차로수 결측·0은 1차로)"""
+    lanes = pd.to_numeric(pd.Series(lanes), errors="coerce").to_numpy(dtype=float)
+    lanes = np.where(np.isfinite(lanes) & (lanes > 0), lanes, 1.0)
+    rank = pd.to_numeric(pd.Series(road_rank), errors="coerce")
+    per_lane = rank.map(LANE_CAPACITY_VPH).fillna(DEFAULT_LANE_CAPACITY_VPH).to_numpy(dtype=float)
+    return lanes * per_lane
+
+
+@lru_cache(maxsize=2)
+def _link_capacity_table(shp_path: str, mtime: float):
+    """SHP 속성(lane, road_rank) → (LinkIndex, 행별 용량) — SHP 수정시각당 1회 읽기"""
+    import pyogrio
+
+    fields = list(pyogrio.read_info(shp_path)["fields"])
+    id_col = next((c for c in LINK_ID_CANDIDATES if c in fields), None)
+    if id_col is None:
+        raise RuntimeError(f"SHP에 링크ID 컬럼이 없습니다. (cols={fields})")
+    cols = [id_col] + [c for c in ("lane", "road_rank") if c in fields]
+    attrs = pyogrio.read_dataframe(shp_path, columns=cols, read_geometry=False)
+    cap = link_capacity(attrs.get("lane", pd.Series(np.nan, index=attrs.index)),
+                        attrs.get("road_rank", pd.Series(np.nan, index=attrs.index)))
+    return LinkIndex(to_link_key(attrs[id_col].to_numpy())), cap
+
+
+def load_link_capacity(shp_path: Union[str, Path], keys) -> np.ndarray:
+    """SHP 속성(lane, road_rank) → keys (L,) 순서 링크 용량(대/h) (속성이 없는 링크는 1차로 일반 도로)"""
+    shp_path = Path(shp_path)
+    index, cap = _link_capacity_table(str(shp_path), shp_path.stat().st_mtime)
+    rows, src = index.rows(np.asarray(keys, dtype=np.int64))
+    out = np.full(len(keys), DEFAULT_LANE_CAPACITY_VPH)
+    out[src] = cap[rows]
+    return out
+
+
+def bpr_time(free_time, volume, capacity, alpha: float = BPR_ALPHA, beta: float = BPR_BETA) -> np.ndarray:
+    """BPR 링크 통행시간 t0 · (1 + α (v/c)^β)"""
+    return free_time * (1 + alpha * (volume / capacity) ** beta)
+
+
+def grid_zones(graph: RoadGraph, spacing_m: float = ZONE_SPACING_M) -> np.ndarray:
+    """
+    격자 칸마다 칸 중심에 가장 가까운 노드 1개 → 존 노드 번호 (Z,)
+    서로 오갈 수 있어야 하므로 가장 큰 강연결 요소의 노드만 쓴다.
+    """
+    _, label = csgraph.connected_components(graph.adjacency(), directed=True, connection="strong")
+    main = label == np.bincount(label).argmax()
+    nodes = np.flatnonzero(main & np.isfinite(graph.node_xy).all(axis=1))
+    step = spacing_m / np.cos(np.radians(SEOUL_LAT))          # 실거리 → EPSG:3857
+    cell = np.floor(graph.node_xy[nodes] / step)
+    off = np.hypot(*(graph.node_xy[nodes] - (cell + 0.5) * step).T)
+    _, cell_id = np.unique(cell, axis=0, return_inverse=True)
+    order = np.lexsort((off, cell_id.ravel()))
+    first = np.r_[True, np.diff(cell_id.ravel()[order]) != 0]
+    return np.sort(nodes[order[first]])
+
+
+def synthetic_od(graph: RoadGraph, zones, capacity=None, total: float = SYNTHETIC_TRIPS,
+                 decay_m: float = GRAVITY_DECAY_M) -> np.ndarray:
+    """
+    중력모형 T_ij ∝ w_i · w_j · exp(-d_ij / 감쇠) (i ≠ j), 합계 total
+    w: 링크 시작 노드가 가장 가까운 존에 (길이 × 용량) 합 — 도로가 크고 촘촘한 곳에 통행이 많다고 본다.
+    """
+    from scipy.spatial import cKDTree
+
+    zones = np.asarray(zones, dtype=np.int64)
+    zxy = graph.node_xy[zones]
+    cap = np.ones(len(graph)) if capacity is None else np.asarray(capacity, dtype=float)
+    start = graph.node_xy[graph.link_from]
+    ok = np.isfinite(start).all(axis=1)
+    owner = cKDTree(zxy).query(start[ok])[1]
+    w = np.bincount(owner, weights=(graph.link_len * cap)[ok], minlength=len(zones))
+    d = np.hypot(*(zxy[:, None, :] - zxy[None, :, :]).transpose(2, 0, 1)) * np.cos(np.radians(SEOUL_LAT))
+    t = w[:, None] * w[None, :] * np.exp(-d / decay_m)
+    np.fill_diagonal(t, 0.0)
+    return t * (total / t.sum()) if t.sum() > 0 else t
+
+
+def load_od_csv(path: Union[str, Path], graph: RoadGraph):
+    """OD CSV(o_lon, o_lat, d_lon, d_lat, trips) → (zones (Z,), trips (Z, Z)) — 좌표는 최근접 노드로 스냅"""
+    df = pd.read_csv(path)
+    missing = [c for c in OD_COLUMNS if c not in df.columns]
+    if missing:
+        raise RuntimeError(f"OD CSV에 컬럼이 없습니다: {missing} (cols={list(df.columns)})")
+    df = df.apply(pd.to_numeric, errors="coerce").dropna(subset=list(OD_COLUMNS))
+    ox, oy = lonlat_to_mercator(df["o_lon"].to_numpy(), df["o_lat"].to_numpy())
+    dx, dy = lonlat_to_mercator(df["d_lon"].to_numpy(), df["d_lat"].to_numpy())
+    o, d = graph.nearest_node(ox, oy), graph.nearest_node(dx, dy)
+    zones, inv = np.unique(np.concatenate([o, d]), return_inverse=True)
+    inv = inv.ravel()
+    trips = np.zeros((len(zones), len(zones)))
+    np.add.at(trips, (inv[:len(o)], inv[len(o):]), df["trips"].to_numpy(dtype=float))
+    np.fill_diagonal(trips, 0.0)
+    return zones, trips
+
+
+def all_or_nothing(graph: RoadGraph, cost, zones, trips) -> np.ndarray:
+    """
+    링크 비용 (L,) 기준 최단경로에 OD 통행 전량 배정 → 링크 교통량 (L,)
+    도달할 수 없는 OD쌍은 배정하지 않는다.
+    """
+    zones = np.asarray(zones, dtype=np.int64)
+    trips = np.asarray(trips, dtype=float)
+    origins = np.flatnonzero(trips.sum(axis=1) > 0)
+    edge_flow = np.zeros(graph.n_edges)
+    if len(origins):
+        _, pred = csgraph.dijkstra(graph.adjacency(cost), directed=True, indices=zones[origins],
+                                   return_predecessors=True)
+        row, col = np.nonzero(trips[origins])
+        q = trips[origins][row, col]
+        cur = zones[col]
+        while len(cur):
+            prev = pred[row, cur]
+            go = prev >= 0
+            row, cur, prev, q = row[go], cur[go], prev[go], q[go]
+            edge_flow += np.bincount(graph.edge_index(prev, cur), weights=q, minlength=len(edge_flow))
+            cur = prev
+            done = cur == zones[origins][row]
+            row, cur, q = row[~done], cur[~done], q[~done]
+    volume = np.zeros(len(graph))
+    volume[graph.edge_links(cost)] = edge_flow
+    return volume
+
+
+def _line_search(free_time, capacity, x, direction, steps: int = LINE_SEARCH_STEPS) -> float:
+    """Beckmann 목적함수의 x + λ·d 방향 최소점 λ ∈ [0, 1] — 도함수 Σ d·t(x + λd)의 부호로 이분 탐색"""
+    lo, hi = 0.0, 1.0
+    if direction @ bpr_time(free_time, x + direction, capacity) <= 0:
+        return 1.0
+    for _ in range(steps):
+        mid = (lo + hi) / 2
+        if direction @ bpr_time(free_time, x + mid * direction, capacity) > 0:
+            hi = mid
+        else:
+            lo = mid
+    return (lo + hi) / 2
+
+
+class Assignment:
+    """
+    volume    : (L,) 균형 링크 교통량(대/h), time: (L,) BPR 통행시간(초)
+    free_time : (L,) 자유류 통행시간(초), capacity: (L,) 용량(대/h)
+    gaps      : Frank–Wolfe 반복별 상대 gap (Σ t·x − Σ t·y) / Σ t·x
+    """
+
+    def __init__(self, volume, time, free_time, capacity, gaps):
+        self.volume = np.asarray(volume, dtype=float)
+        self.time = np.asarray(time, dtype=float)
+        self.free_time = np.asarray(free_time, dtype=float)
+        self.capacity = np.asarray(capacity, dtype=float)
+        self.gaps = list(gaps)
+
+    @property
+    def iterations(self) -> int:
+        return len(self.gaps)
+
+    @property
+    def gap(self) -> float:
+        return self.gaps[-1] if self.gaps else 0.0
+
+    @property
+    def vc(self) -> np.ndarray:
+        return self.volume / self.capacity
+
+    @property
+    def congestion(self) -> np.ndarray:
+        """(L,) 배정 혼잡도(%) = (1 - t0 / t) × 100"""
+        return (1 - self.free_time / self.time) * 100
+
+
+def bpr_slope(free_time, volume, capacity, alpha: float = BPR_ALPHA, beta: float = BPR_BETA) -> np.ndarray:
+    """dt/dv — Beckmann 목적함수 헤시안(대각)"""
+    return free_time * alpha * beta * volume ** (beta - 1) / capacity ** beta
+
+
+def frank_wolfe(graph: RoadGraph, free_time, capacity, zones, trips, max_iter: int = FW_MAX_ITER,
+                tol: float = FW_GAP, volume=None) -> Assignment:
+    """
+    사용자 균형 배정 (Frank–Wolfe). volume: 같은 OD 구조의 실행가능 교통량으로 웜스타트 (없으면 자유류 전량배정)
+    방향은 conjugate FW — 전량배정 y와 직전 목표점 s를 헤시안 켤레가 되도록 섞어 지그재그를 줄인다.
+    """
+    free_time = np.asarray(free_time, dtype=float)
+    capacity = np.asarray(capacity, dtype=float)
+    x = all_or_nothing(graph, free_time, zones, trips) if volume is None else np.asarray(volume, dtype=float)
+    s = None
+    gaps = []
+    for _ in range(max_iter):
+        t = bpr_time(free_time, x, capacity)
+        y = all_or_nothing(graph, t, zones, trips)
+        tx = t @ x
+        gaps.append(float((tx - t @ y) / tx) if tx > 0 else 0.0)
+        if gaps[-1] <= tol:
+            break
+        if s is not None:
+            h = bpr_slope(free_time, x, capacity)
+            num, den = (s - x) @ (h * (y - x)), (s - x) @ (h * (y - s))
+            a = np.clip(num / den, 0.0, 1 - CFW_DELTA) if den != 0 else 0.0
+            y = a * s + (1 - a) * y
+        s = y
+        x = x + _line_search(free_time, capacity, x, s - x) * (s - x)
+    return Assignment(x, bpr_time(free_time, x, capacity), free_time, capacity, gaps)
+
+
+class AssignmentModel:
+    """
+    graph · free_time (L,) 초 · capacity (L,) 대/h · zones (Z,) · trips (Z, Z)
+    solve(배율): OD × 배율 균형 배정 (배율별 메모, 이미 푼 가장 가까운 배율의 교통량을 비례 조정해 웜스타트)
+                 배율 간 교통량 비율을 보므로 RATIO_GAP까지 수렴 (모형은 사업지와 무관 — 기준 배율은 프로세스당 1회)
+    """
+
+    def __init__(self, graph: RoadGraph, free_time, capacity, zones, trips):
+        self.graph = graph
+        self.free_time = np.asarray(free_time, dtype=float)
+        self.capacity = np.asarray(capacity, dtype=float)
+        self.zones = np.asarray(zones, dtype=np.int64)
+        self.trips = np.asarray(trips, dtype=float)
+        self._solved = {}
+
+    @property
+    def total_trips(self) -> float:
+        return float(self.trips.sum())
+
+    def solve(self, demand_factor: float = 1.0) -> Assignment:
+        f = round(float(demand_factor), 4)
+        if f not in self._solved:
+            warm = None
+            if self._solved and f > 0:
+                near = min(self._solved, key=lambda k: abs(k - f))
+                if near > 0:
+                    warm = self._solved[near].volume * (f / near)
+            self._solved[f] = frank_wolfe(self.graph, self.free_time, self.capacity, self.zones,
+                                          self.trips * f, max_iter=RATIO_MAX_ITER, tol=RATIO_GAP, volume=warm)
+        return self._solved[f]
+
+    def volume_ratio(self, keys, demand_factors) -> np.ndarray:
+        """
+        링크 키 (m,)의 균형 교통량 비율 V(배율) / V(1) → (K, m)
+        그래프에 없거나 기준 교통량이 0인 링크는 배율 자체 (수요에 비례한다고 본다)
+        """
+        factors = np.atleast_1d(np.asarray(demand_factors, dtype=float))
+        out = np.repeat(factors[:, None], len(keys), axis=1)
+        rows, src = LinkIndex(self.graph.link_keys).rows(np.asarray(keys, dtype=np.int64))
+        base = self.solve(1.0).volume[rows]
+        has = base > 0
+        for i, f in enumerate(factors):
+            out[i, src[has]] = self.solve(f).volume[rows[has]] / base[has]
+        return out
+
+
+def build_assignment_model(graph: RoadGraph, free_flow_kmh, capacity,
+                           od_csv: Optional[Union[str, Path]] = None) -> AssignmentModel:
+    """
+    free_flow_kmh (L,) 자유류 속도(결측은 전체 중앙값) + 용량 + OD(로컬 CSV, 없으면 합성) → AssignmentModel
+    """
+    ff = np.asarray(free_flow_kmh, dtype=float)
+    ff = np.where(np.isfinite(ff) & (ff > 0), ff, np.nanmedian(ff) if np.isfinite(ff).any() else 30.0)
+    free_time = np.maximum(graph.link_len, 1.0) / (ff / 3.6)
+    if od_csv is not None and Path(od_csv).exists():
+        zones, trips = load_od_csv(od_csv, graph)
+    else:
+        zones = grid_zones(graph)
+        trips = synthetic_od(graph, zones, capacity)
+    return AssignmentModel(graph, free_time, capacity, zones, trips)
@@ -2,17 +2,23 @@
 # ---------------------------------------------------------------------
 # 교통 속도 시각화 유틸: Altair 기본(대시보드용), Matplotlib/Plotly 옵션 제공
 # - get_nearby_speed_data: 시각화용 데이터 준비
+# - speed_rows_for_keys: 링크 키 목록 → 시간대별 평균속도 행 (SHP 질의 없이)
+# - get_nearby_links_batch: 여러 사업지 × 반경 → (project_id, link_key, distance_m)
 # - altair_nearby_speed: Altair 차트 생성 (기본)
 # - plot_speed: renderer 스위치('altair' | 'mpl' | 'plotly')
 # - (호환) plot_nearby_speed_from_csv: 기존 함수 유지
 # ---------------------------------------------------------------------
 
+from functools import lru_cache
 from typing import Union, Tuple
 from pathlib import Path
 import platform
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
+
+from utils.link_geometry import load_link_window, load_link_arrays, lonlat_to_mercator, mercator_scale
+from utils.link_keys import INVALID_LINK_KEY, LinkIndex, to_link_key
 
 # Matplotlib(옵션 렌더러 및 폰트 설정용)
 import matplotlib
@@ -84,7 +90,21 @@ def set_dashboard_theme():
 # ---------------------------------------------------------------------
 # Shapefile 로더(인코딩/엔진 문제에 견고)
 # ---------------------------------------------------------------------
-def _read_shp_robust(shp_path: Union[str, Path]) -> gpd.GeoDataFrame:
+_SHP_READ_TRIES = [
+    ("pyogrio", "utf-8", {}),
+    ("pyogrio", "cp949", {}),
+    ("pyogrio", "euc-kr", {}),
+    ("pyogrio", "cp949", {"encoding_errors": "ignore"}),
+    ("pyogrio", "utf-8", {"encoding_errors": "ignore"}),
+    ("fiona", "utf-8", {}),
+    ("fiona", "cp949", {}),
+    ("fiona", "euc-kr", {}),
+]
+# 파일별로 성공한 (engine, encoding, extra) 조합 기억 → 다음 읽기는 그 조합부터
+_SHP_READ_WINNER = {}
+
+
+def _read_shp_robust(shp_path: Union[str, Path], bbox=None) -> gpd.GeoDataFrame:
     """
     Shapefile 인코딩/엔진 문제를 견고하게 처리:
     1) pyogrio + utf-8
@@ -95,22 +115,20 @@ def _read_shp_robust(shp_path: Union[str, Path]) -> gpd.GeoDataFrame:
     6) fiona + utf-8
     7) fiona + cp949
     8) fiona + euc-kr
+    - 한 번 성공한 조합은 파일별로 기억해 두고 다음 호출에서 먼저 시도
+    - bbox=(minx, miny, maxx, maxy) [레이어 좌표계]: 교차하는 피처만 읽음(.shx 공간 필터)
     """
     shp_path = Path(shp_path)
-    tries = [
-        ("pyogrio", "utf-8", {}),
-        ("pyogrio", "cp949", {}),
-        ("pyogrio", "euc-kr", {}),
-        ("pyogrio", "cp949", {"encoding_errors": "ignore"}),
-        ("pyogrio", "utf-8", {"encoding_errors": "ignore"}),
-        ("fiona", "utf-8", {}),
-        ("fiona", "cp949", {}),
-        ("fiona", "euc-kr", {}),
-    ]
+    memo_key = str(shp_path.resolve())
+    winner = _SHP_READ_WINNER.get(memo_key)
+    tries = ([winner] if winner else []) + [t for t in _SHP_READ_TRIES if t != winner]
+    window = {"bbox": tuple(map(float, bbox))} if bbox is not None else {}
     errors = []
     for engine, enc, extra in tries:
         try:
-            return gpd.read_file(shp_path, engine=engine, encoding=enc, **extra)
+            gdf = gpd.read_file(shp_path, engine=engine, encoding=enc, **extra, **window)
+            _SHP_READ_WINNER[memo_key] = (engine, enc, extra)
+            return gdf
         except Exception as e:
             errors.append(
                 f"{engine}/{enc}{' ' + str(extra) if extra else ''} -> {e.__class__.__name__}: {e}"
@@ -127,18 +145,46 @@ def _read_shp_robust(shp_path: Union[str, Path]) -> gpd.GeoDataFrame:
     )
 
 
+def shp_bbox_around(shp_path: Union[str, Path], center_lon: float, center_lat: float, radius_m: float):
+    """
+    중심 ± 반경(EPSG:3857 m, 거리 계산 기준과 동일) 사각형을 SHP 레이어 좌표계 bbox로 변환.
+    레이어 CRS를 알 수 없으면 EPSG:5186으로 간주(_read_shp_robust 사용처와 동일).
+    """
+    import pyogrio
+    from pyproj import CRS, Transformer
+
+    layer_crs = pyogrio.read_info(str(shp_path)).get("crs") or "EPSG:5186"
+    cx, cy = lonlat_to_mercator(center_lon, center_lat)
+    tr = Transformer.from_crs(CRS.from_epsg(3857), CRS.from_user_input(layer_crs), always_xy=True)
+    return tr.transform_bounds(cx - radius_m, cy - radius_m, cx + radius_m, cy + radius_m, densify_pts=21)
+
+
 # ---------------------------------------------------------------------
 # 데이터 로더 (CSV의 id 컬럼 자동 인식)
 # ---------------------------------------------------------------------
-def load_speed_long_csv(csv_path: Path) -> pd.DataFrame:
+@lru_cache(maxsize=2)
+def _load_speed_cached(csv_path: str, mtime: float) -> Tuple[pd.DataFrame, LinkIndex]:
     df = pd.read_csv(csv_path)
     # ✅ 항상 link_id 기준으로 통일
     if "its_link_id" in df.columns and "link_id" not in df.columns:
         df = df.rename(columns={"its_link_id": "link_id"})
 
+    # 정수 키는 적재 시 1회만 계산 (이후 필터/조인은 link_key로)
+    df["link_key"] = to_link_key(df["link_id"])
     df["link_id"] = df["link_id"].astype(str)
     df["hour"] = df["hour"].astype(int)
-    return df
+    df = df.sort_values(["link_key", "hour"], kind="stable").reset_index(drop=True)
+    return df, LinkIndex(df["link_key"].to_numpy())
+
+
+def load_speed_table(csv_path: Path) -> Tuple[pd.DataFrame, LinkIndex]:
+    """속도 CSV(long) + link_key 인덱스 (파일 수정시각 기준 프로세스 캐시, 반환 df는 수정 금지)"""
+    csv_path = Path(csv_path)
+    return _load_speed_cached(str(csv_path), csv_path.stat().st_mtime)
+
+
+def load_speed_long_csv(csv_path: Path) -> pd.DataFrame:
+    return load_speed_table(csv_path)[0].copy()
 
 
 
@@ -162,18 +208,17 @@ def get_nearby_speed_data(
     CSV(link_id 또는 its_link_id, 시간대, 평균속도(km/h), hour) + 레벨6 SHP로
     반경 내 링크들의 시간대별 평균속도에 해당하는 데이터프레임 반환
     """
-    gdf = _read_shp_robust(shp_path)
-    if gdf.crs is None:
-        gdf = gdf.set_crs(epsg=5186, allow_override=True)
-    gdf4326 = gdf.to_crs(epsg=4326)
-    gdf3857 = gdf4326.to_crs(epsg=3857)
-
-    center = gpd.GeoSeries([Point(center_lon, center_lat)], crs=4326).to_crs(epsg=3857).iloc[0]
-    gdf3857["dist_m"] = gdf3857.distance(center)
-
-    near = gdf3857[gdf3857["dist_m"] <= radius_m].copy()
-    if near.empty:
-        near = gdf3857.sort_values("dist_m").head(50).copy()
+    # 링크망은 ragged 배열(EPSG:3857) → 반경 질의는 NumPy 커널로
+    # (아티팩트가 없는 콜드 스타트에는 중심 ± 반경 bbox 창만 SHP에서 읽음)
+    # 반경은 지상 m → 3857 좌표 거리로 환산 (SiteCatchment · 도로망 거리와 같은 기준)
+    radius_3857 = radius_m / mercator_scale(center_lat)
+    links = load_link_window(shp_path, center_lon, center_lat, radius_3857)
+    cx, cy = lonlat_to_mercator(center_lon, center_lat)
+
+    rows, _ = links.within(cx, cy, radius_3857)
+    if len(rows) == 0:
+        links = load_link_arrays(shp_path)
+        rows = np.argsort(links.distance_to_point(cx, cy), kind="stable")[:50]
 
     # ── CSV 헤더를 먼저 확인하여 어떤 ID(5.5 vs ITS)를 쓰는지 결정
     # 반경 내 ID 수집 유틸 (여러 후보 컬럼을 한 번에 모아 집합으로)
@@ -191,38 +236,73 @@ def get_nearby_speed_data(
         return set(s.tolist())
 
     # ── 5.5 SHP 기준으로 링크 집합 만들기
-    # 우선순위: k_link_id -> link_id -> LINK_ID
-    id_col_55 = next((c for c in ["k_link_id", "link_id", "LINK_ID"] if c in gdf3857.columns), None)
-    if id_col_55 is None:
-        raise RuntimeError(f"SHP에서 5.5 링크ID 컬럼(k_link_id/link_id/LINK_ID)을 찾지 못했습니다. (cols={list(gdf3857.columns)})")
-
-    # 반경 내 피처만 추출(이미 near에 담김)
-    ids = near[id_col_55].dropna()
-
-    # 값이 8891093.0 같은 float일 수 있으니 안전하게 문자열 ID로 표준화
-    if pd.api.types.is_float_dtype(ids) or ids.dtype.kind in "fc":
-        ids = ids.round().astype("Int64").astype(str)
-    else:
-        ids = ids.astype(str).str.replace(r"\.0$", "", regex=True)
+    # (ID 컬럼 선택 k_link_id -> link_id -> LINK_ID, 정수 키 변환과
+    #  0/-1/결측 제거는 적재 시 1회 수행됨)
+    return speed_rows_for_keys(csv_path, links.keys[rows], max_links=max_links)
 
-    # 0/-1/빈값 제거
-    ids = ids[~ids.isin(["0", "-1", "", "nan", "None"])]
 
-    link_set = set(ids.tolist())
+def speed_rows_for_keys(csv_path: Path, keys, max_links: int = 10) -> pd.DataFrame:
+    """링크 키 배열 → 속도 CSV(long)의 해당 행 (무효 키 제외, 행 수 많은 순 상위 max_links개 링크)"""
+    keys = np.unique(np.asarray(keys, dtype=np.int64))
+    keys = keys[keys != INVALID_LINK_KEY]
 
-    # CSV 로드 (이 함수가 its_link_id를 link_id로 표준화함)
-    speed = load_speed_long_csv(csv_path)  # -> speed['link_id'] (str)
+    # CSV 로드 (its_link_id → link_id 표준화 + link_key 인덱스)
+    speed, speed_index = load_speed_table(csv_path)
 
-    # 매칭
-    df_plot = speed[speed["link_id"].isin(link_set)].copy()
+    # 매칭 (정수 키 → 행 번호)
+    hit, _ = speed_index.rows(keys)
+    df_plot = speed.iloc[np.sort(hit)].copy()
     if df_plot.empty:
         return df_plot
 
     # 상위 N개 링크만
-    keep = df_plot["link_id"].value_counts().head(max_links).index
-    df_plot = df_plot[df_plot["link_id"].isin(keep)].copy()
-    df_plot = df_plot.sort_values(["link_id", "hour"])
-    return df_plot
+    keep = df_plot["link_key"].value_counts().head(max_links).index
+    df_plot = df_plot[df_plot["link_key"].isin(keep)]
+    return df_plot.sort_values(["link_key", "hour"])
+
+
+# ---------------------------------------------------------------------
+# 여러 사업지 중심에 대한 반경 내 링크 (일괄 질의)
+# ---------------------------------------------------------------------
+def get_nearby_links_batch(
+        shp_path: Path,
+        center_lon,
+        center_lat,
+        radius_m=1000,
+        project_ids=None,
+        links=None,
+) -> pd.DataFrame:
+    """
+    사업지 중심 경위도 배열(+ 반경 스칼라/배열) → long 테이블
+    [project_id, link_key, distance_m] (사업지별 거리 오름차순)
+    - 링크망 1회 적재 + STRtree 일괄 질의(dwithin) 1회 — 사업지 수만큼 반복 호출 X
+    - links: 질의할 LinkArrays (반경을 모두 덮는 창 등, 미지정 시 전체 링크망)
+    - 반경·거리는 지상 m (3857 거리 × cos(사업지 위도) — SiteCatchment · 도로망 거리와 같은 단위)
+    - 좌표가 없는 사업지는 결과에서 빠짐
+    """
+    lon = np.atleast_1d(np.asarray(center_lon, dtype=float))
+    lat = np.atleast_1d(np.asarray(center_lat, dtype=float))
+    radius = np.broadcast_to(np.asarray(radius_m, dtype=float), lon.shape)
+    pid = np.arange(len(lon)) if project_ids is None else np.asarray(project_ids)
+    if len(pid) != len(lon) or len(lat) != len(lon):
+        raise ValueError("center_lon/center_lat/project_ids 길이가 같아야 합니다.")
+
+    ok = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    links = load_link_arrays(shp_path) if links is None else links
+    x, y = lonlat_to_mercator(lon[ok], lat[ok])
+    scale = mercator_scale(lat[ok])
+    query, rows, dist = links.within_batch(x, y, radius[ok] / scale)
+    dist = dist * scale[query]
+
+    out = pd.DataFrame({
+        "_q": query,
+        "project_id": pid[ok][query],
+        "link_key": links.keys[rows],
+        "distance_m": dist,
+    })
+    # 무효 키 제거 + 멀티파트(같은 키 여러 행)는 최단거리 1행만 (이미 (q, dist) 정렬)
+    out = out[out["link_key"] != INVALID_LINK_KEY].drop_duplicates(["_q", "link_key"])
+    return out.drop(columns="_q").reset_index(drop=True)
 
 
 # ---------------------------------------------------------------------
@@ -109,9 +109,14 @@ def convert_average_speed_excel_to_csv(xlsx_path: Path, out_csv_path: Path,
 def ensure_speed_csv(xlsx_path: Path, out_csv_path: Path) -> Path:
     """
     xlsx가 있으면 CSV 생성/갱신 보장. 이미 있으면 그대로 둠.
+    CSV 옆에 링크 전체 자유류·혼잡도 사전계산(.congestion.npz)도 함께 보장.
     반환: CSV 경로
     """
+    from utils.link_congestion import load_link_congestion
+
     out_csv_path = Path(out_csv_path)
     if not out_csv_path.exists():
         convert_average_speed_excel_to_csv(xlsx_path, out_csv_path)
+    if out_csv_path.exists():
+        load_link_congestion(out_csv_path)
     return out_csv_path
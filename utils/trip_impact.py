@@ -0,0 +1,118 @@
+# utils/trip_impact.py
+# ---------------------------------------------------------------------
+# 사업지 세대수 → 첨두시 발생 통행 → 주변 링크 부하 → 사업 후 속도·혼잡도 (시나리오 일괄)
+# - peak_trips: 세대수 × 첨두시 세대당 승용차 통행 × 평형 보정 × 승용차 수요 배율
+# - inverse_bpr_volume: 관측 속도 → 기준 교통량 v = c · ((v_ff / v − 1) / α)^(1/β)
+# - TripImpact: SiteLinkWeights(S × L) + 링크 자유류 속도 · 관측 속도 · 용량 (IMPACT_HOUR 기준)
+#     · link_volume(trips (K, S), background): 배경 교통량 × 배율 + 행 정규화 W 로 나눈 발생 통행
+#     · speed_after / congestion: BPR volume-delay 로 사업 후 링크 속도 · 혼잡도 (K, L)
+#     · site_congestion: 사업지별 거리감쇠 가중평균 (K, S) — 사업 전 값과 같은 가중
+#     · fingerprint: 입력 배열 내용 해시 (예측 결과 캐시 키)
+#
+# 발생 통행 0 · 배경 배율 1 이면 관측 속도·혼잡도를 그대로 재현한다 (기준 교통량을 같은 BPR로 역산).
+# 통행은 사업지에서 거리 가중치 비율로 주변 링크에 나눠 싣는다 (경로 배정 X — utils.traffic_assignment 참고).
+# ---------------------------------------------------------------------
+
+import hashlib
+
+import numpy as np
+
+from utils.link_congestion import MIN_FREE_FLOW, LinkCongestion
+from utils.site_weights import SiteLinkWeights
+from utils.traffic_assignment import BPR_ALPHA, BPR_BETA
+
+PEAK_TRIP_RATE = 0.5            # 첨두시 세대당 승용차 통행(대/h) — 공동주택 오전 첨두 발생원단위 수준
+REFERENCE_PY = 25.0             # 평형 보정 기준 (전용 25평 = 1.0)
+UNIT_SIZE_ELASTICITY = 0.3      # 평형이 클수록 차량 보유 ↑ — (평형 / 25)^0.3
+IMPACT_HOUR = 8                 # 오전 첨두
+
+
+def peak_trips(households, avg_py=REFERENCE_PY, demand_factor=1.0) -> np.ndarray:
+    """세대수 · 평균 전용평형 · 승용차 수요 배율 (스칼라/배열, 브로드캐스팅) → 첨두시 발생 통행(대/h)"""
+    hh, py, f = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (households, avg_py, demand_factor)])
+    size = (np.clip(np.nan_to_num(py, nan=REFERENCE_PY), 5.0, None) / REFERENCE_PY) ** UNIT_SIZE_ELASTICITY
+    return np.clip(np.nan_to_num(hh), 0, None) * PEAK_TRIP_RATE * size * f
+
+
+def inverse_bpr_volume(free_flow, speed, capacity, alpha: float = BPR_ALPHA, beta: float = BPR_BETA) -> np.ndarray:
+    """관측 속도 → BPR을 만족하는 교통량(대/h) (속도 ≥ 자유류면 0, 결측 NaN)"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.maximum(np.asarray(free_flow, dtype=float) / np.asarray(speed, dtype=float), 1.0)
+        return np.asarray(capacity, dtype=float) * ((ratio - 1) / alpha) ** (1 / beta)
+
+
+class TripImpact:
+    """
+    weights   : SiteLinkWeights (S × L) — 열 = 링크(link_keys)
+    free_flow : (L,) 자유류 속도(km/h), speed: (L,) 관측 속도(km/h), capacity: (L,) 용량(대/h)
+    volume    : (L,) 기준 교통량(대/h, 관측 속도 역산) — 속도 결측 링크는 NaN(결과도 NaN)
+    """
+
+    def __init__(self, weights: SiteLinkWeights, free_flow, speed, capacity):
+        self.weights = weights
+        self.free_flow = np.clip(np.asarray(free_flow, dtype=float), MIN_FREE_FLOW, None)
+        self.speed = np.asarray(speed, dtype=float)
+        self.capacity = np.asarray(capacity, dtype=float)
+        self.volume = inverse_bpr_volume(self.free_flow, self.speed, self.capacity)
+
+        # 행 정규화 W: 사업지 통행을 주변 링크에 거리 가중치 비율로 (합 = 발생 통행)
+        w = weights.matrix
+        row_sum = np.asarray(w.sum(axis=1)).ravel()
+        scale = np.where(row_sum > 0, 1.0 / np.where(row_sum > 0, row_sum, 1.0), 0.0)
+        self._share = w.multiply(scale[:, None]).tocsr()
+        self._fingerprint = None
+
+    @classmethod
+    def from_link_data(cls, weights: SiteLinkWeights, table: LinkCongestion, capacity,
+                       hour: int = IMPACT_HOUR) -> "TripImpact":
+        """LinkCongestion(자유류 · 시간대 속도) + 열 순서 용량 → TripImpact (hour 시 관측 속도 기준)"""
+        keys = weights.link_keys
+        return cls(weights, table.lookup("free_flow", keys),
+                   table.lookup("speed", keys, hours=np.full(len(keys), hour)), capacity)
+
+    def __len__(self):
+        return len(self.weights.link_keys)
+
+    @property
+    def fingerprint(self) -> str:
+        """W · 자유류 · 관측 속도 · 용량 내용 해시 (기준 교통량은 이들에서 역산) — 1회 계산"""
+        if self._fingerprint is None:
+            h = hashlib.sha1()
+            m = self.weights.matrix
+            for a in (self.weights.link_keys, m.indptr, m.indices, m.data, self.free_flow, self.speed, self.capacity):
+                h.update(np.ascontiguousarray(a).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def link_volume(self, trips, background=1.0) -> np.ndarray:
+        """
+        발생 통행 trips (K, S) 또는 (S,) · 배경 교통량 배율 background (스칼라 / (K,) / (K, L))
+        → 사업 후 링크 교통량 (K, L)
+        """
+        t = np.atleast_2d(np.nan_to_num(np.asarray(trips, dtype=float)))
+        added = np.asarray(self._share.T @ t.T).T
+        bg = np.asarray(background, dtype=float)
+        if bg.ndim == 1:
+            bg = bg[:, None]
+        return self.volume * bg + added
+
+    def speed_after(self, volume) -> np.ndarray:
+        """교통량 (K, L) → BPR 속도(km/h) = 자유류 / (1 + α (v/c)^β)"""
+        return self.free_flow / (1 + BPR_ALPHA * (np.asarray(volume, dtype=float) / self.capacity) ** BPR_BETA)
+
+    def congestion(self, trips, background=1.0) -> np.ndarray:
+        """(K, L) 사업 후 혼잡도(%) = (1 - 속도 / 자유류) × 100"""
+        return (1 - self.speed_after(self.link_volume(trips, background)) / self.free_flow) * 100
+
+    def base_congestion(self) -> np.ndarray:
+        """(L,) 사업 전 혼잡도(%) — 관측 hour 시 혼잡도와 같음"""
+        return self.congestion(np.zeros(self.weights.shape[0]))[0]
+
+    def site_congestion(self, link_values) -> np.ndarray:
+        """링크 값 (K, L) 또는 (L,) → 사업지별 거리감쇠 가중평균 (K, S) (값 없는 링크 제외)"""
+        v = np.atleast_2d(np.asarray(link_values, dtype=float))
+        ok = np.isfinite(v)
+        num = self.weights.matrix @ np.where(ok, v, 0.0).T
+        den = self.weights.matrix @ ok.T.astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(den > 0, num / den, np.nan).T